@@ -1,21 +1,30 @@
+import time
+_IMPORT_STARTED = time.perf_counter()
 from flask import Flask, request, jsonify
 from flask_cors import CORS
-from selenium import webdriver
-from selenium.webdriver.common.by import By
-from selenium.webdriver.support.ui import WebDriverWait
-from selenium.webdriver.support import expected_conditions as EC
-from selenium.webdriver.edge.service import Service
-from selenium.webdriver.common.action_chains import ActionChains
-import time, random, base64, io, os, threading, configparser
-from PIL import Image
-from captcha_recognizer.slider import SliderV2
+import random, base64, os, threading, configparser, queue, atexit
 import logging
+# except 子句需要真正的异常类；selenium.common 很轻，不会导入 webdriver
 from selenium.common.exceptions import TimeoutException
 import zipfile
 import shutil
 from pathlib import Path
-import win32print
 import subprocess
+from lazy_import import LazyImport, load_all
+from driver_pool import DriverPool, create_edge_driver
+from waits import Waiter, pacing_profile
+from job_queue import default_cipher
+from jobs import Job, JobEngine, JobQueueFull
+
+# 重量级依赖在第一次使用或后台预热（见 warm_up）时才导入，Flask 不必等它们导入完就能开始监听端口
+By = LazyImport('selenium.webdriver.common.by', 'By')
+EC = LazyImport('selenium.webdriver.support.expected_conditions')
+ActionChains = LazyImport('selenium.webdriver.common.action_chains', 'ActionChains')
+win32print = LazyImport('win32print')
+SliderV2 = LazyImport('captcha_recognizer.slider', 'SliderV2')
+SliderSession = LazyImport('captcha_recognizer.session', 'SliderSession')
+Recognizer = LazyImport('captcha_recognizer.recognizer', 'Recognizer')
+HEAVY_IMPORTS = (By, EC, ActionChains, win32print, SliderV2, SliderSession, Recognizer)
 
 app = Flask(__name__)
 CORS(app)  # 启用跨域支持
@@ -38,7 +47,7 @@ log_dir = get_resource_path(config.get('DEFAULT', 'LOG_DIR', fallback='logs'))
 os.makedirs(log_dir, exist_ok=True)
 logging.basicConfig(
     level=logging.INFO,
-    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
+    format='%(asctime)s - %(name)s - %(threadName)s - %(levelname)s - %(message)s',
     handlers=[
         logging.FileHandler(os.path.join(log_dir, 'app.log'), encoding='utf-8'),
         logging.StreamHandler()
@@ -56,6 +65,203 @@ EXTRACT_PATH = get_resource_path(config.get('DEFAULT', 'EXTRACT_PATH', fallback=
 DOWNLOAD_DIR = get_resource_path(config.get('DEFAULT', 'DOWNLOAD_DIR', fallback=r'downloads'))
 PRINTER_NAME = config.get('PRINTER', 'PRINTER_NAME', fallback="TestPrinter")
 PDFTO_PRINTER_EXE = get_resource_path(config.get('PRINTER', 'PDFTO_PRINTER_EXE', fallback=r'printer\PDFtoPrinter.exe'))
+ARCHIVE_QUEUE_SIZE = config.getint('DEFAULT', 'ARCHIVE_QUEUE_SIZE', fallback=32)
+LOGIN_URL = config.get('DEFAULT', 'LOGIN_URL', fallback='https://tyrz.zwfw.gxzf.gov.cn/')
+DRIVER_POOL_SIZE = config.getint('DEFAULT', 'DRIVER_POOL_SIZE', fallback=0)
+DRIVER_CHECKOUT_TIMEOUT = config.getfloat('DEFAULT', 'DRIVER_CHECKOUT_TIMEOUT', fallback=60)
+JOB_WORKERS = config.getint('DEFAULT', 'JOB_WORKERS', fallback=1)
+JOB_QUEUE_SIZE = config.getint('DEFAULT', 'JOB_QUEUE_SIZE', fallback=8)
+JOB_QUEUE_FILE = get_resource_path(config.get('DEFAULT', 'JOB_QUEUE_FILE')) \
+    if config.get('DEFAULT', 'JOB_QUEUE_FILE', fallback='') else None
+# 柜台终端（X-Terminal-Id 或 IP）提交的任务优先于自助终端执行
+COUNTER_TERMINALS = {terminal.strip() for terminal in config.get('DEFAULT', 'COUNTER_TERMINALS', fallback='').split(',')
+                     if terminal.strip()}
+
+# 登录流程的条件等待和模拟人工操作的节奏
+WAIT_TIMEOUT = config.getfloat('WAITS', 'TIMEOUT', fallback=20)
+NETWORK_IDLE_MS = config.getfloat('WAITS', 'NETWORK_IDLE_MS', fallback=500)
+DOWNLOAD_TIMEOUT = config.getfloat('WAITS', 'DOWNLOAD_TIMEOUT', fallback=30)
+PACING = pacing_profile(
+    config.get('WAITS', 'PACING', fallback='human'),
+    pause=[float(value) for value in config.get('WAITS', 'PACING_PAUSE', fallback='').split(',') if value.strip()],
+    drag_step=[float(value) for value in config.get('WAITS', 'PACING_DRAG_STEP', fallback='').split(',')
+               if value.strip()],
+)
+
+# 验证码模型推理配置
+MODEL_VARIANT = config.get('MODEL', 'VARIANT', fallback='fp32')
+MODEL_IMGSZ = config.get('MODEL', 'IMGSZ', fallback='640')
+MODEL_IMGSZ = MODEL_IMGSZ if MODEL_IMGSZ == 'rect' else int(MODEL_IMGSZ)
+# 两级识别：slider-v1 置信度足够时直接采用，否则再用 SliderV2；关闭时只用 SliderV2
+MODEL_CASCADE = config.getboolean('MODEL', 'CASCADE', fallback=False)
+MODEL_CASCADE_DETECTOR = config.get('MODEL', 'CASCADE_DETECTOR', fallback='v1')
+# 推理子进程数，0 表示在 Flask 进程内识别；子进程在后台预热时创建（见 warm_up）
+INFERENCE_WORKERS = config.getint('MODEL', 'INFERENCE_WORKERS', fallback=0)
+
+# 识别器在第一次识别或后台预热时由 init_recognizers 创建，未启用的组件保持 None
+batch_scheduler = None
+cascade_recognizer = None
+result_cache = None
+inference_server = None
+recognizers_ready = False
+_recognizers_lock = threading.Lock()
+
+
+def init_recognizers():
+    """按 [MODEL] 配置创建识别器（只执行一次）；这里才导入 onnxruntime / cv2。"""
+    global batch_scheduler, cascade_recognizer, result_cache, inference_server, recognizers_ready
+    if recognizers_ready:
+        return
+    with _recognizers_lock:
+        if recognizers_ready:
+            return
+        from captcha_recognizer.session import SessionProfile
+        from captcha_recognizer.cascade import CascadeRecognizer
+        from captcha_recognizer.gap_detector import GapDetector
+        from captcha_recognizer.cache import ResultCache
+        from captcha_recognizer.server import InferenceServer
+        from captcha_recognizer.scheduler import BatchScheduler
+        from captcha_recognizer.profiling import StatsProfiler, set_profiler
+
+        profile = SessionProfile(
+            intra_op_threads=config.getint('MODEL', 'INTRA_OP_THREADS', fallback=0),
+            inter_op_threads=config.getint('MODEL', 'INTER_OP_THREADS', fallback=0),
+            execution_mode=config.get('MODEL', 'EXECUTION_MODE', fallback='sequential'),
+            optimization_level=config.get('MODEL', 'OPTIMIZATION_LEVEL', fallback='all'),
+            optimized_model_dir=get_resource_path(config.get('MODEL', 'OPTIMIZED_MODEL_DIR'))
+            if config.get('MODEL', 'OPTIMIZED_MODEL_DIR', fallback='') else None,
+            variant=MODEL_VARIANT,
+        )
+        SliderSession.configure(profile)
+        Recognizer.configure(variant=MODEL_VARIANT, rect=MODEL_IMGSZ == 'rect',
+                             pool_size=config.getint('MODEL', 'V1_POOL_SIZE', fallback=2))
+
+        # 识别埋点：统计每次识别各阶段耗时、候选框数量和选框分支，慢识别写入日志
+        profiling = config.getboolean('MODEL', 'PROFILING', fallback=False)
+        profiling_slow_ms = config.getfloat('MODEL', 'PROFILING_SLOW_MS', fallback=0) or None
+        if profiling:
+            set_profiler(StatsProfiler(slow_ms=profiling_slow_ms))
+
+        # 并发识别合批：窗口内到达的请求合并成一次 SliderV2 批量推理；窗口为 0 时每次单独推理
+        batch_window_ms = config.getfloat('MODEL', 'BATCH_WINDOW_MS', fallback=0)
+        batch_scheduler = BatchScheduler(
+            SliderV2(imgsz=MODEL_IMGSZ),
+            window=batch_window_ms / 1000,
+            max_batch=config.getint('MODEL', 'BATCH_MAX_SIZE', fallback=8),
+        ) if batch_window_ms > 0 else None
+
+        cascade_recognizer = CascadeRecognizer(
+            threshold=config.getfloat('MODEL', 'CASCADE_THRESHOLD', fallback=0.8),
+            detector=GapDetector() if MODEL_CASCADE_DETECTOR == 'classical' else None,
+            segmenter=batch_scheduler or SliderV2(imgsz=MODEL_IMGSZ),
+        ) if MODEL_CASCADE else None
+
+        # 识别结果缓存：背景图重复出现时直接复用之前的识别结果
+        result_cache = ResultCache(
+            max_size=config.getint('MODEL', 'RESULT_CACHE_SIZE', fallback=512),
+            path=get_resource_path(config.get('MODEL', 'RESULT_CACHE_FILE'))
+            if config.get('MODEL', 'RESULT_CACHE_FILE', fallback='') else None,
+        ) if config.getboolean('MODEL', 'RESULT_CACHE', fallback=False) else None
+        if result_cache is not None and result_cache.path:
+            result_cache.start_autosave(60)
+            atexit.register(result_cache.save_if_dirty)
+
+        inference_server = InferenceServer(
+            workers=INFERENCE_WORKERS,
+            engine='cascade' if MODEL_CASCADE else 'slider-v2',
+            options={
+                'profile': profile,
+                'imgsz': MODEL_IMGSZ,
+                'variant': MODEL_VARIANT,
+                'rect': MODEL_IMGSZ == 'rect',
+                'pool_size': config.getint('MODEL', 'V1_POOL_SIZE', fallback=2),
+                'cascade_threshold': config.getfloat('MODEL', 'CASCADE_THRESHOLD', fallback=0.8),
+                'cascade_detector': MODEL_CASCADE_DETECTOR,
+                'profiling': profiling,
+                'profiling_slow_ms': profiling_slow_ms,
+            },
+        ) if INFERENCE_WORKERS > 0 else None
+        recognizers_ready = True
+
+
+def get_gap_recognizer():
+    """按配置组合识别器：推理子进程、两级识别或 SliderV2，外面再按需套一层结果缓存。"""
+    init_recognizers()
+    from captcha_recognizer.cache import CachedRecognizer
+
+    if inference_server is not None and inference_server.running:
+        recognizer = inference_server
+    elif cascade_recognizer is not None:
+        recognizer = cascade_recognizer
+    else:
+        recognizer = batch_scheduler or SliderV2(imgsz=MODEL_IMGSZ)
+    return CachedRecognizer(recognizer, result_cache) if result_cache is not None else recognizer
+
+
+# 后台预热状态：pending / running / done（个别步骤失败记在 errors 中，不影响服务）
+warmup_status = {'state': 'pending', 'imports_ms': {}, 'errors': [], 'elapsed_ms': None}
+
+
+def warm_up():
+    """
+    在后台线程中导入重量级模块、创建识别器并加载模型（或启动推理子进程），
+    同时预先启动浏览器池，让第一次登录不必承担这些开销；预热完成前到达的请求会在用到时自行加载。
+    """
+    global inference_server
+    started = time.perf_counter()
+    load_models = True
+    warmup_status['state'] = 'running'
+    # 浏览器在后台线程中启动，与下面的导入和模型加载并行
+    if driver_pool is not None:
+        driver_pool.start()
+        atexit.register(driver_pool.close)
+    # 恢复上次退出时未完成的登录任务
+    try:
+        job_engine.start()
+    except Exception as e:
+        warmup_status['errors'].append(f"任务队列恢复失败: {e}")
+        logger.error(f"任务队列恢复失败: {str(e)}")
+    warmup_status['imports_ms'] = load_all(*HEAVY_IMPORTS)
+    failed_imports = [name for name, ms in warmup_status['imports_ms'].items() if ms is None]
+    if failed_imports:
+        warmup_status['errors'].append(f"导入失败: {', '.join(failed_imports)}")
+        logger.warning(f"预热时导入失败，相关功能将在使用时报错: {', '.join(failed_imports)}")
+
+    try:
+        init_recognizers()
+    except Exception as e:
+        warmup_status['errors'].append(f"创建识别器失败: {e}")
+        logger.error(f"创建验证码识别器失败，将在首次识别时重试: {str(e)}")
+        load_models = False
+
+    if load_models and inference_server is not None:
+        try:
+            inference_server.start()
+            atexit.register(inference_server.close)
+            logger.info(f"已启动 {INFERENCE_WORKERS} 个验证码推理子进程")
+        except Exception as e:
+            warmup_status['errors'].append(f"推理子进程启动失败: {e}")
+            logger.error(f"验证码推理子进程启动失败，改为在本进程内识别: {str(e)}")
+            inference_server = None
+    elif load_models:
+        try:
+            slider_metrics = SliderSession.preload().metrics()
+            logger.info(f"验证码模型已加载: 加载耗时 {slider_metrics['load_time_ms']}ms, "
+                        f"首次推理耗时 {slider_metrics['warmup_time_ms']}ms")
+        except Exception as e:
+            warmup_status['errors'].append(f"SliderV2 预加载失败: {e}")
+            logger.error(f"验证码模型预加载失败，将在首次识别时重新加载: {str(e)}")
+        if cascade_recognizer is not None and MODEL_CASCADE_DETECTOR == 'v1':
+            try:
+                Recognizer()
+                logger.info("slider-v1 检测模型已加载")
+            except Exception as e:
+                warmup_status['errors'].append(f"slider-v1 加载失败: {e}")
+                logger.error(f"slider-v1 检测模型加载失败，识别将直接使用 SliderV2: {str(e)}")
+
+    warmup_status['elapsed_ms'] = round((time.perf_counter() - started) * 1000, 1)
+    warmup_status['state'] = 'done'
+    logger.info(f"后台预热完成，耗时 {warmup_status['elapsed_ms']}ms，导入耗时: {warmup_status['imports_ms']}")
 
 # 打印机状态码
 # ---------- 状态常量 ----------
@@ -112,21 +318,93 @@ STATUS_MAP = {
     PRINTER_STATUS_SERVER_UNKNOWN:   "服务器未知",
     PRINTER_STATUS_POWER_SAVE:       "节能模式",
 }
-# 存储登录状态和结果的全局变量
-login_status = {
-    'is_processing': False,
-    'success': False,
-    'message': '',
-    'last_login_time': None,
-    'error_type': '',
-    'user_type': '',
-    'document_type': ''
-}
+# 支持的证件类型，与 CertificateAutomation.document_url 的键一致
+DOCUMENT_TYPES = [str(i) for i in range(1, 41)]
+
+# 各终端通过 /api/document_type 设置的证件类型，登录请求没有带 document_type 时使用
+terminal_settings = {}
+
+# 打印机只有一台，多个任务的打印和状态轮询依次进行
+print_lock = threading.Lock()
+
+class SampleArchiver:
+    """后台保存验证码样本图片，磁盘 I/O 不占用登录流程的时间"""
+
+    def __init__(self, img_dir, maxsize):
+        self.img_dir = img_dir
+        self.queue = queue.Queue(maxsize=maxsize)
+        self.written = 0
+        self.dropped = 0
+        self._thread = None
+        self._lock = threading.Lock()
+
+    def _ensure_started(self):
+        if self._thread is None:
+            with self._lock:
+                if self._thread is None:
+                    self._thread = threading.Thread(target=self._run, name='sample-archiver', daemon=True)
+                    self._thread.start()
+
+    def submit(self, img_name, data):
+        """提交一张待保存的图片；队列已满时直接丢弃，绝不阻塞调用方"""
+        self._ensure_started()
+        try:
+            self.queue.put_nowait((img_name, data))
+        except queue.Full:
+            with self._lock:
+                self.dropped += 1
+            logger.warning(f"样本归档队列已满，丢弃图片: {img_name}")
+
+    def _run(self):
+        while True:
+            img_name, data = self.queue.get()
+            try:
+                os.makedirs(self.img_dir, exist_ok=True)
+                with open(os.path.join(self.img_dir, img_name), 'wb') as f:
+                    f.write(data)
+                with self._lock:
+                    self.written += 1
+            except Exception as e:
+                logger.error(f"保存验证码样本失败: {str(e)}")
+            finally:
+                self.queue.task_done()
+
+    def metrics(self):
+        with self._lock:
+            return {
+                'queued': self.queue.qsize(),
+                'written': self.written,
+                'dropped': self.dropped,
+            }
+
+sample_archiver = SampleArchiver(IMG_DIR, ARCHIVE_QUEUE_SIZE)
+
+
+def create_driver(download_dir=DOWNLOAD_DIR):
+    """启动一个新的 Edge 浏览器"""
+    return create_edge_driver(EDGE_DRIVER_PATH, headless=HEADLESS, download_dir=download_dir)
+
+
+# 浏览器池：预先启动 DRIVER_POOL_SIZE 个浏览器供登录任务复用，0 表示每个任务单独启动和关闭浏览器
+driver_pool = DriverPool(
+    create_driver,
+    size=DRIVER_POOL_SIZE,
+    max_jobs=config.getint('DEFAULT', 'DRIVER_MAX_JOBS', fallback=20),
+    max_memory_growth_mb=config.getfloat('DEFAULT', 'DRIVER_MAX_MEMORY_GROWTH_MB', fallback=500),
+    # 登录流程会访问的站点，归还浏览器时清理它们的本地存储
+    reset_origins=[LOGIN_URL, 'https://zwfw.gxzf.gov.cn', 'https://zhjg.scjdglj.gxzf.gov.cn:10001'],
+) if DRIVER_POOL_SIZE > 0 else None
 
 class CertificateAutomation:
-    def __init__(self):
+    def __init__(self, job):
+        self.job = job
         self.driver = None
-        self.wait = None
+        self.pooled = False  # self.driver 是否从浏览器池借出
+        self.waits = None
+        self.captcha_image = None  # 最近一次识别的验证码背景，验证失败时从识别结果缓存中删除
+        # 每个任务使用自己的下载和解压目录，并行的任务不会打印到别人的证件
+        self.download_dir = os.path.join(DOWNLOAD_DIR, job.id)
+        self.extract_dir = os.path.join(EXTRACT_PATH, job.id)
         self.document_set = {
             '1': '食品经营许可证',
             '2': '法人身份证',
@@ -213,52 +491,58 @@ class CertificateAutomation:
         }
 
     def setup_driver(self):
-        """初始化浏览器驱动"""
-        options = webdriver.EdgeOptions()
-        options.add_argument('--disable-blink-features=AutomationControlled')
-        options.add_experimental_option("excludeSwitches", ["enable-automation"])
-        options.add_experimental_option('useAutomationExtension', False)
-        options.add_argument("--window-size=1280,1024")
-        if HEADLESS:
-            options.add_argument("--headless")  # 无头模式，适合服务器运行
-
-
-        prefs = {
-            "download.default_directory": DOWNLOAD_DIR,
-            "download.prompt_for_download": False,
-            "download.directory_upgrade": True,
-            "safebrowsing.enabled": True
-        }
-        options.add_experimental_option("prefs", prefs)
-
-        service = Service(EDGE_DRIVER_PATH)
-        self.driver = webdriver.Edge(service=service, options=options)
-        self.driver.execute_script("Object.defineProperty(navigator, 'webdriver', {get: () => undefined})")
-        self.wait = WebDriverWait(self.driver, 20)
+        """初始化浏览器驱动：启用浏览器池时借出一个预启动的浏览器，否则启动新的浏览器"""
+        os.makedirs(self.download_dir, exist_ok=True)
+        if driver_pool is not None:
+            self.driver = driver_pool.acquire(timeout=DRIVER_CHECKOUT_TIMEOUT)
+            self.pooled = True
+            try:
+                # 池中浏览器启动时设置的下载目录是共用的，这里改为本任务的目录
+                self.driver.execute_cdp_cmd('Browser.setDownloadBehavior',
+                                            {'behavior': 'allow', 'downloadPath': self.download_dir})
+            except Exception as e:
+                # 不能退回共用的下载目录（并行的任务会打印到别人的证件），回收这个浏览器，
+                # 改为启动一个以本任务目录为下载目录的浏览器；启动失败时任务失败
+                logger.warning(f"设置任务下载目录失败，回收浏览器并单独启动: {str(e)}")
+                self.release_driver(discard=True)
+                self.driver = create_driver(self.download_dir)
+        else:
+            self.driver = create_driver(self.download_dir)
+        self.waits = Waiter(self.driver, timeout=WAIT_TIMEOUT, pacing=PACING, network_idle_ms=NETWORK_IDLE_MS)
+
+    def release_driver(self, discard=False):
+        """归还或关闭浏览器，discard=True 时不再放回浏览器池"""
+        driver, self.driver = self.driver, None
+        if self.pooled:
+            self.pooled = False
+            driver_pool.release(driver, discard=discard)
+        else:
+            driver.quit()
         
     def fill_legal_login(self, username, password):
         """填写法人登录信息"""
         try:
             # 切法人登录
-            legal_login_tab = self.wait.until(
-                EC.element_to_be_clickable((By.XPATH, "//span[text()='法人登录']"))
+            legal_login_tab = self.waits.until(
+                'login_tab', EC.element_to_be_clickable((By.XPATH, "//span[text()='法人登录']"))
             )
-            if login_status['user_type'] == 'corporate':
+            if self.job.user_type == 'corporate':
                 logger.info("切换到法人登录")
                 legal_login_tab.click()
-                time.sleep(1.5)
+                self.waits.pause('switch_login_tab')
             else:
                 logger.info("当前为个人登录，无需切换")
 
-            username_field = self.wait.until(EC.presence_of_element_located((By.ID, 'legal_login_name')))
-            password_field = self.wait.until(EC.presence_of_element_located((By.ID, 'legal_pswd')))
+            # 切换标签后等输入框可以输入，而不是固定等待
+            username_field = self.waits.until('login_form', EC.element_to_be_clickable((By.ID, 'legal_login_name')))
+            password_field = self.waits.until('login_form', EC.element_to_be_clickable((By.ID, 'legal_pswd')))
 
             username_field.clear()
             username_field.send_keys(username)
-            time.sleep(1.3)
+            self.waits.pause('type_username')
             password_field.clear()
             password_field.send_keys(password)
-            time.sleep(1.3)
+            self.waits.pause('type_password')
             
             logger.info("账号和密码输入完成")
             return True
@@ -271,10 +555,11 @@ class CertificateAutomation:
         if max_retry is None:
             max_retry = MAX_RETRY
             
+        src_data = None
         for attempt in range(1, max_retry + 1):
             try:
-                captcha_img = self.wait.until(
-                    EC.presence_of_element_located((By.CSS_SELECTOR, "#mpanel2 .backImg"))
+                captcha_img = self.waits.until(
+                    'captcha_image', EC.presence_of_element_located((By.CSS_SELECTOR, "#mpanel2 .backImg"))
                 )
                 src_data = captcha_img.get_attribute("src")
                 if not src_data.startswith("data:image"):
@@ -283,19 +568,17 @@ class CertificateAutomation:
                 bg_b64 = src_data.split("base64,")[1]
                 bg_bytes = base64.b64decode(bg_b64)
 
-                # 保存图片到本地临时文件
-                tt = time.time()
-                img_name = f'{tt}_image.png'
-                img_abs_path = os.path.join(IMG_DIR, img_name)
-                
-                # 确保目录存在
-                os.makedirs(IMG_DIR, exist_ok=True)
-                
-                with open(img_abs_path, "wb") as f:
-                    f.write(bg_bytes)
+                # 只解码一次，直接把数组交给模型识别
+                bg_image = SliderV2.image_to_array(bg_bytes)
+                if bg_image is None:
+                    raise RuntimeError("验证码图片解码失败")
+                self.captcha_image = bg_image
+
+                # 样本归档交给后台线程，不阻塞识别
+                sample_archiver.submit(f'{time.time()}_image.png', bg_bytes)
 
                 logger.info(f"第{attempt}次尝试：调用本地模型识别缺口位置...")
-                box, _ = SliderV2().identify(source=img_abs_path, show=False)
+                box, _ = get_gap_recognizer().identify(source=bg_image)
 
                 if not box:
                     raise RuntimeError("未能识别出缺口位置")
@@ -304,8 +587,7 @@ class CertificateAutomation:
                 logger.info(f"识别出的原始缺口X坐标: {raw_x}")
 
                 # 计算缩放
-                with Image.open(io.BytesIO(bg_bytes)) as img:
-                    orig_w = float(img.width)
+                orig_w = float(bg_image.shape[1])
 
                 scale = web_image_width / orig_w if orig_w else 1.0
                 initial_slider_x = 12
@@ -321,15 +603,24 @@ class CertificateAutomation:
                 if attempt < max_retry:
                     logger.info("点击刷新图片按钮重试...")
                     try:
-                        refresh_btn = self.wait.until(
-                            EC.element_to_be_clickable((By.XPATH, '//*[@id="mpanel2"]/div[1]/div/div/i'))
+                        refresh_btn = self.waits.until(
+                            'captcha_refresh', EC.element_to_be_clickable((By.XPATH, '//*[@id="mpanel2"]/div[1]/div/div/i'))
                         )
                         refresh_btn.click()
-                        time.sleep(2)
+                        # 等新的验证码图片加载完成
+                        self.waits.image_loaded('captcha_refresh', (By.CSS_SELECTOR, "#mpanel2 .backImg"),
+                                                previous_src=src_data)
                     except Exception as refresh_e:
                         logger.error(f"刷新验证码失败: {refresh_e}")
                 else:
                     raise RuntimeError("达到最大重试次数，仍未识别出缺口位置")
+
+    def forget_captcha_result(self):
+        """滑块验证失败：识别结果可能是错的，从缓存中删除，同一背景下次重新识别"""
+        if result_cache is not None and self.captcha_image is not None:
+            if result_cache.forget(self.captcha_image):
+                logger.info("已从识别结果缓存中删除验证失败的结果")
+            self.captcha_image = None
     
     def generate_human_like_track(self, distance):
         """生成类人的拖动轨迹"""
@@ -352,17 +643,15 @@ class CertificateAutomation:
         """解决滑块验证码"""
         try:
             # 先找到滑块并按住 → 背景图才会加载
-            slider_button = self.wait.until(
+            slider_button = self.waits.until(
+                'captcha_slider',
                 EC.element_to_be_clickable((By.XPATH, "//div[@id='mpanel2']//div[contains(@class,'verify-move-block')]"))
             )
             action = ActionChains(self.driver)
             action.move_to_element(slider_button).click_and_hold(slider_button).perform()
-            time.sleep(1)  # 等背景图渲染
 
-            # 背景图出现
-            captcha_element = self.wait.until(
-                EC.visibility_of_element_located((By.CSS_SELECTOR, "#mpanel2 .backImg"))
-            )
+            # 等背景图加载并显示出来
+            captcha_element = self.waits.image_loaded('captcha_image', (By.CSS_SELECTOR, "#mpanel2 .backImg"))
             web_image_width = captcha_element.size['width']
             logger.info(f"网页验证码图片宽度: {web_image_width}")
 
@@ -375,7 +664,7 @@ class CertificateAutomation:
 
             for move in track:
                 action.move_by_offset(xoffset=move, yoffset=random.uniform(-1, 1)).perform()
-                time.sleep(random.uniform(0.01, 0.03))
+                self.waits.drag_step()
 
             action.release().perform()
             logger.info("滑块拖动完成")
@@ -454,7 +743,7 @@ class CertificateAutomation:
         # 2. 检查打印机状态
         status = self._get_printer_status(printer_name)
         if status != "就绪":
-            login_status['error_type'] = 'printer_error'
+            self.job.error_type = 'printer_error'
             logger.error(f"打印机状态异常：{status}")
             return {"success": False, "message": f"打印机状态异常：{status}"}
         logger.info("打印机状态正常")
@@ -490,20 +779,21 @@ class CertificateAutomation:
             self.setup_driver()
             
             # 打开登录页面
-            LOGIN_URL = self.document_url[login_status['document_type']]
+            LOGIN_URL = self.document_url[self.job.document_type]
             # LOGIN_URL = "https://tyrz.zwfw.gxzf.gov.cn/am/auth/login?service=initService&goto=aHR0cHM6Ly90eXJ6Lnp3ZncuZ3h6Zi5nb3YuY24vYW0vb2F1dGgyL2F1dGhvcml6ZT9jbGllbnRfaWQ9bmV3Z3h6d2Z3JmNsaWVudF9zZWNyZXQ9MTExMTExJnNjb3BlPWFsbCZyZXNwb25zZV90eXBlPWNvZGUmc2VydmljZT1pbml0U2VydmljZSZyZWRpcmVjdF91cmk9aHR0cHMlM0ElMkYlMkZ6d2Z3Lmd4emYuZ292LmNuJTJGZXBvcnRhbGFwcGx5JTJGcG9ydGxldCUyRmF1dGhVc2VyTG9naW4lMkZvYXV0aDJVcmwlM0ZqdW1wUGF0aCUzRGFIUjBjSE02THk5NmQyWjNMbWQ0ZW1ZdVoyOTJMbU51TDJKaGJuTm9hUzlwYm1SbGVDOCUzRA=="
 
             self.driver.get(LOGIN_URL)
+            self.waits.page_ready('login_page')
             logger.info("网页已打开，等待元素加载...")
             
             # 填写登录信息
             if not self.fill_legal_login(username, password):
-                login_status['error_type'] = 'time_error'
+                self.job.error_type = 'time_error'
                 return False, "填写登录信息失败"
             
             # 解决滑块验证码
             if not self.solve_slider_captcha():
-                login_status['error_type'] = 'time_error'
+                self.job.error_type = 'time_error'
                 return False, "验证码识别失败"
             
             
@@ -514,15 +804,15 @@ class CertificateAutomation:
                 logger.info(f"尝试登录，第 {attempt + 1} 次")
                 
                 # 点击登录按钮
-                login_btn = self.wait.until(
-                    EC.element_to_be_clickable((By.XPATH, '//*[@id="form_lists"]/div[1]/div[2]/button'))
+                login_btn = self.waits.until(
+                    'login_button', EC.element_to_be_clickable((By.XPATH, '//*[@id="form_lists"]/div[1]/div[2]/button'))
                 )
-                time.sleep(1)
+                self.waits.pause('before_login_click')
                 login_btn.click()
                 
                 try:
                     # 等待 URL 变化（1 秒内）
-                    WebDriverWait(self.driver, 1).until(lambda d: d.current_url != old_url)
+                    self.waits.until('login_redirect', lambda d: d.current_url != old_url, timeout=1)
                     logger.info("登录成功，已跳转到下一页")
                     break  # 登录成功，跳出重试循环
                     
@@ -534,10 +824,12 @@ class CertificateAutomation:
                         logger.info(f"登录失败：{error_text}")
                         
                         if error_text == "用户名或密码不正确":
-                            login_status['error_type'] = 'username_or_password_error'
+                            self.job.error_type = 'username_or_password_error'
                             return False, "用户名或密码不正确"
                         
                         elif error_text in ["请输入统一社会信用代码", "请进行滑块验证"]:
+                            if error_text == "请进行滑块验证":
+                                self.forget_captcha_result()
                             # 验证码相关错误，可以重试
                             if attempt < max_login_attempts - 1:  # 不是最后一次尝试
                                 logger.info(f"验证码错误，准备重试 (剩余 {max_login_attempts - attempt - 1} 次)")
@@ -561,11 +853,11 @@ class CertificateAutomation:
                                         return False, "刷新验证码失败"
                             else:
                                 # 已是最后一次尝试
-                                login_status['error_type'] = 'time_error'
+                                self.job.error_type = 'time_error'
                                 return False, f"多次重试后仍然登录失败: {error_text}"
                         else:
                             # 其他类型错误，不重试
-                            login_status['error_type'] = 'time_error'
+                            self.job.error_type = 'time_error'
                             return False, f"登录失败: {error_text}"
                             
                     except Exception as e:
@@ -575,10 +867,11 @@ class CertificateAutomation:
             
             # 检查最终是否登录成功
             if "login" in self.driver.current_url:
-                login_status['error_type'] = 'time_error'
+                self.job.error_type = 'time_error'
                 return False, "登录超时或失败"
 
-            time.sleep(2)
+            # 等跳转后的页面加载完成、登录回调请求结束
+            self.waits.network_idle('after_login')
             
             # 检查登录结果
             if "login" not in self.driver.current_url:            # 登录成功,成功跳转到下一个页面
@@ -586,107 +879,135 @@ class CertificateAutomation:
                 
                 # 导航到证件页面
                 self.driver.get("https://zhjg.scjdglj.gxzf.gov.cn:10001/TopFDOAS/topic/homePage.action?currentLink=foodOp")
-                time.sleep(2)
+                self.waits.network_idle('certificate_page')
                 self.driver.get("https://zhjg.scjdglj.gxzf.gov.cn:10001/TopFDOAS/topic/homePage.action?currentLink=foodOp")
-                time.sleep(2)
+                self.waits.network_idle('certificate_page')
                 # 点击相关tab
-                my_button = self.wait.until(
-                    EC.element_to_be_clickable((By.ID, "tab-second"))
+                my_button = self.waits.until(
+                    'certificate_tab', EC.element_to_be_clickable((By.ID, "tab-second"))
                 )
                 ActionChains(self.driver).click(my_button).perform()
-                time.sleep(2)
+                self.waits.network_idle('certificate_tab')
 
                 # 检查证件状态
                 try:
-                    ele = WebDriverWait(self.driver, 20).until(
+                    ele = self.waits.until(
+                        'certificate_status',
                         EC.presence_of_element_located((By.CSS_SELECTOR, "div.tni-status.tni-status__success"))
                     )
                     
-                    text = WebDriverWait(self.driver, 20).until(
-                        lambda d: ele.get_attribute("textContent").strip()
+                    text = self.waits.until(
+                        'certificate_status', lambda d: ele.get_attribute("textContent").strip()
                     )
                     text = text.strip()
                     logger.info(f"证件状态：{text}")
 
                     if text == "准予":
                         # 点击更多按钮进行打印
-                        more_btn = self.wait.until(
-                            EC.element_to_be_clickable(
+                        more_btn = self.waits.until(
+                            'print_menu', EC.element_to_be_clickable(
                                 (By.XPATH, '/html/body/div[1]/div[2]/div/div[1]/div[2]/div/div[2]/div[2]/div/div/div[2]/div/div[3]/table/tbody/tr/td[7]/div/div/div/button')
                             )
                         )
                         more_btn.click()
-                        time.sleep(2)
-                        print_btn = self.wait.until(
-                            EC.element_to_be_clickable(
+                        print_btn = self.waits.until(
+                            'print_menu', EC.element_to_be_clickable(
                                 (By.XPATH, '/html/body/ul/li[2]/button')
                             )
                         )
                         print_btn.click()
-                        time.sleep(2)
+                        # 等证件文件下载完成
+                        self.waits.download_finished('download', self.download_dir, timeout=DOWNLOAD_TIMEOUT)
                         # 如果文件夹非空，解压文件夹中下载的文件
-                        print(EXTRACT_PATH)
-                        print(DOWNLOAD_DIR)
-                        if os.listdir(DOWNLOAD_DIR):
+                        logger.debug(f"任务 {self.job.id} 下载目录: {self.download_dir}，解压目录: {self.extract_dir}")
+                        if os.listdir(self.download_dir):
                             # 先清空目标文件夹
-                            if os.path.exists(EXTRACT_PATH):
-                                shutil.rmtree(EXTRACT_PATH)
-                            os.makedirs(EXTRACT_PATH, exist_ok=True)
+                            if os.path.exists(self.extract_dir):
+                                shutil.rmtree(self.extract_dir)
+                            os.makedirs(self.extract_dir, exist_ok=True)
                             
 
-                            self.extract_zip_file(DOWNLOAD_DIR, EXTRACT_PATH)
+                            self.extract_zip_file(self.download_dir, self.extract_dir)
 
-                        self.print_document(PRINTER_NAME, EXTRACT_PATH)  # 打印文件夹中所有的 PDF 文件
+                        with print_lock:
+                            self.print_document(PRINTER_NAME, self.extract_dir)  # 打印文件夹中所有的 PDF 文件
                         logger.info("证件打印成功")
-                        login_status['error_type'] = ''
+                        self.job.error_type = ''
                         return True, "证件打印成功"
                     else:
-                        login_status['error_type'] = 'invalid_certificate_status'
+                        self.job.error_type = 'invalid_certificate_status'
                         return False, f"证件状态不符合打印条件，当前状态：{text}"
                         
                 except Exception as status_e:
                     logger.error(f"检查证件状态失败: {str(status_e)}")
-                    login_status['error_type'] = 'time_error'
+                    self.job.error_type = 'time_error'
                     return False, "无法获取证件状态"
 
             else:  # 登录失败，页面未跳转
                 try:
                     err = self.driver.find_element(By.CLASS_NAME, 'layui-layer-content').text
-                    login_status['error_type'] = 'time_error'
+                    self.job.error_type = 'time_error'
                     return False, f"登录失败: {err}"
                 except:
                     return False, "登录失败，未找到具体错误信息"
                 finally:
-                    login_status['error_type'] = 'time_error'
+                    self.job.error_type = 'time_error'
         except Exception as e:
             logger.error(f"自动化流程失败: {str(e)}")
-            login_status['error_type'] = 'time_error'
+            self.job.error_type = 'time_error'
             return False, f"系统错误: {str(e)}"
         finally:
+            if self.waits is not None:
+                self.job.timings = self.waits.summary()
             if self.driver:
-                self.driver.quit()
+                self.release_driver()
+            shutil.rmtree(self.download_dir, ignore_errors=True)
+
+def background_login_task(job, username, password):
+    """在任务工作线程中执行登录打证，返回 (success, message)"""
+    automation = CertificateAutomation(job)
+    return automation.login_and_check_status(username, password)
+
+
+# 登录任务表：JOB_WORKERS 个任务并行执行（各占一个浏览器），每个任务前面最多 JOB_QUEUE_SIZE 个任务排队（柜台终端优先），结果保留 SESSION_TIMEOUT 秒；
+# 任务保存在 JOB_QUEUE_FILE 中，重启后继续执行未完成的任务
+job_engine = JobEngine(
+    background_login_task,
+    workers=JOB_WORKERS,
+    max_pending=JOB_QUEUE_SIZE,
+    ttl=SESSION_TIMEOUT,
+    path=JOB_QUEUE_FILE,
+    visibility_timeout=config.getfloat('DEFAULT', 'JOB_VISIBILITY_TIMEOUT', fallback=600),
+    max_attempts=config.getint('DEFAULT', 'JOB_MAX_ATTEMPTS', fallback=3),
+    # 加密后登录信息才写入队列文件，重启后未完成的任务可以继续执行
+    cipher=default_cipher() if config.getboolean('DEFAULT', 'JOB_QUEUE_ENCRYPT', fallback=True) else None,
+)
 
-def background_login_task(username, password):
-    """后台执行登录任务"""
-    global login_status
-    
-    login_status['is_processing'] = True
-    login_status['success'] = False
-    login_status['message'] = '正在处理中...'
-    
+
+def get_client_id():
+    """区分终端：优先使用请求头 X-Terminal-Id（多台终端经同一代理访问时），否则使用来源地址"""
+    return request.headers.get('X-Terminal-Id') or request.remote_addr or ''
+
+
+def latest_error_type():
+    job = job_engine.latest(get_client_id())
+    return job.error_type if job is not None else ''
+
+
+def submit_login_job(user_type, document_type, username, password):
+    """创建登录任务并排队；队列已满时返回 429"""
+    client = get_client_id()
+    job = Job(user_type, document_type, client=client, priority='counter' if client in COUNTER_TERMINALS else 'kiosk')
     try:
-        automation = CertificateAutomation()
-        success, message = automation.login_and_check_status(username, password)
-        
-        login_status['success'] = success
-        login_status['message'] = message
-        login_status['last_login_time'] = time.time()
-        
-    except Exception as e:
-        login_status['success'] = False
-        login_status['message'] = f"处理过程中发生错误: {str(e)}"
-    finally:
-        login_status['is_processing'] = False
+        job_engine.submit(job, username, password)
+    except JobQueueFull:
+        return jsonify({'message': '排队的任务已满，请稍后再试'}), 429
+    return jsonify({
+        'message': '登录请求已接收，正在后台处理',
+        'status': 'processing',
+        'job_id': job.id,
+        'priority': job.priority
+    }), 200
 
 @app.route('/api/document_type', methods=['POST'])
 def document_type():
@@ -702,19 +1023,16 @@ def document_type():
 
         user_type = data['user_type']
         document_type = data['document_type']
-        # 将数据保存到全局变量中，方便后续使用
-        login_status['user_type'] = user_type
-        login_status['document_type'] = document_type
 
         if user_type not in ['corporate', 'individual']:
             return jsonify({'error': 'user_type参数值无效，必须是corporate或individual'}), 400
 
-        if document_type not in ["1", "2", "3", "4", "5", "6", "7", "8", "9", "10",
-                                  "11", "12", "13", "14", "15", "16", "17", "18", "19", "20",
-                                  "21", "22", "23", "24", "25", "26", "27", "28", "29", "30",
-                                  "31", "32", "33", "34", "35", "36", "37", "38", "39", "40"]:
+        if document_type not in DOCUMENT_TYPES:
             return jsonify({'error': 'document_type参数值无效，必须是1到40之间的数字'}), 400
 
+        # 按终端保存，该终端之后的登录请求使用
+        terminal_settings[get_client_id()] = {'user_type': user_type, 'document_type': document_type}
+
         return jsonify({
             'message': f'证件类型已设置为: {document_type}'
         }), 200
@@ -729,33 +1047,25 @@ def corporate_login():
     try:
         # 验证请求数据
         if not request.is_json:
-            return jsonify({'error': '请求必须是JSON格式','error_type': login_status['error_type']}), 400
+            return jsonify({'error': '请求必须是JSON格式','error_type': latest_error_type()}), 400
 
         data = request.get_json()
         if not data or 'username' not in data or 'password' not in data:
-            return jsonify({'error': '缺少必要参数：username 和 password','error_type': login_status['error_type']}), 400
+            return jsonify({'error': '缺少必要参数：username 和 password','error_type': latest_error_type()}), 400
 
         username = data['username']
         password = data['password']
         
         # 验证参数不为空
         if not username or not password:
-            return jsonify({'error': 'username 和 password 不能为空','error_type': login_status['error_type']}), 400
-
-        # 检查是否有任务正在处理
-        if login_status['is_processing']:
-            return jsonify({'message': '有任务正在处理中，请稍后再试'}), 429
-        
-        # 启动后台任务
-        login_status['user_type'] = 'corporate'
-        thread = threading.Thread(target=background_login_task, args=(username, password))
-        thread.daemon = True
-        thread.start()
-        
-        return jsonify({
-            'message': '登录请求已接收，正在后台处理',
-            'status': 'processing'
-        }), 200
+            return jsonify({'error': 'username 和 password 不能为空','error_type': latest_error_type()}), 400
+
+        # 请求中没有 document_type 时使用该终端之前设置的
+        document_type = data.get('document_type') or terminal_settings.get(get_client_id(), {}).get('document_type', '')
+        if document_type not in DOCUMENT_TYPES:
+            return jsonify({'error': 'document_type参数值无效，必须是1到40之间的数字',
+                            'error_type': latest_error_type()}), 400
+        return submit_login_job('corporate', document_type, username, password)
         
     except Exception as e:
         logger.error(f"登录接口错误: {str(e)}")
@@ -780,22 +1090,12 @@ def individual_login():
         if not username or not password:
             return jsonify({'error': 'username 和 password 不能为空'}), 400
         
-        # 检查是否有任务正在处理
-        if login_status['is_processing']:
-            return jsonify({'message': '有任务正在处理中，请稍后再试'}), 429
-        
-        # 启动后台任务
-        login_status['user_type'] = 'individual'
-        if login_status['document_type'] is None:
+        document_type = data.get('document_type') or terminal_settings.get(get_client_id(), {}).get('document_type')
+        if not document_type:
             return jsonify({'error': '请先设置document_type'}), 400
-        thread = threading.Thread(target=background_login_task, args=(username, password))
-        thread.daemon = True
-        thread.start()
-        
-        return jsonify({
-            'message': '登录请求已接收，正在后台处理',
-            'status': 'processing'
-        }), 200
+        if document_type not in DOCUMENT_TYPES:
+            return jsonify({'error': 'document_type参数值无效，必须是1到40之间的数字'}), 400
+        return submit_login_job('individual', document_type, username, password)
         
     except Exception as e:
         logger.error(f"登录接口错误: {str(e)}")
@@ -803,34 +1103,31 @@ def individual_login():
 
 @app.route('/api/print_status', methods=['GET'])
 def check_print_status():
-    """打印状态查询接口"""
+    """打印状态查询接口：按 job_id 查询，不带 job_id 时查询该终端最近提交的任务"""
     try:
-        global login_status
-        
-        if login_status['is_processing']:
-            return jsonify({
-                'success': False,
-                'msg': '正在处理中，请稍后查询'
-            }), 204
+        job_id = request.args.get('job_id')
+        job = job_engine.get(job_id) if job_id else job_engine.latest(get_client_id())
 
-        # 如果从未执行过登录
-        if login_status['last_login_time'] is None:
+        # 从未执行过登录，或任务结束已超过 SESSION_TIMEOUT 被清除
+        if job is None:
             return jsonify({
                 'success': False,
-                'msg': '尚未执行登录操作'
+                'msg': '登录任务不存在或已过期，请重新执行登录' if job_id else '尚未执行登录操作'
             }), 410
 
-        # 检查任务是否太久之前执行的（超过配置的超时时间认为过期）
-        if time.time() - login_status['last_login_time'] > SESSION_TIMEOUT:
+        if job.processing:
             return jsonify({
                 'success': False,
-                'msg': '登录状态已过期，请重新执行登录'
-            }), 410
+                'msg': '正在处理中，请稍后查询',
+                'job_id': job.id
+            }), 204
 
         return jsonify({
-            'success': login_status['success'],
-            'msg': login_status['message'],
-            'error_type': login_status['error_type']
+            'success': job.success,
+            'msg': job.message,
+            'error_type': job.error_type,
+            'job_id': job.id,
+            'timings': job.timings
         }), 200
 
     except Exception as e:
@@ -854,6 +1151,41 @@ def clear_data():
         logger.error(f"清除数据接口错误: {str(e)}")
         return jsonify({'error': f'服务器内部错误: {str(e)}'}), 500
 
+# 运行指标
+@app.route('/api/metrics', methods=['GET'])
+def metrics():
+    # 识别器尚未创建时不为了查询指标去导入模型相关模块
+    if recognizers_ready:
+        from captcha_recognizer.profiling import get_profiler
+        recognizer_profile = get_profiler().metrics()
+        # 启用推理子进程时识别在子进程中完成，埋点统计逐个从子进程取回
+        if inference_server is not None and inference_server.running and inference_server.options.get('profiling'):
+            recognizer_profile['inference_workers'] = inference_server.profile_metrics()
+    else:
+        recognizer_profile = {}
+    return jsonify({
+        'startup': {'import_ms': APP_IMPORT_MS, 'warmup': warmup_status},
+        'slider_model': SliderSession.current_metrics() if recognizers_ready else {},
+        'slider_v1_model': Recognizer.current_metrics() if recognizers_ready else {},
+        'cascade': cascade_recognizer.metrics() if cascade_recognizer is not None else None,
+        'result_cache': result_cache.metrics() if result_cache is not None else None,
+        'inference_server': inference_server.metrics() if inference_server is not None else None,
+        'batch_scheduler': batch_scheduler.metrics() if batch_scheduler is not None else None,
+        'recognizer_profile': recognizer_profile,
+        'driver_pool': driver_pool.metrics() if driver_pool is not None else None,
+        'jobs': job_engine.metrics(),
+        'sample_archive': sample_archiver.metrics()
+    }), 200
+
+# 健康检查：只要进程在响应就返回 200，不等待后台预热
+@app.route('/api/health', methods=['GET'])
+def health():
+    return jsonify({
+        'status': 'ok',
+        'warmup': warmup_status['state'],
+        'recognizers_ready': recognizers_ready,
+    }), 200
+
 @app.errorhandler(404)
 def not_found(error):
     return jsonify({'error': '接口不存在'}), 404
@@ -862,6 +1194,9 @@ def not_found(error):
 def internal_error(error):
     return jsonify({'error': '服务器内部错误'}), 500
 
+# 本模块自身的导入耗时（不含后台预热），见 /api/metrics 的 startup
+APP_IMPORT_MS = round((time.perf_counter() - _IMPORT_STARTED) * 1000, 1)
+
 if __name__ == '__main__':
     # 确保必要目录存在
     os.makedirs(IMG_DIR, exist_ok=True)
@@ -871,6 +1206,10 @@ if __name__ == '__main__':
     host = config.get('DEFAULT', 'HOST', fallback='0.0.0.0')
     port = config.getint('DEFAULT', 'PORT', fallback=8848)
     debug = config.getboolean('DEFAULT', 'DEBUG', fallback=True)
-    
-    logger.info(f"启动Flask应用: http://{host}:{port}")
+
+    # 后台导入重量级模块并预热验证码识别模型，Flask 同时开始监听端口（debug 模式下只在 reloader 子进程中预热）
+    if not debug or os.environ.get('WERKZEUG_RUN_MAIN') == 'true':
+        threading.Thread(target=warm_up, name='warm-up', daemon=True).start()
+
+    logger.info(f"启动Flask应用: http://{host}:{port}，模块导入耗时 {APP_IMPORT_MS}ms")
     app.run(host=host, port=port, debug=debug)
@@ -0,0 +1,112 @@
+"""
+浏览器池基准：用本地替身页面模拟登录任务，对比每个任务单独启动浏览器和从 DriverPool 借用浏览器的耗时，
+并检查归还后的清理是否生效（下一个任务看不到上一个任务留下的 cookie、localStorage 和多余标签页）。
+
+替身页面由本脚本在 127.0.0.1 上启动的 HTTP 服务提供，不访问外网。需要本机安装 Edge 和 msedgedriver。
+
+运行（在项目根目录）:
+    python -m benchmarks.driver_pool_benchmark
+    python -m benchmarks.driver_pool_benchmark --jobs 20 --size 2 --max-jobs 5 --driver browser_driver\\msedgedriver.exe
+"""
+import argparse
+import configparser
+import os
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import numpy as np
+
+from driver_pool import DriverPool, create_edge_driver
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# 打开时先记录看到的旧状态，再写入新的 cookie / 存储，模拟一次登录留下的痕迹
+STAND_IN_PAGE = b"""<!doctype html>
+<html><head><meta charset="utf-8"><title>stand-in</title></head>
+<body><input id="legal_login_name"><input id="legal_pswd" type="password">
+<script>
+window.leaked = {cookie: document.cookie, local: localStorage.getItem('job'), session: sessionStorage.getItem('job')};
+document.cookie = 'job=1; path=/';
+localStorage.setItem('job', '1');
+sessionStorage.setItem('job', '1');
+</script></body></html>"""
+
+
+class StandInHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        self.send_response(200)
+        self.send_header('Content-Type', 'text/html; charset=utf-8')
+        self.send_header('Content-Length', str(len(STAND_IN_PAGE)))
+        self.end_headers()
+        self.wfile.write(STAND_IN_PAGE)
+
+    def log_message(self, *args):
+        pass
+
+
+def run_job(driver, url):
+    """
+    一次模拟任务：打开替身页面、另开一个标签页，返回页面看到的上一个任务的残留状态（没有残留时为空列表）。
+    """
+    driver.get(url)
+    leaked = driver.execute_script('return window.leaked')
+    driver.switch_to.new_window('tab')
+    driver.get(url)
+    return [name for name, value in leaked.items() if value]
+
+
+def main():
+    config = configparser.ConfigParser()
+    config.read(os.path.join(ROOT, 'config.ini'), encoding='utf-8')
+
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--driver', default=os.path.join(ROOT, config.get('DEFAULT', 'EDGE_DRIVER_PATH',
+                                                                          fallback='msedgedriver')))
+    parser.add_argument('--jobs', type=int, default=10)
+    parser.add_argument('--size', type=int, default=1, help='浏览器池大小')
+    parser.add_argument('--max-jobs', type=int, default=5, help='每个浏览器最多执行的任务数')
+    parser.add_argument('--cold-jobs', type=int, default=3, help='单独启动浏览器的对照任务数')
+    args = parser.parse_args()
+
+    server = ThreadingHTTPServer(('127.0.0.1', 0), StandInHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    url = f'http://127.0.0.1:{server.server_address[1]}/login'
+
+    def factory():
+        return create_edge_driver(args.driver, headless=True)
+
+    cold = []
+    for _ in range(args.cold_jobs):
+        start = time.perf_counter()
+        driver = factory()
+        run_job(driver, url)
+        driver.quit()
+        cold.append((time.perf_counter() - start) * 1000)
+
+    pool = DriverPool(factory, size=args.size, max_jobs=args.max_jobs, reset_origins=[url])
+    pool.start(wait=True)
+    checkouts, totals, leaks = [], [], 0
+    for _ in range(args.jobs):
+        start = time.perf_counter()
+        with pool.checkout(timeout=120) as driver:
+            checkouts.append((time.perf_counter() - start) * 1000)
+            leaked = run_job(driver, url)
+            if leaked:
+                leaks += 1
+                print(f'残留状态: {leaked}')
+        totals.append((time.perf_counter() - start) * 1000)
+    metrics = pool.metrics()
+    pool.close()
+    server.shutdown()
+
+    print(f"{'mode':>10} | {'jobs':>5} | {'p50 ms':>9} | {'p95 ms':>9}")
+    print(f"{'cold':>10} | {len(cold):>5} | {np.percentile(cold, 50):9.1f} | {np.percentile(cold, 95):9.1f}")
+    print(f"{'pool':>10} | {len(totals):>5} | {np.percentile(totals, 50):9.1f} | {np.percentile(totals, 95):9.1f}")
+    print(f"pool checkout p50 {np.percentile(checkouts, 50):.1f}ms, p95 {np.percentile(checkouts, 95):.1f}ms; "
+          f"jobs with leaked state: {leaks}")
+    print(metrics)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,75 @@
+"""
+传统方法缺口检测对比：在标注数据集上比较 GapDetector 和 SliderV2（ONNX）的延迟与命中率，
+并按置信度阈值列出 GapDetector 作为第一级时能直接回答的比例、其中的正确率，以及两级组合后的整体结果。
+
+运行（在项目根目录）:
+    python -m benchmarks.gap_detector_benchmark --dataset labelled-captcha
+    python -m benchmarks.gap_detector_benchmark --dataset labelled-captcha --thresholds 0.2 0.3 0.4 --skip-model
+"""
+import argparse
+import time
+
+import cv2
+import numpy as np
+
+from captcha_recognizer.dataset import GAP_X_TOLERANCE, load_labelled_dataset
+from captcha_recognizer.gap_detector import GAP_DETECTOR_THRESHOLD, GapDetector
+from captcha_recognizer.slider import SliderV2
+
+
+def run(identify, samples):
+    """
+    返回每张图的耗时（ms）、缺口 x 误差（没有结果时为 inf）和置信度。
+    """
+    timings, errors, confs = [], [], []
+    for img, gap_x in samples:
+        start = time.perf_counter()
+        box, conf = identify(img)
+        timings.append((time.perf_counter() - start) * 1000)
+        errors.append(abs(float(box[0]) - gap_x) if len(box) else np.inf)
+        confs.append(float(conf))
+    return np.array(timings), np.array(errors), np.array(confs)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--dataset', required=True, help='标注数据集目录（包含 labels.csv）')
+    parser.add_argument('--tolerance', type=float, default=GAP_X_TOLERANCE, help='缺口 x 允许的误差（像素）')
+    parser.add_argument('--thresholds', type=float, nargs='+', default=[0.2, GAP_DETECTOR_THRESHOLD, 0.4, 0.5])
+    parser.add_argument('--skip-model', action='store_true', help='不运行 SliderV2，只评估 GapDetector')
+    args = parser.parse_args()
+
+    samples = [(cv2.imread(sample.path), sample.gap_x) for sample in load_labelled_dataset(args.dataset)]
+    print(f'{len(samples)} labelled images, tolerance {args.tolerance}px')
+
+    detector = GapDetector()
+    detector.identify(samples[0][0])
+    results = {'classical': run(detector.identify, samples)}
+    if not args.skip_model:
+        model = SliderV2()
+        model.identify(samples[0][0])
+        results['onnx'] = run(model.identify, samples)
+
+    print(f"{'engine':>10} | {'p50':>9} | {'p95':>9} | solve rate")
+    for name, (timings, errors, _) in results.items():
+        print(f'{name:>10} | {np.percentile(timings, 50):7.3f}ms | {np.percentile(timings, 95):7.3f}ms | '
+              f'{(errors <= args.tolerance).mean():.1%}')
+
+    timings, errors, confs = results['classical']
+    solved = errors <= args.tolerance
+    print(f"\n{'threshold':>9} | {'answered':>8} | {'precision':>9}" + (' | cascade solve | cascade mean' if
+                                                                         'onnx' in results else ''))
+    for threshold in args.thresholds:
+        answered = confs >= threshold
+        precision = f'{solved[answered].mean():.1%}' if answered.any() else '-'
+        row = f'{threshold:>9.2f} | {answered.mean():>8.1%} | {precision:>9}'
+        if 'onnx' in results:
+            model_timings, model_errors, _ = results['onnx']
+            cascade_solved = np.where(answered, solved, model_errors <= args.tolerance)
+            cascade_time = timings + np.where(answered, 0, model_timings)
+            row += f' | {cascade_solved.mean():>13.1%} | {cascade_time.mean():10.3f}ms'
+        print(row)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,66 @@
+"""
+NMS 微基准：按候选框数量扫描，对比 SliderV2 各 NMS 实现的耗时和结果是否与 greedy 一致。
+
+运行（在项目根目录）:
+    python -m benchmarks.nms_benchmark
+    python -m benchmarks.nms_benchmark --counts 100 1000 5000 --repeat 20
+"""
+import argparse
+import time
+
+import numpy as np
+
+from captcha_recognizer.slider import IOU_THRESHOLD, SliderV2
+
+METHODS = ('greedy', 'fast', 'cv2')
+
+
+def make_candidates(n, rng, img_w=640, img_h=640, objects=6):
+    """
+    生成与模型输出相似的候选框：若干个目标，每个目标周围有大量抖动的重叠框。
+    """
+    centers = rng.uniform([40, 40], [img_w - 40, img_h - 40], size=(objects, 2))
+    sizes = rng.uniform(30, 70, size=(objects, 2))
+    owner = rng.integers(0, objects, size=n)
+    xy = centers[owner] + rng.normal(0, 6, size=(n, 2))
+    wh = sizes[owner] * rng.uniform(0.85, 1.15, size=(n, 2))
+    boxes = np.concatenate((xy - wh / 2, xy + wh / 2), axis=1).astype(np.float32)
+    scores = rng.uniform(0.25, 1.0, size=n).astype(np.float32)
+    return boxes, scores
+
+
+def bench(fn, repeat):
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = fn()
+        timings.append(time.perf_counter() - start)
+    return float(np.median(timings)) * 1000, result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--counts', type=int, nargs='+', default=[50, 200, 1000, 3000, 8400])
+    parser.add_argument('--iou', type=float, default=IOU_THRESHOLD)
+    parser.add_argument('--repeat', type=int, default=10)
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(args.seed)
+    model = SliderV2()
+
+    print(f"{'candidates':>10} | " + ' | '.join(f'{m:>16}' for m in METHODS) + ' | same as greedy')
+    for n in args.counts:
+        boxes, scores = make_candidates(n, rng)
+        row = []
+        picks = {}
+        for method in METHODS:
+            ms, keep = bench(lambda: model.nms(boxes, scores, args.iou, method=method), args.repeat)
+            picks[method] = set(keep.tolist())
+            row.append(f'{ms:9.3f}ms/{len(keep):>4}')
+        same = ', '.join(f"{m}={'yes' if picks[m] == picks['greedy'] else 'no'}" for m in METHODS[1:])
+        print(f'{n:>10} | ' + ' | '.join(f'{r:>16}' for r in row) + f' | {same}')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,62 @@
+"""
+预处理基准：对比 SliderV2.preprocess（原实现）与复用缓冲区的 Preprocessor 的耗时、内存分配和输出是否一致。
+
+运行（在项目根目录）:
+    python -m benchmarks.preprocess_benchmark
+    python -m benchmarks.preprocess_benchmark --sizes 160x320 344x590 --imgsz 640 --repeat 200
+"""
+import argparse
+import time
+import tracemalloc
+
+import numpy as np
+
+from captcha_recognizer.preprocess import Preprocessor
+from captcha_recognizer.slider import SliderV2
+
+
+def parse_size(text):
+    h, w = text.lower().split('x')
+    return int(h), int(w)
+
+
+def bench(fn, img, new_shape, repeat):
+    fn(img, new_shape)  # 预热，让缓存和缓冲区先建立起来
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn(img, new_shape)
+        timings.append(time.perf_counter() - start)
+
+    tracemalloc.start()
+    fn(img, new_shape)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return float(np.median(timings)) * 1000, peak / 1024
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--sizes', type=parse_size, nargs='+', default=[(160, 320), (155, 310), (344, 590)],
+                        help='输入图片尺寸，格式为 HxW')
+    parser.add_argument('--imgsz', type=int, default=640)
+    parser.add_argument('--repeat', type=int, default=100)
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(0)
+    model = SliderV2()
+    engine = Preprocessor()
+    new_shape = (args.imgsz, args.imgsz)
+
+    print(f"{'input':>9} | {'legacy':>20} | {'preprocessor':>20} | {'speedup':>7} | identical")
+    for h, w in args.sizes:
+        img = rng.integers(0, 256, size=(h, w, 3), dtype=np.uint8)
+        legacy_ms, legacy_kb = bench(model.preprocess, img, new_shape, args.repeat)
+        engine_ms, engine_kb = bench(engine, img, new_shape, args.repeat)
+        identical = np.array_equal(model.preprocess(img, new_shape), engine(img, new_shape))
+        print(f'{h:>4}x{w:<4} | {legacy_ms:7.3f}ms {legacy_kb:8.0f}KiB | {engine_ms:7.3f}ms {engine_kb:8.0f}KiB | '
+              f'{legacy_ms / engine_ms:6.1f}x | {identical}')
+
+
+if __name__ == '__main__':
+    main()
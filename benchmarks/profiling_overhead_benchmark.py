@@ -0,0 +1,70 @@
+"""
+识别埋点开销基准：对比未启用埋点（默认 Profiler）和启用 StatsProfiler 时 SliderV2.identify 的单次耗时，
+以及单独测量空埋点每个阶段的调用开销。
+
+运行（在项目根目录）:
+    python -m benchmarks.profiling_overhead_benchmark
+    python -m benchmarks.profiling_overhead_benchmark --image test.png --iterations 200
+"""
+import argparse
+import time
+
+import cv2
+import numpy as np
+
+from captcha_recognizer.profiling import Profiler, StatsProfiler, set_profiler
+from captcha_recognizer.session import SLIDER_V2_MODEL_PATH, SliderSession
+from captcha_recognizer.slider import SliderV2
+
+
+def time_identify(model: SliderV2, img: np.ndarray, iterations: int) -> np.ndarray:
+    latencies = []
+    for _ in range(iterations):
+        start = time.perf_counter()
+        model.identify(img)
+        latencies.append((time.perf_counter() - start) * 1000)
+    return np.array(latencies)
+
+
+def null_stage_cost(iterations: int = 1_000_000) -> float:
+    """
+    未启用埋点时一次 trace.stage() 进出的耗时（纳秒）。
+    """
+    trace = Profiler().trace('slider-v2')
+    start = time.perf_counter()
+    for _ in range(iterations):
+        with trace.stage('preprocess'):
+            pass
+    return (time.perf_counter() - start) / iterations * 1e9
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--model', default=SLIDER_V2_MODEL_PATH)
+    parser.add_argument('--image', help='背景图路径，默认使用随机噪声图')
+    parser.add_argument('--iterations', type=int, default=100)
+    args = parser.parse_args()
+
+    img = cv2.imread(args.image) if args.image else np.random.randint(0, 255, (160, 320, 3), dtype=np.uint8)
+    model = SliderV2(model=SliderSession(args.model))
+    model.identify(img)
+
+    print(f"null stage enter/exit: {null_stage_cost():.0f} ns")
+    print(f"{'profiler':<10} | {'p50 ms':>8} | {'p95 ms':>8} | {'mean ms':>8}")
+    stats = StatsProfiler()
+    # 交替测量，减少机器负载波动的影响
+    results = {'disabled': [], 'stats': []}
+    for _ in range(5):
+        for name, profiler in (('disabled', None), ('stats', stats)):
+            set_profiler(profiler)
+            results[name].append(time_identify(model, img, args.iterations // 5 or 1))
+    set_profiler(None)
+    for name, values in results.items():
+        values = np.concatenate(values)
+        print(f'{name:<10} | {np.percentile(values, 50):>8.3f} | {np.percentile(values, 95):>8.3f} | '
+              f'{values.mean():>8.3f}')
+    print(stats.metrics())
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,124 @@
+"""
+slider-v1 后处理微基准：对比逐行 Python 解码（原实现）和 Recognizer.decode 向量化解码的耗时，
+并检查两者解码出的候选框和滑块-缺口匹配结果是否一致。
+
+模型文件存在时，另外报告 Recognizer.predict 单次调用的端到端耗时。
+
+运行（在项目根目录）:
+    python -m benchmarks.recognizer_decode_benchmark
+    python -m benchmarks.recognizer_decode_benchmark --conf 0.1 --repeat 200
+"""
+import argparse
+import os
+import time
+
+import cv2
+import numpy as np
+
+from captcha_recognizer.recognizer import CONF_THRESHOLD, INPUT_SIZE, SLIDER_V1_MODEL_PATH, Recognizer
+
+
+def legacy_decode(outputs, scale, conf):
+    """
+    原 Recognizer.predict 中的逐行解码。
+
+    原实现直接对一维数组调用 minMaxLoc，OpenCV 4.x 把它当作列向量，5.x 当作行向量（类别 id 恒为 0），
+    这里显式转成列向量，按 4.x 下的行为作为参照。
+    """
+    outputs = np.array([cv2.transpose(outputs[0])])
+    boxes, scores, class_ids = [], [], []
+    for i in range(outputs.shape[1]):
+        classes_scores = outputs[0][i][4:].reshape(-1, 1)
+        (minScore, maxScore, minClassLoc, (x, maxClassIndex)) = cv2.minMaxLoc(classes_scores)
+        if maxScore >= conf:
+            boxes.append([
+                int((outputs[0][i][0] - (0.5 * outputs[0][i][2])) * scale),
+                int((outputs[0][i][1] - (0.5 * outputs[0][i][3])) * scale),
+                int((outputs[0][i][0] + (0.5 * outputs[0][i][2])) * scale),
+                int((outputs[0][i][1] + (0.5 * outputs[0][i][3])) * scale),
+            ])
+            scores.append(maxScore)
+            class_ids.append(maxClassIndex)
+    return boxes, scores, class_ids
+
+
+def legacy_nearest(slider, others):
+    """
+    原 identify_target_boxes_by_screenshot 中的逐个比较。
+    """
+    box_nearest = min_box_diff = None
+    for box in others:
+        box_diff = Recognizer.calculate_difference(slider, box)
+        if not min_box_diff:
+            min_box_diff, box_nearest = box_diff, box
+            continue
+        if box_diff < min_box_diff:
+            min_box_diff, box_nearest = box_diff, box
+    return box_nearest
+
+
+def make_outputs(rng, classes=3, objects=6):
+    """
+    生成与 slider-v1 输出形状相同的 (1, 4 + 类别数, N) 张量：大部分候选框置信度很低，目标附近有一簇高置信度候选框。
+    """
+    anchors = sum((INPUT_SIZE // stride) ** 2 for stride in (8, 16, 32))
+    xywh = np.concatenate((rng.uniform(0, INPUT_SIZE, (anchors, 2)), rng.uniform(10, 80, (anchors, 2))), axis=1)
+    class_scores = rng.uniform(0, 0.05, (anchors, classes))
+    hot = rng.choice(anchors, size=objects * 15, replace=False)
+    class_scores[hot, rng.integers(0, classes, hot.size)] = rng.uniform(0.2, 0.95, hot.size)
+    return np.concatenate((xywh, class_scores), axis=1).T[None].astype(np.float32)
+
+
+def bench(fn, repeat):
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = fn()
+        timings.append(time.perf_counter() - start)
+    return float(np.median(timings)) * 1000, result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--conf', type=float, default=CONF_THRESHOLD)
+    parser.add_argument('--scale', type=float, default=680 / INPUT_SIZE)
+    parser.add_argument('--samples', type=int, default=20, help='随机生成的输出张量数量')
+    parser.add_argument('--repeat', type=int, default=50)
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--image', help='端到端计时使用的图片，默认使用灰色假图')
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(args.seed)
+    legacy_ms, vectorized_ms, mismatches = [], [], 0
+    for _ in range(args.samples):
+        outputs = make_outputs(rng)
+        ms, (boxes, scores, class_ids) = bench(lambda: legacy_decode(outputs, args.scale, args.conf), args.repeat)
+        legacy_ms.append(ms)
+        ms, decoded = bench(lambda: Recognizer.decode(outputs, args.scale, args.conf), args.repeat)
+        vectorized_ms.append(ms)
+
+        same = (decoded[0].tolist() == boxes and decoded[2].tolist() == class_ids
+                and np.allclose(decoded[1], scores))
+        if same and len(boxes) > 1:
+            others = [{'box': box} for box in boxes[1:]]
+            nearest = legacy_nearest({'box': boxes[0]}, others)
+            same = nearest is others[int(Recognizer.calculate_differences(boxes[0], boxes[1:]).argmin())]
+        mismatches += not same
+
+    print(f'decode, {args.samples} outputs x {args.repeat} runs (median per call)')
+    print(f'  per-row loop : {np.median(legacy_ms):8.3f}ms')
+    print(f'  vectorized   : {np.median(vectorized_ms):8.3f}ms  ({np.median(legacy_ms) / np.median(vectorized_ms):.1f}x)')
+    print(f'  mismatches   : {mismatches}')
+
+    if not os.path.isfile(SLIDER_V1_MODEL_PATH):
+        print(f'{SLIDER_V1_MODEL_PATH} 不存在，跳过端到端计时')
+        return
+    recognizer = Recognizer()
+    img = cv2.imread(args.image) if args.image else np.full((344, 680, 3), 114, np.uint8)
+    recognizer.predict(source=img, conf=args.conf)
+    ms, detections = bench(lambda: recognizer.predict(source=img, conf=args.conf), args.repeat)
+    print(f'Recognizer.predict end to end: {ms:.3f}ms, {len(detections)} detections')
+
+
+if __name__ == '__main__':
+    main()
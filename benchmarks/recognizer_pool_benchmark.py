@@ -0,0 +1,80 @@
+"""
+slider-v1 Net 池并发基准：固定数量的线程持续调用 Recognizer.predict，按池大小扫描吞吐量和借出等待。
+
+OpenCV 自身也会在单次推理内部使用多线程，与外部线程叠加会互相争抢 CPU，
+可以用 --cv-threads 限制每次推理的线程数，观察池大小带来的并行收益。
+
+运行（在项目根目录）:
+    python -m benchmarks.recognizer_pool_benchmark
+    python -m benchmarks.recognizer_pool_benchmark --threads 8 --pool-sizes 1 2 4 8 --cv-threads 1
+"""
+import argparse
+import os
+import threading
+import time
+
+import cv2
+import numpy as np
+
+from captcha_recognizer.recognizer import SLIDER_V1_MODEL_PATH, NetPool, Recognizer
+
+
+def run(pool, img, threads, duration):
+    """
+    threads 个线程在 duration 秒内循环执行与 Recognizer.predict 相同的预处理、借出推理和解码，返回完成的调用数。
+    """
+    deadline = time.perf_counter() + duration
+    counts = [0] * threads
+
+    def worker(slot):
+        while time.perf_counter() < deadline:
+            blob, scale = Recognizer.preprocess(img)
+            with pool.checkout() as net:
+                net.setInput(blob)
+                outputs = net.forward()
+            Recognizer.decode(outputs, scale)
+            counts[slot] += 1
+
+    workers = [threading.Thread(target=worker, args=(slot,)) for slot in range(threads)]
+    for thread in workers:
+        thread.start()
+    for thread in workers:
+        thread.join()
+    return sum(counts)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--model', default=SLIDER_V1_MODEL_PATH)
+    parser.add_argument('--image', help='识别使用的图片，默认使用灰色假图')
+    parser.add_argument('--threads', type=int, default=os.cpu_count() or 4)
+    parser.add_argument('--pool-sizes', type=int, nargs='+', default=[1, 2, 4])
+    parser.add_argument('--duration', type=float, default=5.0, help='每种池大小的压测时长（秒）')
+    parser.add_argument('--cv-threads', type=int, help='cv2.setNumThreads，默认不修改')
+    args = parser.parse_args()
+
+    if args.cv_threads is not None:
+        cv2.setNumThreads(args.cv_threads)
+    img = cv2.imread(args.image) if args.image else np.full((344, 680, 3), 114, np.uint8)
+
+    print(f'{args.threads} threads, {args.duration:.0f}s per pool size, cv2 threads {cv2.getNumThreads()}')
+    print(f"{'pool size':>9} | {'calls/s':>9} | {'speedup':>7} | {'waits':>7} | {'mean wait':>9}")
+    baseline = None
+    for size in args.pool_sizes:
+        pool = NetPool(lambda: cv2.dnn.readNetFromONNX(args.model), size)
+        # 预先创建并预热所有实例，避免加载耗时计入吞吐量
+        with pool.checkout():
+            pass
+        run(pool, img, size, 0.5)
+        before = pool.metrics()
+        calls = run(pool, img, args.threads, args.duration)
+        metrics = pool.metrics()
+        waits = metrics['waits'] - before['waits']
+        wait_ms = (metrics['wait_time_ms'] - before['wait_time_ms']) / waits if waits else 0.0
+        throughput = calls / args.duration
+        baseline = baseline or throughput
+        print(f'{size:>9} | {throughput:9.1f} | {throughput / baseline:6.2f}x | {waits:>7} | {wait_ms:7.2f}ms')
+
+
+if __name__ == '__main__':
+    main()
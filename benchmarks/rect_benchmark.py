@@ -0,0 +1,81 @@
+"""
+矩形输入对比：在标注数据集上比较正方形输入（SliderV2 640x640、slider-v1 416x416）和
+按原图尺寸选择的矩形输入的延迟 p50/p95 与缺口 x 误差。
+
+矩形输入要求模型以动态输入尺寸导出；输入尺寸固定的模型在 rect 模式下仍使用固定尺寸，结果与 square 相同。
+
+运行（在项目根目录）:
+    python -m benchmarks.rect_benchmark --dataset labelled-captcha
+    python -m benchmarks.rect_benchmark --dataset labelled-captcha --models slider-v2 --rect-shapes 320x640 384x640
+"""
+import argparse
+from collections import Counter
+
+import cv2
+
+from benchmarks.variant_benchmark import evaluate
+from captcha_recognizer.dataset import GAP_X_TOLERANCE, load_labelled_dataset
+from captcha_recognizer.preprocess import rect_shape
+from captcha_recognizer.recognizer import INPUT_SIZE, Recognizer
+from captcha_recognizer.slider import IMGSZ, RECT_MAX_SIZE, SliderV2
+
+
+def slider_v2_modes(rect_shapes):
+    square = SliderV2(imgsz=IMGSZ)
+    rect = SliderV2(imgsz='rect', rect_shapes=rect_shapes)
+    square.model.warmup()
+    return {
+        'square': (square.identify, lambda shape: square.input_shape([shape])),
+        'rect': (rect.identify, lambda shape: rect.input_shape([shape])),
+    }
+
+
+def slider_v1_modes(rect_shapes):
+    recognizer = Recognizer()
+    return {
+        'square': (lambda img: recognizer.identify_gap(img, rect=False), lambda shape: (INPUT_SIZE, INPUT_SIZE)),
+        'rect': (lambda img: recognizer.identify_gap(img, rect=True), lambda shape: rect_shape(shape, INPUT_SIZE)),
+    }
+
+
+MODELS = {
+    'slider-v2': slider_v2_modes,
+    'slider-v1': slider_v1_modes,
+}
+
+
+def parse_shape(value):
+    h, w = value.lower().split('x')
+    return int(h), int(w)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--dataset', required=True, help='标注数据集目录（包含 labels.csv）')
+    parser.add_argument('--models', nargs='+', default=list(MODELS), choices=list(MODELS))
+    parser.add_argument('--rect-shapes', nargs='+', type=parse_shape,
+                        help=f'SliderV2 rect 模式可选的输入尺寸（HxW），默认按原图对齐，长边上限 {RECT_MAX_SIZE}')
+    parser.add_argument('--tolerance', type=float, default=GAP_X_TOLERANCE, help='缺口 x 允许的误差（像素）')
+    args = parser.parse_args()
+
+    samples = [(cv2.imread(sample.path), sample.gap_x) for sample in load_labelled_dataset(args.dataset)]
+    print(f'{len(samples)} labelled images, tolerance {args.tolerance}px')
+    print(f"{'model':>10} {'mode':>7} | {'input shapes':>24} | {'p50':>9} | {'p95':>9} | {'mean err':>8} | solve rate")
+
+    for model_name in args.models:
+        for mode, (identify, input_shape) in MODELS[model_name](args.rect_shapes).items():
+            shapes = Counter()
+            for img, _ in samples:
+                shape = input_shape(img.shape[:2])
+                if shape not in shapes:
+                    # 预热当前模式会用到的每种输入尺寸，避免首次分配计入延迟
+                    identify(img)
+                shapes[shape] += 1
+            stats = evaluate(identify, samples, args.tolerance)
+            shape_desc = ', '.join(f'{h}x{w}' for (h, w), _ in shapes.most_common(2))
+            print(f"{model_name:>10} {mode:>7} | {shape_desc:>24} | {stats['p50']:7.2f}ms | {stats['p95']:7.2f}ms | "
+                  f"{stats['mean_error']:8.2f} | {stats['solve_rate']:.1%}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,75 @@
+"""
+micro-batching 调度基准：N 个线程并发识别，对比直接调用 SliderV2.identify 和经过 BatchScheduler 合批的
+吞吐量、单次延迟 p50/p95 和平均 batch 大小，用于选择合适的窗口和最大 batch。
+
+运行（在项目根目录）:
+    python -m benchmarks.scheduler_benchmark
+    python -m benchmarks.scheduler_benchmark --threads 8 --windows 2 5 10 --max-batch 8 --image test.png
+"""
+import argparse
+import threading
+import time
+
+import cv2
+import numpy as np
+
+from captcha_recognizer.scheduler import BATCH_MAX_SIZE, BatchScheduler
+from captcha_recognizer.session import SLIDER_V2_MODEL_PATH, SliderSession
+from captcha_recognizer.slider import SliderV2
+
+
+def run(identify, img, threads, duration):
+    """
+    threads 个线程在 duration 秒内循环识别，返回每次调用的延迟（ms）。
+    """
+    deadline = time.perf_counter() + duration
+    latencies = [[] for _ in range(threads)]
+
+    def worker(slot):
+        while time.perf_counter() < deadline:
+            start = time.perf_counter()
+            identify(img)
+            latencies[slot].append((time.perf_counter() - start) * 1000)
+
+    workers = [threading.Thread(target=worker, args=(slot,)) for slot in range(threads)]
+    for thread in workers:
+        thread.start()
+    for thread in workers:
+        thread.join()
+    return np.concatenate([np.array(values) for values in latencies])
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--model', default=SLIDER_V2_MODEL_PATH)
+    parser.add_argument('--image', help='识别使用的图片，默认使用灰色假图')
+    parser.add_argument('--threads', type=int, default=4)
+    parser.add_argument('--windows', type=float, nargs='+', default=[1, 5, 10], help='合批窗口（毫秒）')
+    parser.add_argument('--max-batch', type=int, default=BATCH_MAX_SIZE)
+    parser.add_argument('--duration', type=float, default=5.0)
+    args = parser.parse_args()
+
+    session = SliderSession(args.model)
+    session.warmup()
+    model = SliderV2(model=session)
+    img = cv2.imread(args.image) if args.image else np.full((160, 320, 3), 114, np.uint8)
+    model.identify(img)
+
+    print(f'{args.threads} threads, {args.duration:.0f}s per mode, max batch {args.max_batch}')
+    print(f"{'mode':>12} | {'calls/s':>8} | {'p50':>9} | {'p95':>9} | {'mean batch':>10} | {'mean wait':>9}")
+    latencies = run(model.identify, img, args.threads, args.duration)
+    print(f"{'direct':>12} | {len(latencies) / args.duration:8.1f} | {np.percentile(latencies, 50):7.2f}ms | "
+          f"{np.percentile(latencies, 95):7.2f}ms | {'-':>10} | {'-':>9}")
+
+    for window in args.windows:
+        scheduler = BatchScheduler(model, window=window / 1000, max_batch=args.max_batch)
+        latencies = run(scheduler.identify, img, args.threads, args.duration)
+        metrics = scheduler.metrics()
+        scheduler.close()
+        print(f"{f'{window:g}ms window':>12} | {len(latencies) / args.duration:8.1f} | "
+              f"{np.percentile(latencies, 50):7.2f}ms | {np.percentile(latencies, 95):7.2f}ms | "
+              f"{metrics['mean_batch_size']:>10} | {metrics['mean_wait_ms']:7.2f}ms")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,64 @@
+"""
+onnxruntime 会话参数基准：对每组参数报告会话创建耗时（无缓存 / 命中优化模型缓存）和推理延迟 p50/p95。
+
+运行（在项目根目录）:
+    python -m benchmarks.session_profile_benchmark
+    python -m benchmarks.session_profile_benchmark --model captcha_recognizer/models/slider-v2.onnx --repeat 50
+"""
+import argparse
+import tempfile
+import time
+
+import numpy as np
+
+from captcha_recognizer.session import SLIDER_V2_MODEL_PATH, SessionProfile, SliderSession
+
+PROFILES = {
+    'default': SessionProfile(),
+    'threads-1': SessionProfile(intra_op_threads=1, inter_op_threads=1),
+    'threads-2': SessionProfile(intra_op_threads=2, inter_op_threads=1),
+    'threads-4': SessionProfile(intra_op_threads=4, inter_op_threads=1),
+    'parallel-2x2': SessionProfile(intra_op_threads=2, inter_op_threads=2, execution_mode='parallel'),
+    'opt-basic': SessionProfile(optimization_level='basic'),
+    'opt-extended': SessionProfile(optimization_level='extended'),
+    'opt-disable': SessionProfile(optimization_level='disable'),
+}
+
+
+def load(model_path, profile):
+    start = time.perf_counter()
+    model = SliderSession(model_path, profile)
+    return model, (time.perf_counter() - start) * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--model', default=SLIDER_V2_MODEL_PATH)
+    parser.add_argument('--imgsz', type=int, default=640)
+    parser.add_argument('--repeat', type=int, default=30)
+    parser.add_argument('--profiles', nargs='+', default=list(PROFILES), choices=list(PROFILES))
+    args = parser.parse_args()
+
+    dummy = np.random.default_rng(0).random((1, 3, args.imgsz, args.imgsz), dtype=np.float32)
+
+    print(f"{'profile':>14} | {'startup':>9} | {'cached startup':>14} | {'p50':>9} | {'p95':>9}")
+    for name in args.profiles:
+        with tempfile.TemporaryDirectory() as cache_dir:
+            profile = PROFILES[name]._replace(optimized_model_dir=cache_dir)
+            # 第一次创建会话会写入优化模型缓存，第二次直接加载缓存
+            model, startup_ms = load(args.model, profile)
+            cached_model, cached_ms = load(args.model, profile)
+            cached = f'{cached_ms:12.1f}ms' if cached_model.optimized_cache == 'hit' else f"{'n/a':>14}"
+
+            model.run(dummy)
+            timings = []
+            for _ in range(args.repeat):
+                start = time.perf_counter()
+                model.run(dummy)
+                timings.append((time.perf_counter() - start) * 1000)
+            p50, p95 = np.percentile(timings, [50, 95])
+            print(f'{name:>14} | {startup_ms:7.1f}ms | {cached} | {p50:7.2f}ms | {p95:7.2f}ms')
+
+
+if __name__ == '__main__':
+    main()
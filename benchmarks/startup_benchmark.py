@@ -0,0 +1,143 @@
+"""
+冷启动基准：在全新的子进程中测量 app.py 及各重量级依赖的导入耗时，列出 app 导入链上最慢的模块，
+可选启动 app.py 测量从启动到 /api/health 可用、到后台预热完成的时间。结果可写成 JSON 跟踪变化，
+超过预算时以非零状态退出。
+
+运行（在项目根目录）:
+    python -m benchmarks.startup_benchmark
+    python -m benchmarks.startup_benchmark --repeat 5 --max-app-import-ms 800 --json startup.json
+    python -m benchmarks.startup_benchmark --serve
+"""
+import argparse
+import configparser
+import json
+import os
+import subprocess
+import sys
+import time
+import urllib.request
+
+import numpy as np
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+MODULES = ('app', 'flask', 'selenium.webdriver', 'captcha_recognizer.slider', 'onnxruntime', 'cv2', 'numpy',
+           'shapely', 'win32print')
+
+TIMER = "import time; t = time.perf_counter(); import {module}; print((time.perf_counter() - t) * 1000)"
+
+
+def import_ms(module: str):
+    """
+    在新的解释器中导入 module，返回耗时（毫秒）；导入失败返回错误信息。
+    """
+    result = subprocess.run([sys.executable, '-c', TIMER.format(module=module)], cwd=ROOT,
+                            capture_output=True, text=True)
+    if result.returncode != 0:
+        return None, result.stderr.strip().splitlines()[-1] if result.stderr.strip() else 'failed'
+    return float(result.stdout.strip().splitlines()[-1]), None
+
+
+def slowest_imports(module: str, top: int):
+    """
+    用 -X importtime 导入 module，返回累计耗时最长的直接依赖 [(名称, 毫秒)]。
+    """
+    result = subprocess.run([sys.executable, '-X', 'importtime', '-c', f'import {module}'], cwd=ROOT,
+                            capture_output=True, text=True)
+    entries = []
+    for line in result.stderr.splitlines():
+        if not line.startswith('import time:') or '|' not in line:
+            continue
+        _, cumulative, name = line.split('|', 2)
+        if not cumulative.strip().isdigit():
+            continue
+        # 名称前的缩进表示嵌套层级，只保留被 module 直接导入的顶层模块
+        depth = (len(name) - len(name.lstrip()) - 1) // 2
+        if depth == 1:
+            entries.append((name.strip(), int(cumulative) / 1000))
+    return sorted(entries, key=lambda entry: -entry[1])[:top]
+
+
+def time_serve(timeout: float):
+    """
+    启动 app.py，返回 (health 可用耗时, 预热完成耗时)，单位毫秒；超时为 None。
+    """
+    config = configparser.ConfigParser()
+    config.read(os.path.join(ROOT, 'config.ini'), encoding='utf-8')
+    port = config.getint('DEFAULT', 'PORT', fallback=8848)
+    url = f'http://127.0.0.1:{port}/api/health'
+
+    start = time.perf_counter()
+    process = subprocess.Popen([sys.executable, 'app.py'], cwd=ROOT, stdout=subprocess.DEVNULL,
+                               stderr=subprocess.DEVNULL)
+    healthy = warmed = None
+    try:
+        while time.perf_counter() - start < timeout and process.poll() is None:
+            try:
+                with urllib.request.urlopen(url, timeout=1) as response:
+                    body = json.loads(response.read())
+                elapsed = (time.perf_counter() - start) * 1000
+                healthy = healthy or elapsed
+                if body.get('warmup') == 'done':
+                    warmed = elapsed
+                    break
+            except OSError:
+                pass
+            time.sleep(0.02)
+    finally:
+        process.terminate()
+        process.wait(timeout=10)
+    return healthy, warmed
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--modules', nargs='+', default=list(MODULES))
+    parser.add_argument('--repeat', type=int, default=3, help='每个模块测量的次数（取中位数）')
+    parser.add_argument('--top', type=int, default=10, help='列出 app 导入链上最慢的模块数')
+    parser.add_argument('--serve', action='store_true', help='启动 app.py 测量 health 可用和预热完成的时间')
+    parser.add_argument('--serve-timeout', type=float, default=120)
+    parser.add_argument('--max-app-import-ms', type=float, help='app 导入耗时预算，超过时以非零状态退出')
+    parser.add_argument('--json', help='把结果写入该 JSON 文件')
+    args = parser.parse_args()
+
+    result = {'python': sys.version.split()[0], 'imports': {}}
+    print(f"{'module':>28} | {'median':>9} | {'min':>9}")
+    for module in args.modules:
+        samples, error = [], None
+        for _ in range(args.repeat):
+            ms, error = import_ms(module)
+            if ms is None:
+                break
+            samples.append(ms)
+        if not samples:
+            print(f'{module:>28} | 导入失败: {error}')
+            result['imports'][module] = {'error': error}
+            continue
+        median, minimum = float(np.median(samples)), float(np.min(samples))
+        print(f'{module:>28} | {median:7.1f}ms | {minimum:7.1f}ms')
+        result['imports'][module] = {'median_ms': round(median, 1), 'min_ms': round(minimum, 1)}
+
+    if 'app' in args.modules and 'error' not in result['imports'].get('app', {}):
+        result['app_slowest'] = slowest_imports('app', args.top)
+        print('\napp 导入链上最慢的直接依赖:')
+        for name, ms in result['app_slowest']:
+            print(f'{name:>28} | {ms:7.1f}ms')
+
+    if args.serve:
+        healthy, warmed = time_serve(args.serve_timeout)
+        result['serve'] = {'health_ms': healthy and round(healthy, 1), 'warmup_done_ms': warmed and round(warmed, 1)}
+        print(f"\napp.py: health 可用 {result['serve']['health_ms']}ms, 预热完成 {result['serve']['warmup_done_ms']}ms")
+
+    if args.json:
+        with open(args.json, 'w', encoding='utf-8') as f:
+            json.dump(result, f, indent=2, ensure_ascii=False)
+
+    app_ms = result['imports'].get('app', {}).get('median_ms')
+    if args.max_app_import_ms is not None and (app_ms is None or app_ms > args.max_app_import_ms):
+        print(f'app 导入耗时 {app_ms}ms 超出预算 {args.max_app_import_ms}ms')
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,97 @@
+"""
+模型精度变体对比：在标注数据集上报告每个变体的延迟 p50/p95、内存占用和缺口 x 误差。
+
+数据集格式见 captcha_recognizer.dataset.load_labelled_dataset。变体文件需先用
+python -m captcha_recognizer.quantize 生成，不存在的变体会被跳过。
+
+运行（在项目根目录）:
+    python -m benchmarks.variant_benchmark --dataset labelled-captcha
+    python -m benchmarks.variant_benchmark --dataset labelled-captcha --models slider-v2 --tolerance 3
+"""
+import argparse
+import gc
+import os
+import time
+
+import cv2
+import numpy as np
+
+from captcha_recognizer.dataset import GAP_X_TOLERANCE, load_labelled_dataset
+from captcha_recognizer.memory import rss_bytes
+from captcha_recognizer.recognizer import SLIDER_V1_MODEL_PATH, Recognizer
+from captcha_recognizer.session import SLIDER_V2_MODEL_PATH, SessionProfile, SliderSession
+from captcha_recognizer.slider import SliderV2
+from captcha_recognizer.variants import MODEL_VARIANTS, variant_path
+
+
+def load_slider_v2(variant):
+    model = SliderSession(SLIDER_V2_MODEL_PATH, SessionProfile(variant=variant))
+    model.warmup()
+    return SliderV2(model=model).identify
+
+
+def load_slider_v1(variant):
+    net = Recognizer.load_model(variant)
+    recognizer = Recognizer()
+    return lambda img: recognizer.identify_gap(img, model=net)
+
+
+MODELS = {
+    'slider-v2': (SLIDER_V2_MODEL_PATH, load_slider_v2),
+    'slider-v1': (SLIDER_V1_MODEL_PATH, load_slider_v1),
+}
+
+
+def evaluate(identify, samples, tolerance):
+    timings, errors = [], []
+    for img, gap_x in samples:
+        start = time.perf_counter()
+        box, _ = identify(img)
+        timings.append((time.perf_counter() - start) * 1000)
+        errors.append(abs(float(box[0]) - gap_x) if len(box) else np.inf)
+    errors = np.array(errors)
+    found = errors[np.isfinite(errors)]
+    return {
+        'p50': float(np.percentile(timings, 50)),
+        'p95': float(np.percentile(timings, 95)),
+        'mean_error': float(found.mean()) if found.size else float('nan'),
+        'solve_rate': float((errors <= tolerance).mean()),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--dataset', required=True, help='标注数据集目录（包含 labels.csv）')
+    parser.add_argument('--models', nargs='+', default=list(MODELS), choices=list(MODELS))
+    parser.add_argument('--variants', nargs='+', default=list(MODEL_VARIANTS), choices=list(MODEL_VARIANTS))
+    parser.add_argument('--tolerance', type=float, default=GAP_X_TOLERANCE, help='缺口 x 允许的误差（像素）')
+    args = parser.parse_args()
+
+    samples = [(cv2.imread(sample.path), sample.gap_x) for sample in load_labelled_dataset(args.dataset)]
+    print(f'{len(samples)} labelled images, tolerance {args.tolerance}px')
+    print(f"{'model':>10} {'variant':>12} | {'file':>8} | {'rss':>8} | {'p50':>9} | {'p95':>9} | "
+          f"{'mean err':>8} | solve rate")
+
+    for model_name in args.models:
+        model_path, load = MODELS[model_name]
+        for variant in args.variants:
+            path = variant_path(model_path, variant)
+            if not os.path.isfile(path):
+                print(f'{model_name:>10} {variant:>12} | 未生成，跳过')
+                continue
+
+            gc.collect()
+            rss_before = rss_bytes()
+            identify = load(variant)
+            rss_after = rss_bytes()
+            rss = f'{(rss_after - rss_before) / 1024 / 1024:6.1f}MB' if rss_before is not None else f"{'n/a':>8}"
+
+            result = evaluate(identify, samples, args.tolerance)
+            print(f'{model_name:>10} {variant:>12} | {os.path.getsize(path) / 1024 / 1024:6.1f}MB | {rss} | '
+                  f"{result['p50']:7.2f}ms | {result['p95']:7.2f}ms | {result['mean_error']:6.2f}px | "
+                  f"{result['solve_rate']:.1%}")
+            del identify
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,293 @@
+"""
+SliderV2 识别基准：按阶段统计 identify 的耗时分布、内存分配、峰值 RSS 和吞吐量，结果可写成 JSON 用于回归对比。
+
+阶段与 SliderV2.identify 的执行顺序一致:
+    decode               图片解码（传入文件路径时）
+    preprocess           letterbox + 归一化
+    session_run          onnxruntime 推理
+    non_max_suppression  置信度过滤和 NMS
+    postprocess          框坐标还原、构造 SegmentMasks
+    select_box           选出缺口框（不含下面两项）
+    process_mask         计算实例掩膜（只在多于 5 个候选框、需要形状匹配时发生）
+    masks_to_segments    掩膜转轮廓
+
+运行（在项目根目录）:
+    python -m captcha_recognizer.benchmark --images test-image
+    python -m captcha_recognizer.benchmark --synthetic 100 --threads 4 --json bench.json
+    python -m captcha_recognizer.benchmark --synthetic 100 --compare bench.json --max-regression 10
+"""
+import argparse
+import json
+import os
+import platform
+import sys
+import tempfile
+import threading
+import time
+import tracemalloc
+from collections import defaultdict
+from contextlib import contextmanager
+from typing import Callable, Dict, List, Optional
+
+import cv2
+import numpy as np
+import onnxruntime as ort
+
+from captcha_recognizer.dataset import list_images, write_synthetic_dataset
+from captcha_recognizer.memory import peak_rss_bytes, rss_bytes
+from captcha_recognizer.session import SLIDER_V2_MODEL_PATH, SessionProfile, SliderSession
+from captcha_recognizer.slider import CONF_THRESHOLD, IOU_THRESHOLD, SegmentMasks, SliderV2
+
+STAGES = ('decode', 'preprocess', 'session_run', 'non_max_suppression', 'postprocess', 'select_box',
+          'process_mask', 'masks_to_segments')
+
+PERCENTILES = (50, 95, 99)
+
+
+class StageTimer:
+    """
+    按阶段累计一张图的耗时，嵌套的阶段从外层阶段中扣除（各阶段时间互不重叠，总和即整体耗时）。
+
+    track_allocations=True 时，另外用 tracemalloc 记录每个最外层阶段的 Python 堆分配峰值（numpy 数组也计入，
+    onnxruntime 内部的分配不计入）。
+    """
+
+    def __init__(self, track_allocations: bool = False):
+        self.track_allocations = track_allocations
+        self.samples: Dict[str, List[float]] = defaultdict(list)
+        self.allocations: Dict[str, List[int]] = defaultdict(list)
+        self._current: Dict[str, float] = defaultdict(float)
+        self._stack: List[float] = []
+
+    @contextmanager
+    def __call__(self, name: str):
+        top_level = not self._stack
+        if self.track_allocations and top_level:
+            tracemalloc.reset_peak()
+            alloc_start = tracemalloc.get_traced_memory()[0]
+        self._stack.append(0.0)
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            elapsed = time.perf_counter() - start
+            self._current[name] += elapsed - self._stack.pop()
+            if self._stack:
+                self._stack[-1] += elapsed
+            if self.track_allocations and top_level:
+                self.allocations[name].append(tracemalloc.get_traced_memory()[1] - alloc_start)
+
+    def wrap(self, name: str, fn: Callable) -> Callable:
+        def timed(*args, **kwargs):
+            with self(name):
+                return fn(*args, **kwargs)
+        return timed
+
+    def finish_image(self):
+        for name, seconds in self._current.items():
+            self.samples[name].append(seconds)
+        self.samples['total'].append(sum(self._current.values()))
+        self._current = defaultdict(float)
+
+
+def staged_identify(model: SliderV2, source, timer: StageTimer, conf=CONF_THRESHOLD, iou=IOU_THRESHOLD):
+    """
+    与 SliderV2.identify 相同的步骤，逐阶段计时。
+    """
+    with timer('decode'):
+        image = model.image_to_array(source)
+    with timer('preprocess'):
+        imgsz = model.input_shape([image.shape])
+        imgsz = (imgsz, imgsz) if isinstance(imgsz, int) else imgsz
+        prep_img = model.preprocessor(image, imgsz)
+    with timer('session_run'):
+        preds, protos = model.model.run(prep_img)
+    with timer('non_max_suppression'):
+        pred = model.non_max_suppression(preds, conf, iou, nc=len(model.classes), nms_method=model.nms_method)[0]
+    with timer('postprocess'):
+        pred[:, :4] = model.scale_boxes(prep_img.shape[2:], pred[:, :4], image.shape)
+        masks = SegmentMasks(protos[0], pred[:, 6:], pred[:, :4], image.shape[:2])
+        boxes = pred[:, :6]
+    # 掩膜按需计算，把实例上的方法换成计时版本，统计 select_box 内部的耗时
+    masks.roi = timer.wrap('process_mask', masks.roi)
+    masks.segment = timer.wrap('masks_to_segments', masks.segment)
+    with timer('select_box'):
+        result = model.select_box(boxes, masks)
+    timer.finish_image()
+    return result
+
+
+def summarize(values: List[float], scale: float = 1000.0) -> Dict:
+    values = np.asarray(values, dtype=np.float64) * scale
+    summary = {f'p{p}': round(float(np.percentile(values, p)), 4) for p in PERCENTILES}
+    summary['mean'] = round(float(values.mean()), 4)
+    summary['count'] = int(values.size)
+    return summary
+
+
+def run_stages(model: SliderV2, sources: List, repeat: int) -> Dict:
+    timer = StageTimer()
+    mismatches = 0
+    for _ in range(repeat):
+        for source in sources:
+            result = staged_identify(model, source, timer)
+            mismatches += result != model.identify(source)
+    stages = {name: summarize(timer.samples[name]) for name in (*STAGES, 'total') if timer.samples.get(name)}
+    return {'stages': stages, 'mismatches': mismatches}
+
+
+def run_allocations(model: SliderV2, sources: List) -> Dict:
+    timer = StageTimer(track_allocations=True)
+    tracemalloc.start()
+    try:
+        for source in sources:
+            staged_identify(model, source, timer)
+    finally:
+        tracemalloc.stop()
+    return {name: {'peak_kb_p50': round(float(np.percentile(values, 50)) / 1024, 1),
+                   'peak_kb_max': round(max(values) / 1024, 1)}
+            for name, values in timer.allocations.items()}
+
+
+def run_throughput(model: SliderV2, sources: List, threads: int, repeat: int) -> Dict:
+    """
+    threads 个线程共享同一个模型，分摊 repeat 轮全部图片，返回每秒处理的图片数和单次延迟。
+    """
+    jobs = [source for _ in range(repeat) for source in sources]
+    latencies: List[float] = []
+    lock = threading.Lock()
+
+    def worker(chunk):
+        local = []
+        for source in chunk:
+            start = time.perf_counter()
+            model.identify(source)
+            local.append(time.perf_counter() - start)
+        with lock:
+            latencies.extend(local)
+
+    workers = [threading.Thread(target=worker, args=(jobs[slot::threads],)) for slot in range(threads)]
+    start = time.perf_counter()
+    for thread in workers:
+        thread.start()
+    for thread in workers:
+        thread.join()
+    elapsed = time.perf_counter() - start
+    return {'threads': threads, 'images_per_second': round(len(jobs) / elapsed, 2), 'latency_ms': summarize(latencies)}
+
+
+def compare(result: Dict, baseline: Dict, max_regression: Optional[float]) -> bool:
+    """
+    打印与基线的差异（正数表示变慢），返回是否有指标超过 max_regression（百分比）。
+    """
+    regressed = False
+    print(f"\n{'compare with baseline':<28} | {'baseline':>10} | {'current':>10} | {'change':>8}")
+
+    def row(label, old, new, lower_is_better=True):
+        nonlocal regressed
+        if not old:
+            return
+        change = (new - old) / old * 100 if lower_is_better else (old - new) / old * 100
+        flag = ''
+        if max_regression is not None and change > max_regression:
+            regressed, flag = True, '  <-- regression'
+        print(f'{label:<28} | {old:>10.3f} | {new:>10.3f} | {change:>+7.1f}%{flag}')
+
+    for name, stats in result['stages'].items():
+        old = baseline.get('stages', {}).get(name)
+        if old:
+            row(f'{name} p50 ms', old['p50'], stats['p50'])
+            row(f'{name} p95 ms', old['p95'], stats['p95'])
+    old_throughput = {entry['threads']: entry for entry in baseline.get('throughput', [])}
+    for entry in result['throughput']:
+        old = old_throughput.get(entry['threads'])
+        if old:
+            row(f"{entry['threads']} thread(s) img/s", old['images_per_second'], entry['images_per_second'],
+                lower_is_better=False)
+    return regressed
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    source = parser.add_mutually_exclusive_group(required=True)
+    source.add_argument('--images', help='图片目录')
+    source.add_argument('--synthetic', type=int, metavar='N', help='生成 N 张合成验证码（离线使用）')
+    parser.add_argument('--model', default=SLIDER_V2_MODEL_PATH)
+    parser.add_argument('--variant', default='fp32')
+    parser.add_argument('--imgsz', default='640', help="模型输入尺寸，整数或 'rect'")
+    parser.add_argument('--threads', type=int, default=os.cpu_count() or 4, help='多线程吞吐量测试的线程数')
+    parser.add_argument('--repeat', type=int, default=3, help='每张图片的重复次数')
+    parser.add_argument('--alloc-samples', type=int, default=20, help='统计内存分配时使用的图片数（tracemalloc 较慢）')
+    parser.add_argument('--in-memory', action='store_true', help='预先解码图片，不计入 decode 阶段')
+    parser.add_argument('--json', help='把结果写入该 JSON 文件')
+    parser.add_argument('--compare', help='与之前写出的 JSON 结果对比')
+    parser.add_argument('--max-regression', type=float, help='任一指标比基线差超过该百分比时以非零状态退出')
+    args = parser.parse_args()
+
+    if args.synthetic:
+        directory = tempfile.mkdtemp(prefix='captcha-bench-')
+        paths = [sample.path for sample in write_synthetic_dataset(directory, args.synthetic)]
+    else:
+        paths = list_images(args.images)
+    if not paths:
+        parser.error('没有找到图片')
+    sources = [cv2.imread(path) for path in paths] if args.in_memory else paths
+
+    rss_before = rss_bytes()
+    session = SliderSession(args.model, SessionProfile(variant=args.variant))
+    session.warmup()
+    model = SliderV2(model=session, imgsz=args.imgsz if args.imgsz == 'rect' else int(args.imgsz))
+    model.identify(sources[0])
+
+    stage_result = run_stages(model, sources, args.repeat)
+    allocations = run_allocations(model, sources[:args.alloc_samples])
+    throughput = [run_throughput(model, sources, threads, args.repeat)
+                  for threads in sorted({1, max(args.threads, 1)})]
+
+    peak_rss = peak_rss_bytes()
+    result = {
+        'meta': {
+            'timestamp': time.strftime('%Y-%m-%dT%H:%M:%S'),
+            'python': sys.version.split()[0],
+            'platform': platform.platform(),
+            'onnxruntime': ort.__version__,
+            'opencv': cv2.__version__,
+            'numpy': np.__version__,
+            'model': session.model_path,
+            'imgsz': args.imgsz,
+            'images': len(paths),
+            'repeat': args.repeat,
+        },
+        'stages': stage_result['stages'],
+        'allocations': allocations,
+        'throughput': throughput,
+        'rss_mb': {
+            'before_load': round(rss_before / 1024 / 1024, 1) if rss_before else None,
+            'peak': round(peak_rss / 1024 / 1024, 1) if peak_rss else None,
+        },
+        'mismatches': stage_result['mismatches'],
+    }
+
+    print(f"{len(paths)} images x {args.repeat}, model {session.model_path}")
+    print(f"{'stage':>20} | " + ' | '.join(f'{f"p{p}":>9}' for p in PERCENTILES) + f" | {'calls':>6} | {'alloc p50':>9}")
+    for name, stats in result['stages'].items():
+        alloc = allocations.get(name, {}).get('peak_kb_p50')
+        print(f'{name:>20} | ' + ' | '.join(f"{stats[f'p{p}']:7.3f}ms" for p in PERCENTILES)
+              + f" | {stats['count']:>6} | " + (f'{alloc:7.1f}KB' if alloc is not None else f"{'-':>9}"))
+    for entry in throughput:
+        print(f"{entry['threads']:>2} thread(s): {entry['images_per_second']:8.2f} img/s, "
+              f"p95 {entry['latency_ms']['p95']:.2f}ms")
+    print(f"peak RSS: {result['rss_mb']['peak']} MB, staged/identify mismatches: {result['mismatches']}")
+
+    if args.json:
+        with open(args.json, 'w', encoding='utf-8') as f:
+            json.dump(result, f, indent=2, ensure_ascii=False)
+    if args.compare:
+        with open(args.compare, encoding='utf-8') as f:
+            baseline = json.load(f)
+        if compare(result, baseline, args.max_regression):
+            sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,258 @@
+"""
+验证码识别结果缓存。
+
+门户的滑块背景来自有限的图库，同一张背景会以不同的缺口位置反复出现。缓存分两步判断能否复用：
+
+1. 感知哈希：把背景缩到 9x8 的灰度图做 dHash，缺口只占图片的一小块，缩小后只会翻转少数几位，
+   所以同一背景不论缺口切在哪里，哈希之间的汉明距离都很小，用来快速找出候选条目；
+2. 校验：对比缩略图，整体平均差异和缓存结果所在框区域的差异都足够小才复用。
+   缺口位置不同时，缓存框所在区域在新图里是完整的背景，差异明显，校验失败后重新识别。
+"""
+import logging
+import os
+import threading
+import time
+from collections import OrderedDict
+from pathlib import Path
+from typing import Dict, List, NamedTuple, Optional, Tuple, Union
+
+import cv2
+import numpy as np
+
+from captcha_recognizer.recognizer import Recognizer
+
+logger = logging.getLogger(__name__)
+
+CACHE_SIZE = 512
+
+# 哈希候选的最大汉明距离（64 位）
+HASH_DISTANCE = 12
+
+# 校验用的灰度缩略图尺寸 (width, height)
+THUMBNAIL_SIZE = (96, 48)
+
+# 缩略图整体、缓存框区域的平均灰度差上限
+IMAGE_TOLERANCE = 6.0
+BOX_TOLERANCE = 8.0
+
+
+class CacheEntry(NamedTuple):
+    hash: int
+    shape: Tuple[int, int]
+    thumbnail: np.ndarray
+    box: List[float]
+    conf: float
+
+
+def _gray(image: np.ndarray) -> np.ndarray:
+    return cv2.cvtColor(image, cv2.COLOR_BGR2GRAY) if image.ndim == 3 else image
+
+
+def perceptual_hash(image: np.ndarray) -> int:
+    """
+    64 位 dHash：缩放到 9x8 灰度图后比较水平相邻像素的亮度。
+    """
+    small = cv2.resize(_gray(image), (9, 8), interpolation=cv2.INTER_AREA).astype(np.int16)
+    bits = (small[:, 1:] > small[:, :-1]).flatten()
+    return int(np.packbits(bits).view('>u8')[0])
+
+
+def thumbnail(image: np.ndarray) -> np.ndarray:
+    return cv2.resize(_gray(image), THUMBNAIL_SIZE, interpolation=cv2.INTER_AREA)
+
+
+class ResultCache:
+    """
+    按背景感知哈希索引的识别结果缓存，LRU 淘汰，可选持久化到磁盘（npz 文件）。
+
+    线程安全；lookup/put 只做一次缩放和少量数组运算，开销远小于一次模型推理。
+    """
+
+    def __init__(self, max_size: int = CACHE_SIZE, path: Optional[str] = None, hash_distance: int = HASH_DISTANCE,
+                 image_tolerance: float = IMAGE_TOLERANCE, box_tolerance: float = BOX_TOLERANCE):
+        self.max_size = max_size
+        self.path = path
+        self.hash_distance = hash_distance
+        self.image_tolerance = image_tolerance
+        self.box_tolerance = box_tolerance
+
+        self._lock = threading.Lock()
+        self._entries: 'OrderedDict[int, CacheEntry]' = OrderedDict()
+        self._next_id = 0
+        self._dirty = False
+        self._stats = {'lookups': 0, 'hits': 0, 'misses': 0, 'rejected': 0, 'evictions': 0, 'forgotten': 0}
+
+        if path and os.path.isfile(path):
+            try:
+                self.load(path)
+            except Exception as e:
+                logger.warning(f"识别结果缓存 {path} 读取失败，将重新建立: {e}")
+
+    def _verify(self, entry: CacheEntry, shape: Tuple[int, int], thumb: np.ndarray) -> bool:
+        if entry.shape != shape:
+            return False
+        diff = cv2.absdiff(thumb, entry.thumbnail)
+        if diff.mean() > self.image_tolerance:
+            return False
+        # 缓存框映射到缩略图坐标，外扩一个像素
+        sx, sy = THUMBNAIL_SIZE[0] / shape[1], THUMBNAIL_SIZE[1] / shape[0]
+        x1, y1, x2, y2 = entry.box
+        x1, x2 = max(int(x1 * sx) - 1, 0), min(int(np.ceil(x2 * sx)) + 1, THUMBNAIL_SIZE[0])
+        y1, y2 = max(int(y1 * sy) - 1, 0), min(int(np.ceil(y2 * sy)) + 1, THUMBNAIL_SIZE[1])
+        region = diff[y1:y2, x1:x2]
+        return region.size > 0 and region.mean() <= self.box_tolerance
+
+    def _candidates(self, image_hash: int) -> List[int]:
+        """
+        哈希距离不超过 hash_distance 的条目，按距离从近到远，调用方需持有 self._lock。
+        """
+        distances = ((bin(image_hash ^ entry.hash).count('1'), key) for key, entry in self._entries.items())
+        return [key for distance, key in sorted(distances) if distance <= self.hash_distance]
+
+    def lookup(self, image: np.ndarray) -> Optional[Tuple[List[float], float]]:
+        """
+        查找可复用的结果，返回 (box, box_conf)；没有时返回 None。
+        """
+        image_hash, shape, thumb = perceptual_hash(image), image.shape[:2], thumbnail(image)
+        with self._lock:
+            self._stats['lookups'] += 1
+            candidates = self._candidates(image_hash)
+            for key in candidates:
+                entry = self._entries[key]
+                if self._verify(entry, shape, thumb):
+                    self._entries.move_to_end(key)
+                    self._stats['hits'] += 1
+                    return list(entry.box), entry.conf
+            self._stats['rejected' if candidates else 'misses'] += 1
+        return None
+
+    def put(self, image: np.ndarray, box: List[float], conf: float):
+        """
+        缓存识别结果；已有可以复用到这张图片的条目时替换该条目，不重复添加。
+        """
+        if not len(box):
+            return
+        entry = CacheEntry(perceptual_hash(image), image.shape[:2], thumbnail(image),
+                           [float(v) for v in box], float(conf))
+        with self._lock:
+            key = next((key for key in self._candidates(entry.hash)
+                        if self._verify(self._entries[key], entry.shape, entry.thumbnail)), None)
+            if key is None:
+                key = self._next_id
+                self._next_id += 1
+            self._entries[key] = entry
+            self._entries.move_to_end(key)
+            self._dirty = True
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+                self._stats['evictions'] += 1
+
+    def forget(self, image: np.ndarray) -> int:
+        """
+        删除可以复用到这张图片的条目（例如按缓存结果拖动后验证失败），返回删除的数量。
+        """
+        image_hash, shape, thumb = perceptual_hash(image), image.shape[:2], thumbnail(image)
+        with self._lock:
+            keys = [key for key in self._candidates(image_hash) if self._verify(self._entries[key], shape, thumb)]
+            for key in keys:
+                del self._entries[key]
+            if keys:
+                self._stats['forgotten'] += len(keys)
+                self._dirty = True
+        return len(keys)
+
+    def save(self, path: Optional[str] = None):
+        """
+        把缓存写入 npz 文件（先写临时文件再替换，避免中途退出留下损坏的文件）。
+        """
+        path = path or self.path
+        if not path:
+            return
+        with self._lock:
+            entries = list(self._entries.values())
+            # 先清除标记，写盘期间的新变化会重新标记；写入失败时恢复标记，下次继续尝试
+            self._dirty = False
+        try:
+            os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+            tmp_path = f'{path}.tmp'
+            with open(tmp_path, 'wb') as f:
+                np.savez_compressed(
+                    f,
+                    hashes=np.array([entry.hash for entry in entries], dtype=np.uint64),
+                    shapes=np.array([entry.shape for entry in entries], dtype=np.int32).reshape(-1, 2),
+                    thumbnails=np.array([entry.thumbnail for entry in entries], dtype=np.uint8).reshape(
+                        -1, THUMBNAIL_SIZE[1], THUMBNAIL_SIZE[0]),
+                    boxes=np.array([entry.box for entry in entries], dtype=np.float64).reshape(-1, 4),
+                    confs=np.array([entry.conf for entry in entries], dtype=np.float64),
+                )
+            os.replace(tmp_path, path)
+        except Exception:
+            with self._lock:
+                self._dirty = True
+            raise
+
+    def save_if_dirty(self):
+        if self._dirty:
+            self.save()
+
+    def start_autosave(self, interval: float) -> threading.Thread:
+        """
+        启动后台线程，每 interval 秒把有变化的缓存写盘。进程退出前仍需调用一次 save_if_dirty。
+        """
+        def run():
+            while True:
+                time.sleep(interval)
+                try:
+                    self.save_if_dirty()
+                except Exception as e:
+                    logger.error(f"识别结果缓存写入失败: {e}")
+
+        thread = threading.Thread(target=run, name='result-cache-autosave', daemon=True)
+        thread.start()
+        return thread
+
+    def load(self, path: str):
+        with np.load(path) as data:
+            if data['thumbnails'].shape[1:] != (THUMBNAIL_SIZE[1], THUMBNAIL_SIZE[0]):
+                raise ValueError("缩略图尺寸与当前版本不一致")
+            entries = [CacheEntry(int(h), tuple(int(v) for v in shape), thumb, box.tolist(), float(conf))
+                       for h, shape, thumb, box, conf in zip(data['hashes'], data['shapes'], data['thumbnails'],
+                                                             data['boxes'], data['confs'])]
+        with self._lock:
+            for entry in entries[-self.max_size:]:
+                self._entries[self._next_id] = entry
+                self._next_id += 1
+
+    def metrics(self) -> Dict:
+        with self._lock:
+            stats = dict(self._stats)
+            stats['size'] = len(self._entries)
+        stats['max_size'] = self.max_size
+        stats['hit_rate'] = round(stats['hits'] / stats['lookups'], 4) if stats['lookups'] else None
+        return stats
+
+
+class CachedRecognizer:
+    """
+    在任意识别器（SliderV2、CascadeRecognizer 等）前加一层结果缓存，identify 的参数和返回值不变。
+    """
+
+    def __init__(self, recognizer, cache: ResultCache):
+        self.recognizer = recognizer
+        self.cache = cache
+
+    def identify(self, source: Union[str, Path, bytes, np.ndarray], show=False, **kwargs) -> Tuple[List, float]:
+        image = Recognizer.image_to_array(source)
+        if not show:
+            cached = self.cache.lookup(image)
+            if cached is not None:
+                return cached
+        box, box_conf = self.recognizer.identify(image, show=show, **kwargs)
+        self.cache.put(image, box, box_conf)
+        return box, box_conf
+
+    def forget(self, source: Union[str, Path, bytes, np.ndarray]) -> int:
+        """
+        删除这张图片的缓存结果，按识别结果操作失败时调用，下次遇到同一背景会重新识别。
+        """
+        return self.cache.forget(Recognizer.image_to_array(source))
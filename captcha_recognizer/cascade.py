@@ -0,0 +1,108 @@
+import logging
+import threading
+import time
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple, Union
+
+import numpy as np
+
+from captcha_recognizer.recognizer import Recognizer
+from captcha_recognizer.slider import SliderV2
+
+logger = logging.getLogger(__name__)
+
+# slider-v1 缺口置信度不低于该值时直接采用，否则交给 SliderV2 分割模型
+CASCADE_THRESHOLD = 0.8
+
+
+class CascadeRecognizer:
+    """
+    两级缺口识别：先用轻量的 slider-v1 检测模型（cv2.dnn，只出框），置信度足够时直接返回；
+    没有结果或置信度低于 threshold 的图片再交给 SliderV2 分割模型。
+
+    第一级也可以换成其他提供 identify_gap 的检测器，例如不需要模型的 GapDetector，
+    指标里仍记为 'v1'。
+
+    identify 的参数和返回值与 SliderV2.identify 相同，可以直接替换。
+    """
+
+    def __init__(self, threshold: float = CASCADE_THRESHOLD, detector=None,
+                 segmenter: Optional[SliderV2] = None):
+        self.threshold = threshold
+        self._detector = detector
+        self.segmenter = segmenter or SliderV2()
+
+        self._lock = threading.Lock()
+        self._counts = {'v1': 0, 'v2': 0, 'v1_error': 0}
+        # v1 在所有调用上的总耗时、v2 的调用次数和总耗时，用于估算节省的延迟
+        self._v1_time = 0.0
+        self._v2_calls = 0
+        self._v2_time = 0.0
+
+    @property
+    def detector(self):
+        """
+        第一级检测器，没有传入时在第一次使用时创建共享的 Recognizer；多个线程同时第一次调用时只创建一次。
+        """
+        if self._detector is None:
+            with self._lock:
+                if self._detector is None:
+                    self._detector = Recognizer()
+        return self._detector
+
+    def _detect(self, image: np.ndarray) -> Tuple[List, float]:
+        try:
+            return self.detector.identify_gap(source=image)
+        except Exception as e:
+            # 第一级模型缺失或推理出错时不影响识别，直接走 SliderV2
+            logger.warning(f"第一级检测失败，改用 SliderV2: {e}")
+            with self._lock:
+                self._counts['v1_error'] += 1
+            return [], 0
+
+    def identify(self, source: Union[str, Path, bytes, np.ndarray], show=False, **kwargs) -> Tuple[List, float]:
+        """
+        识别缺口，返回 (box, box_conf)。kwargs（conf、iou 等）只传给 SliderV2。
+        """
+        image = self.segmenter.image_to_array(source)
+        if image is None:
+            raise ValueError("图片解码失败")
+
+        start = time.perf_counter()
+        box, box_conf = self._detect(image)
+        v1_time = time.perf_counter() - start
+
+        if len(box) and box_conf >= self.threshold and not show:
+            with self._lock:
+                self._counts['v1'] += 1
+                self._v1_time += v1_time
+            return list(box), float(box_conf)
+
+        start = time.perf_counter()
+        box, box_conf = self.segmenter.identify(image, show=show, **kwargs)
+        v2_time = time.perf_counter() - start
+        with self._lock:
+            self._counts['v2'] += 1
+            self._v1_time += v1_time
+            self._v2_calls += 1
+            self._v2_time += v2_time
+        return box, box_conf
+
+    def metrics(self) -> Dict:
+        """
+        各级的应答次数、平均耗时，以及相对每张图都直接用 SliderV2 估算节省的总延迟
+        （v1 应答次数 × SliderV2 平均耗时 − 所有调用在 v1 上花费的时间；尚无 SliderV2 样本时为 None）。
+        """
+        with self._lock:
+            calls = self._counts['v1'] + self._counts['v2']
+            v2_mean = self._v2_time / self._v2_calls if self._v2_calls else None
+            saved = self._counts['v1'] * v2_mean - self._v1_time if v2_mean is not None else None
+            return {
+                'threshold': self.threshold,
+                'calls': calls,
+                'tier_counts': dict(self._counts),
+                'v1_rate': round(self._counts['v1'] / calls, 4) if calls else None,
+                'v1_mean_ms': round(self._v1_time / calls * 1000, 2) if calls else None,
+                'v2_mean_ms': round(v2_mean * 1000, 2) if v2_mean is not None else None,
+                'saved_ms': round(saved * 1000, 2) if saved is not None else None,
+            }
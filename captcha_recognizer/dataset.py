@@ -0,0 +1,94 @@
+import csv
+import os
+from typing import List, NamedTuple, Optional, Tuple
+
+import cv2
+import numpy as np
+
+LABELS_FILE = 'labels.csv'
+
+IMAGE_SUFFIXES = ('.png', '.jpg', '.jpeg', '.bmp')
+
+# 识别出的缺口 x 与标注相差不超过该像素数即视为识别正确
+GAP_X_TOLERANCE = 5
+
+
+class LabelledSample(NamedTuple):
+    path: str
+    gap_x: float  # 缺口左边缘在原图中的 x 坐标（像素）
+
+
+def load_labelled_dataset(directory: str) -> List[LabelledSample]:
+    """
+    读取标注好的验证码数据集。
+
+    目录下需要有 labels.csv，表头为 filename,gap_x，filename 为相对该目录的图片路径，
+    gap_x 为缺口左边缘的 x 坐标（与 identify 返回的 box[0] 对应）。
+    """
+    labels_path = os.path.join(directory, LABELS_FILE)
+    if not os.path.isfile(labels_path):
+        raise FileNotFoundError(f"标注文件不存在: {labels_path}")
+
+    samples = []
+    with open(labels_path, newline='', encoding='utf-8') as f:
+        for row in csv.DictReader(f):
+            samples.append(LabelledSample(os.path.join(directory, row['filename']), float(row['gap_x'])))
+    return samples
+
+
+def list_images(directory: str) -> List[str]:
+    """
+    列出目录下的所有图片文件（不递归），按文件名排序。
+    """
+    return sorted(os.path.join(directory, name) for name in os.listdir(directory)
+                  if name.lower().endswith(IMAGE_SUFFIXES))
+
+
+def synthetic_captcha(rng: np.random.Generator, width: int = 320, height: int = 160,
+                      texture: Optional[str] = None) -> Tuple[np.ndarray, int]:
+    """
+    生成一张离线测试用的滑块验证码背景：平滑或高纹理的随机背景上切出一个拼图形状的阴影缺口，
+    返回 (BGR 图片, 缺口左边缘 x)。只用于基准测试和评估流程的冒烟验证，不代表真实验证码的分布。
+    """
+    texture = texture or rng.choice(['smooth', 'busy'])
+    if texture == 'smooth':
+        background = cv2.resize(rng.integers(0, 255, (6, 12, 3), dtype=np.uint8), (width, height),
+                                interpolation=cv2.INTER_CUBIC)
+        background = cv2.GaussianBlur(background, (0, 0), 4)
+    else:
+        background = cv2.resize(rng.integers(0, 255, (40, 80, 3), dtype=np.uint8), (width, height),
+                                interpolation=cv2.INTER_LINEAR)
+
+    size = int(height * rng.uniform(0.25, 0.32))
+    x = int(rng.uniform(size * 1.3, width - size - 5))
+    y = int(rng.uniform(5, height - size - 5))
+    mask = np.zeros((height, width), np.uint8)
+    cv2.rectangle(mask, (x, y), (x + size - 1, y + size - 1), 255, -1)
+    cv2.circle(mask, (x + size // 2, y), size // 6, 255, -1)
+    cv2.circle(mask, (x + size - 1, y + size // 2), size // 6, 255, -1)
+
+    image = background.copy()
+    image[mask > 0] = (image[mask > 0] * 0.5).astype(np.uint8)
+    contours, _ = cv2.findContours(mask, cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_NONE)
+    cv2.drawContours(image, contours, -1, (220, 220, 220), 1)
+    return image, int(cv2.boundingRect(mask)[0])
+
+
+def write_synthetic_dataset(directory: str, count: int, seed: int = 0, width: int = 320,
+                            height: int = 160) -> List[LabelledSample]:
+    """
+    生成 count 张合成验证码和 labels.csv，格式与 load_labelled_dataset 读取的一致。
+    """
+    os.makedirs(directory, exist_ok=True)
+    rng = np.random.default_rng(seed)
+    samples = []
+    with open(os.path.join(directory, LABELS_FILE), 'w', newline='', encoding='utf-8') as f:
+        writer = csv.writer(f)
+        writer.writerow(['filename', 'gap_x'])
+        for index in range(count):
+            image, gap_x = synthetic_captcha(rng, width, height)
+            filename = f'synthetic_{index:04d}.png'
+            cv2.imwrite(os.path.join(directory, filename), image)
+            writer.writerow([filename, gap_x])
+            samples.append(LabelledSample(os.path.join(directory, filename), float(gap_x)))
+    return samples
@@ -0,0 +1,247 @@
+"""
+标注数据集上的离线评估：用进程池并行运行 SliderV2.identify / Recognizer.identify_gap，报告缺口 x 的识别准确率、
+单次识别延迟分布，以及按登录流程的重试逻辑（识别失败就刷新验证码，最多 max_retry 次）需要的重试次数。
+任一模型超出准确率或延迟预算时以非零状态退出，可以放进 CI 或发版前检查。
+
+数据集格式见 captcha_recognizer.dataset.load_labelled_dataset；没有真实数据时可以用 --synthetic 生成合成验证码
+（只能验证流程，准确率不代表真实验证码）。
+
+单次延迟在子进程内测量（从图片字节开始，含解码），多个子进程共享 CPU 时延迟会偏高，
+评估延迟预算时建议 --workers 1。
+
+运行（在项目根目录）:
+    python -m captcha_recognizer.evaluate --dataset labelled-captcha
+    python -m captcha_recognizer.evaluate --dataset labelled-captcha --models slider-v2 --workers 4 \\
+        --min-accuracy 0.95 --max-p95-ms 80 --json eval.json
+    python -m captcha_recognizer.evaluate --synthetic 200
+"""
+import argparse
+import json
+import multiprocessing
+import os
+import sys
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, List, NamedTuple, Optional, Sequence
+
+import numpy as np
+
+from captcha_recognizer.dataset import GAP_X_TOLERANCE, LabelledSample, load_labelled_dataset, \
+    write_synthetic_dataset
+
+EVALUATE_MODELS = ('slider-v2', 'slider-v1')
+
+# 与 app.py 中 MAX_RETRY 的默认值一致：一次登录最多识别的次数
+MAX_RETRY = 5
+
+PERCENTILES = (50, 95, 99)
+
+# 子进程内的识别函数，由 _init_worker 创建
+_identify = None
+
+
+class SampleResult(NamedTuple):
+    path: str
+    gap_x: float
+    box_x: Optional[float]  # 识别出的缺口左边缘，没有结果时为 None
+    conf: float
+    latency_ms: float
+    error: Optional[str] = None
+
+
+def _init_worker(model: str, options: Dict):
+    global _identify
+    if model == 'slider-v2':
+        from captcha_recognizer.session import SessionProfile, SliderSession
+        from captcha_recognizer.slider import SliderV2
+
+        session = SliderSession(options['model_path'], SessionProfile(variant=options['variant'],
+                                                                      intra_op_threads=options['threads']))
+        session.warmup()
+        _identify = SliderV2(model=session, imgsz=options['imgsz']).identify
+    elif model == 'slider-v1':
+        from captcha_recognizer.recognizer import Recognizer
+
+        _identify = Recognizer(variant=options['variant'], rect=options['imgsz'] == 'rect', pool_size=1).identify_gap
+    else:
+        raise ValueError(f"Unsupported model: {model}, valid values are {', '.join(EVALUATE_MODELS)}")
+
+
+def _evaluate_sample(sample: LabelledSample) -> SampleResult:
+    with open(sample.path, 'rb') as f:
+        data = f.read()
+    start = time.perf_counter()
+    try:
+        box, conf = _identify(data)
+    except Exception as e:
+        return SampleResult(sample.path, sample.gap_x, None, 0.0, (time.perf_counter() - start) * 1000,
+                            f'{type(e).__name__}: {e}')
+    latency = (time.perf_counter() - start) * 1000
+    return SampleResult(sample.path, sample.gap_x, float(box[0]) if len(box) else None, float(conf), latency)
+
+
+def run_model(model: str, samples: Sequence[LabelledSample], workers: int, options: Dict) -> List[SampleResult]:
+    """
+    在 workers 个子进程中识别全部样本，按 samples 的顺序返回结果。每个子进程加载一份模型。
+    """
+    ctx = multiprocessing.get_context('spawn')
+    with ProcessPoolExecutor(max_workers=workers, mp_context=ctx, initializer=_init_worker,
+                             initargs=(model, options)) as pool:
+        return list(pool.map(_evaluate_sample, samples, chunksize=max(len(samples) // (workers * 4), 1)))
+
+
+def simulate_retries(solved: Sequence[bool], max_retry: int = MAX_RETRY) -> Dict:
+    """
+    把结果按数据集顺序当作连续的验证码：每次登录依次消耗图片，识别正确即结束，连续 max_retry 次失败算登录失败。
+    返回每次登录的重试次数分布（第一次就成功为 0 次重试）和失败的登录数。
+    """
+    retries, failed, attempt = [], 0, 0
+    for ok in solved:
+        if ok:
+            retries.append(attempt)
+            attempt = 0
+        else:
+            attempt += 1
+            if attempt == max_retry:
+                failed += 1
+                attempt = 0
+    logins = len(retries) + failed
+    histogram: Dict[int, int] = {}
+    for value in retries:
+        histogram[value] = histogram.get(value, 0) + 1
+    return {
+        'logins': logins,
+        'failed_logins': failed,
+        'mean_retries': round(float(np.mean(retries)), 3) if retries else None,
+        'max_retries': max(retries) if retries else None,
+        'retry_histogram': dict(sorted(histogram.items())),
+    }
+
+
+def summarize(results: Sequence[SampleResult], tolerance: float, max_retry: int) -> Dict:
+    latencies = np.array([result.latency_ms for result in results], dtype=np.float64)
+    errors = np.array([abs(result.box_x - result.gap_x) if result.box_x is not None else np.inf
+                       for result in results])
+    solved = errors <= tolerance
+    found = errors[np.isfinite(errors)]
+    solve_rate = float(solved.mean()) if len(results) else 0.0
+    return {
+        'samples': len(results),
+        'accuracy': round(solve_rate, 4),
+        'no_result': int(np.isinf(errors).sum()),
+        'errors': sum(result.error is not None for result in results),
+        'mean_x_error': round(float(found.mean()), 3) if found.size else None,
+        'latency_ms': {
+            **{f'p{p}': round(float(np.percentile(latencies, p)), 3) for p in PERCENTILES},
+            'mean': round(float(latencies.mean()), 3),
+            'max': round(float(latencies.max()), 3),
+        } if latencies.size else {},
+        'retries': simulate_retries(solved.tolist(), max_retry),
+        # 假设各次识别相互独立时，一次登录的期望识别次数，以及 max_retry 次全部失败的概率
+        'expected_attempts': round(1 / solve_rate, 3) if solve_rate else None,
+        'login_failure_probability': round((1 - solve_rate) ** max_retry, 6),
+    }
+
+
+def check_budgets(summary: Dict, min_accuracy: Optional[float], max_p50_ms: Optional[float],
+                  max_p95_ms: Optional[float], max_mean_retries: Optional[float]) -> List[str]:
+    """
+    返回超出预算的项（空列表表示全部满足）。
+    """
+    violations = []
+    if min_accuracy is not None and summary['accuracy'] < min_accuracy:
+        violations.append(f"accuracy {summary['accuracy']:.4f} < {min_accuracy}")
+    latency = summary['latency_ms']
+    if max_p50_ms is not None and latency and latency['p50'] > max_p50_ms:
+        violations.append(f"p50 {latency['p50']:.2f}ms > {max_p50_ms}ms")
+    if max_p95_ms is not None and latency and latency['p95'] > max_p95_ms:
+        violations.append(f"p95 {latency['p95']:.2f}ms > {max_p95_ms}ms")
+    mean_retries = summary['retries']['mean_retries']
+    if max_mean_retries is not None and (mean_retries is None or mean_retries > max_mean_retries):
+        violations.append(f"mean retries {mean_retries} > {max_mean_retries}")
+    return violations
+
+
+def main():
+    from captcha_recognizer.session import SLIDER_V2_MODEL_PATH
+
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    source = parser.add_mutually_exclusive_group(required=True)
+    source.add_argument('--dataset', help='标注数据集目录（包含 labels.csv）')
+    source.add_argument('--synthetic', type=int, metavar='N', help='生成 N 张合成验证码（离线使用）')
+    parser.add_argument('--models', nargs='+', default=list(EVALUATE_MODELS), choices=EVALUATE_MODELS)
+    parser.add_argument('--model-path', default=SLIDER_V2_MODEL_PATH, help='SliderV2 模型文件')
+    parser.add_argument('--variant', default='fp32')
+    parser.add_argument('--imgsz', default='640', help="SliderV2 输入尺寸，整数或 'rect'（rect 同时用于 slider-v1）")
+    parser.add_argument('--workers', type=int, default=os.cpu_count() or 1, help='子进程数')
+    parser.add_argument('--threads', type=int, default=1, help='每个子进程的 onnxruntime 算子内线程数')
+    parser.add_argument('--tolerance', type=float, default=GAP_X_TOLERANCE, help='缺口 x 允许的误差（像素）')
+    parser.add_argument('--max-retry', type=int, default=MAX_RETRY, help='一次登录最多识别的次数')
+    parser.add_argument('--min-accuracy', type=float, help='准确率预算（0~1）')
+    parser.add_argument('--max-p50-ms', type=float, help='单次识别 p50 延迟预算')
+    parser.add_argument('--max-p95-ms', type=float, help='单次识别 p95 延迟预算')
+    parser.add_argument('--max-mean-retries', type=float, help='平均重试次数预算')
+    parser.add_argument('--json', help='把结果写入该 JSON 文件')
+    args = parser.parse_args()
+
+    if args.synthetic:
+        samples = write_synthetic_dataset(tempfile.mkdtemp(prefix='captcha-eval-'), args.synthetic)
+    else:
+        samples = load_labelled_dataset(args.dataset)
+    if not samples:
+        parser.error('数据集为空')
+    options = {
+        'model_path': args.model_path,
+        'variant': args.variant,
+        'imgsz': args.imgsz if args.imgsz == 'rect' else int(args.imgsz),
+        'threads': args.threads,
+    }
+
+    print(f"{len(samples)} labelled images, tolerance {args.tolerance}px, {args.workers} worker(s), "
+          f"max retry {args.max_retry}")
+    print(f"{'model':>10} | {'accuracy':>8} | {'p50':>9} | {'p95':>9} | {'p99':>9} | {'img/s':>7} | "
+          f"{'retries':>7} | {'failed':>6} | budget")
+    report, failed = {}, False
+    for model in args.models:
+        start = time.perf_counter()
+        try:
+            results = run_model(model, samples, max(args.workers, 1), options)
+        except Exception as e:
+            print(f'{model:>10} | 加载或运行失败: {type(e).__name__}: {e}')
+            report[model] = {'error': f'{type(e).__name__}: {e}'}
+            failed = True
+            continue
+        elapsed = time.perf_counter() - start
+        summary = summarize(results, args.tolerance, args.max_retry)
+        summary['images_per_second'] = round(len(results) / elapsed, 2)
+        summary['violations'] = check_budgets(summary, args.min_accuracy, args.max_p50_ms, args.max_p95_ms,
+                                              args.max_mean_retries)
+        failed = failed or bool(summary['violations'])
+        report[model] = summary
+
+        latency, retries = summary['latency_ms'], summary['retries']
+        print(f"{model:>10} | {summary['accuracy']:>8.2%} | {latency['p50']:7.2f}ms | {latency['p95']:7.2f}ms | "
+              f"{latency['p99']:7.2f}ms | {summary['images_per_second']:>7.1f} | "
+              f"{retries['mean_retries'] if retries['mean_retries'] is not None else '-':>7} | "
+              f"{retries['failed_logins']:>6} | {'; '.join(summary['violations']) or 'ok'}")
+        if summary['errors']:
+            first = next(result for result in results if result.error is not None)
+            print(f"{'':>10}   {summary['errors']} 张图片识别出错，例如 {first.path}: {first.error}")
+
+    if args.json:
+        with open(args.json, 'w', encoding='utf-8') as f:
+            json.dump({
+                'dataset': args.dataset or f'synthetic:{args.synthetic}',
+                'samples': len(samples),
+                'tolerance': args.tolerance,
+                'max_retry': args.max_retry,
+                'workers': args.workers,
+                'models': report,
+            }, f, indent=2, ensure_ascii=False)
+    if failed:
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
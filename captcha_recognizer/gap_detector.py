@@ -0,0 +1,139 @@
+from pathlib import Path
+from typing import List, Optional, Sequence, Tuple, Union
+
+import cv2
+import numpy as np
+
+from captcha_recognizer.recognizer import Recognizer
+
+# 缩小到该高度后再检测，背景图越大节省越多
+WORK_HEIGHT = 80
+
+# 缺口轮廓方框的线宽（工作尺寸下的像素）
+OUTLINE_THICKNESS = 2
+
+# 候选缺口边长相对背景高度的比例
+GAP_SIZE_RATIOS = (0.22, 0.26, 0.30, 0.34)
+
+# 左侧不搜索的宽度（相对缺口边长），滑块初始位置在这里
+LEFT_MARGIN_RATIO = 1.0
+
+# 作为两级识别第一级时建议的置信度阈值
+GAP_DETECTOR_THRESHOLD = 0.3
+
+# Canny 阈值
+CANNY_LOW = 50
+CANNY_HIGH = 150
+
+# 缺口阴影与周围背景的平均灰度差达到该值时，阴影得分记满
+SHADOW_CONTRAST = 40.0
+
+# 计算阴影对比时内缩、外扩的宽度（相对缺口边长）
+SHADOW_INSET_RATIO = 0.15
+SHADOW_BAND_RATIO = 0.2
+
+
+class GapDetector:
+    """
+    不依赖模型的缺口检测：边缘图与空心方框模板的归一化相关（缺口轮廓），乘以阴影对比得分（缺口内外亮度差）。
+    两项都由积分图计算，每个候选尺寸只需要常数次数组运算。
+
+    identify 的返回值与 SliderV2.identify 相同，置信度在 0~1 之间，可以作为两级识别的第一级，
+    置信度不够时再交给模型（见 GAP_DETECTOR_THRESHOLD）。纹理简单、缺口轮廓清晰的背景大约 1ms 给出结果；
+    纹理复杂的背景置信度会偏低，应交给模型处理。
+    """
+
+    def __init__(self, size_ratios: Sequence[float] = GAP_SIZE_RATIOS, left_margin_ratio: float = LEFT_MARGIN_RATIO,
+                 work_height: int = WORK_HEIGHT):
+        self.size_ratios = tuple(size_ratios)
+        self.left_margin_ratio = left_margin_ratio
+        self.work_height = work_height
+
+    @staticmethod
+    def _box_sums(integral: np.ndarray, offset: int, size: int, count: Tuple[int, int]) -> np.ndarray:
+        """
+        每个候选位置 (y, x) 上，从 (y + offset, x + offset) 开始、边长 size 的方块像素和，结果形状为 count。
+        integral 是四周补了边的图像的积分图，补边宽度已计入 offset。
+        """
+        rows, cols = count
+        y0, x0 = offset, offset
+        return (integral[y0 + size:y0 + size + rows, x0 + size:x0 + size + cols]
+                - integral[y0:y0 + rows, x0 + size:x0 + size + cols]
+                - integral[y0 + size:y0 + size + rows, x0:x0 + cols]
+                + integral[y0:y0 + rows, x0:x0 + cols])
+
+    def detect(self, image: np.ndarray) -> Tuple[List[float], float]:
+        gray = cv2.cvtColor(image, cv2.COLOR_BGR2GRAY) if image.ndim == 3 else image
+        scale = min(self.work_height / gray.shape[0], 1.0)
+        if scale < 1.0:
+            gray = cv2.resize(gray, (max(int(round(gray.shape[1] * scale)), 1), self.work_height),
+                              interpolation=cv2.INTER_AREA)
+        height, width = gray.shape
+        # 边缘取 0/1，方框轮廓上的边缘数和窗口内的边缘数都可以从积分图直接取
+        edges = cv2.Canny(gray, CANNY_LOW, CANNY_HIGH) // 255
+
+        band = max(int(round(max(self.size_ratios) * height * SHADOW_BAND_RATIO)), 1)
+        padded = cv2.copyMakeBorder(gray, band, band, band, band, cv2.BORDER_REFLECT)
+        gray_integral = cv2.integral(padded, sdepth=cv2.CV_32F)
+        edge_integral = cv2.integral(cv2.copyMakeBorder(edges, band, band, band, band, cv2.BORDER_CONSTANT, value=0),
+                                     sdepth=cv2.CV_32F)
+
+        best_box, best_score = [], 0.0
+        # 每个尺寸下各列的最高得分，用于找出与最佳位置不重叠的次优候选
+        column_scores = []
+        for ratio in self.size_ratios:
+            size = int(round(ratio * height))
+            if size <= 2 * OUTLINE_THICKNESS + 2 or size >= width or size > height:
+                continue
+            count = (height - size + 1, width - size + 1)
+
+            # 边缘图与空心方框模板的归一化相关（等价于 TM_CCORR_NORMED）：轮廓上的边缘数 / sqrt(窗口边缘数 * 模板面积)
+            window_edges = self._box_sums(edge_integral, band, size, count)
+            hole = size - 2 * OUTLINE_THICKNESS
+            outline_edges = window_edges - self._box_sums(edge_integral, band + OUTLINE_THICKNESS, hole, count)
+            outline = outline_edges / np.sqrt(np.maximum(window_edges, 1) * (size * size - hole * hole))
+
+            inset = max(int(round(size * SHADOW_INSET_RATIO)), 1)
+            outer = size + 2 * band
+            inner_sum = self._box_sums(gray_integral, band + inset, size - 2 * inset, count)
+            box_sum = self._box_sums(gray_integral, band, size, count)
+            outer_sum = self._box_sums(gray_integral, 0, outer, count)
+            inner_mean = inner_sum / (size - 2 * inset) ** 2
+            ring_mean = (outer_sum - box_sum) / (outer * outer - size * size)
+            # 缺口可能是暗色阴影也可能是亮色蒙层，只看差异大小
+            shadow = np.minimum(np.abs(ring_mean - inner_mean) / SHADOW_CONTRAST, 1.0)
+
+            score = outline * shadow
+            score[:, :min(int(round(size * self.left_margin_ratio)), score.shape[1])] = 0
+            y, x = np.unravel_index(int(score.argmax()), score.shape)
+            column_scores.append(score.max(axis=0))
+            if score[y, x] > best_score:
+                best_score, best_x, best_size = float(score[y, x]), x, size
+                best_box = [x / scale, y / scale, (x + size) / scale, (y + size) / scale]
+
+        if not best_box:
+            return best_box, 0.0
+        # 另一处位置的得分接近最佳时（纹理复杂、多个相似边缘），结果不可靠，按差距折算置信度
+        runner_up = max((float(columns[np.abs(np.arange(len(columns)) - best_x) > best_size / 2].max(initial=0))
+                         for columns in column_scores), default=0.0)
+        return best_box, best_score * (1.0 - runner_up / best_score) ** 0.5
+
+    def identify(self, source: Union[str, Path, bytes, np.ndarray], show=False, **kwargs) -> Tuple[List, float]:
+        """
+        识别缺口，返回 (box, box_conf)，box 为原图坐标的 [x1, y1, x2, y2]，没有候选时为 ([], 0)。
+        """
+        image: Optional[np.ndarray] = Recognizer.image_to_array(source)
+        box, box_conf = self.detect(image)
+        if show and box:
+            sample = image.copy()
+            cv2.rectangle(sample, (int(box[0]), int(box[1])), (int(box[2]), int(box[3])), (0, 0, 255), 2)
+            cv2.imshow('sample', sample)
+            cv2.waitKey(0)
+            cv2.destroyAllWindows()
+        return box, box_conf
+
+    def identify_gap(self, source: Union[str, Path, bytes, np.ndarray], **kwargs) -> Tuple[List, float]:
+        """
+        与 Recognizer.identify_gap 相同的接口，可以作为 CascadeRecognizer 的第一级检测器。
+        """
+        return self.identify(source)
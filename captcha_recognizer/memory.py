@@ -0,0 +1,38 @@
+import os
+import sys
+from typing import Optional
+
+try:
+    import psutil
+except ImportError:  # psutil 为可选依赖
+    psutil = None
+
+
+def rss_bytes() -> Optional[int]:
+    """
+    当前进程的常驻内存（RSS），无法获取时返回 None。
+    """
+    if psutil is not None:
+        return psutil.Process(os.getpid()).memory_info().rss
+    if sys.platform.startswith('linux'):
+        with open('/proc/self/statm') as f:
+            return int(f.read().split()[1]) * os.sysconf('SC_PAGE_SIZE')
+    return None
+
+
+def peak_rss_bytes() -> Optional[int]:
+    """
+    当前进程的峰值常驻内存，无法获取时返回 None。
+    """
+    if psutil is not None:
+        info = psutil.Process(os.getpid()).memory_info()
+        # Windows 上提供 peak_wset，其他平台退回 resource
+        if hasattr(info, 'peak_wset'):
+            return info.peak_wset
+    try:
+        import resource
+    except ImportError:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # macOS 单位是字节，Linux 是 KB
+    return peak if sys.platform == 'darwin' else peak * 1024
@@ -0,0 +1,159 @@
+import threading
+from collections import OrderedDict
+from typing import Callable, List, NamedTuple, Optional, Sequence, Tuple
+
+import cv2
+import numpy as np
+
+PAD_VALUE = 114
+
+# 与 `uint8(114).astype(float32) / 255` 完全相同的填充值
+PAD_VALUE_F32 = np.float32(PAD_VALUE) / np.float32(255)
+
+# 矩形输入的宽高需要对齐的步长（模型最大下采样倍数）
+STRIDE = 32
+
+# 最多缓存多少组 (输入尺寸, 目标尺寸) 的 letterbox 参数
+PLAN_CACHE_SIZE = 64
+
+# 每个线程最多保留的输入缓冲区 / 缩放中转数组个数。矩形输入和批量推理的尺寸会变化，只保留最近使用的，
+# 避免每个线程为出现过的每种 (batch, 尺寸) 都常驻一份整张输入大小的 float32 数组
+BUFFER_CACHE_SIZE = 2
+
+
+def rect_shape(shape: Tuple[int, int], max_size: int, stride: int = STRIDE,
+               buckets: Optional[Sequence[Tuple[int, int]]] = None) -> Tuple[int, int]:
+    """
+    按原图尺寸选择矩形输入 (height, width)：长边超过 max_size 时缩小到 max_size，否则保持原分辨率不放大，
+    再向上对齐到 stride 的倍数，只保留凑整所需的最少填充。
+
+    给定 buckets（预先导出/预热过的若干输入尺寸）时，返回能容纳该尺寸的最小 bucket，
+    没有能容纳的 bucket 则返回最大的一个。
+    """
+    r = min(max_size / max(shape[0], shape[1]), 1.0)
+    h, w = (int(np.ceil(round(dim * r) / stride) * stride) for dim in shape[:2])
+    if not buckets:
+        return h, w
+    fits = [bucket for bucket in buckets if bucket[0] >= h and bucket[1] >= w]
+    return min(fits, key=lambda b: b[0] * b[1]) if fits else max(buckets, key=lambda b: b[0] * b[1])
+
+
+def _lru_get(cache: OrderedDict, key, factory: Callable, max_size: int):
+    value = cache.get(key)
+    if value is None:
+        value = cache[key] = factory()
+        while len(cache) > max_size:
+            cache.popitem(last=False)
+    else:
+        cache.move_to_end(key)
+    return value
+
+
+class LetterboxPlan(NamedTuple):
+    """
+    某个输入尺寸 letterbox 到目标尺寸的缩放和填充参数。
+    """
+    new_unpad: Tuple[int, int]  # 缩放后的 (width, height)
+    top: int
+    left: int
+    # 上下/左右填充取整后之和不等于目标尺寸时，原实现会再整体 resize 一次，这种尺寸不走缓冲区快速路径
+    exact: bool
+
+
+class Preprocessor:
+    """
+    复用输入缓冲区的预处理，输出与 SliderV2.preprocess 逐元素一致。
+
+    验证码图片的尺寸基本固定，所以按 (输入尺寸, 目标尺寸) 缓存 letterbox 参数（最多 PLAN_CACHE_SIZE 组）；
+    每个线程持有自己的 float32 NCHW 缓冲区（最近使用的 BUFFER_CACHE_SIZE 个尺寸），填充区域只在参数变化时重新填写，
+    每帧只把缩放后的图像区域换算后写进缓冲区，不再产生多份整图大小的临时数组。
+
+    返回的数组是线程内复用的缓冲区，在同一线程下一次调用前有效。
+    """
+
+    def __init__(self):
+        self._plans: 'OrderedDict[Tuple, LetterboxPlan]' = OrderedDict()
+        self._plans_lock = threading.Lock()
+        self._local = threading.local()
+
+    @staticmethod
+    def _make_plan(shape: Tuple[int, int], new_shape: Tuple[int, int]) -> LetterboxPlan:
+        # 与 SliderV2.letterbox 相同的计算方式
+        r = min(new_shape[0] / shape[0], new_shape[1] / shape[1])
+        new_unpad = int(round(shape[1] * r)), int(round(shape[0] * r))
+        new_unpad = (max(1, min(new_unpad[0], new_shape[1])),
+                     max(1, min(new_unpad[1], new_shape[0])))
+        dw, dh = float(new_shape[1] - new_unpad[0]), float(new_shape[0] - new_unpad[1])
+        top, left = int(round(dh / 2)), int(round(dw / 2))
+        exact = new_unpad[1] + 2 * top == new_shape[0] and new_unpad[0] + 2 * left == new_shape[1]
+        return LetterboxPlan(new_unpad, top, left, exact)
+
+    def plan(self, shape: Tuple[int, int], new_shape: Tuple[int, int]) -> LetterboxPlan:
+        key = (shape[0], shape[1], new_shape[0], new_shape[1])
+        with self._plans_lock:
+            return _lru_get(self._plans, key, lambda: self._make_plan(shape, new_shape), PLAN_CACHE_SIZE)
+
+    def _buffer(self, batch: int, new_shape: Tuple[int, int]) -> Tuple[np.ndarray, List]:
+        """
+        取当前线程的输入缓冲区和各个 batch 位置上次写入时使用的参数。
+        """
+        buffers = getattr(self._local, 'buffers', None)
+        if buffers is None:
+            buffers = self._local.buffers = OrderedDict()
+        return _lru_get(buffers, (batch, new_shape[0], new_shape[1]),
+                        lambda: (np.empty((batch, 3, new_shape[0], new_shape[1]), dtype=np.float32), [None] * batch),
+                        BUFFER_CACHE_SIZE)
+
+    def _staging(self, new_unpad: Tuple[int, int]) -> np.ndarray:
+        staging = getattr(self._local, 'staging', None)
+        if staging is None:
+            staging = self._local.staging = OrderedDict()
+        return _lru_get(staging, new_unpad, lambda: np.empty((new_unpad[1], new_unpad[0], 3), dtype=np.uint8),
+                        BUFFER_CACHE_SIZE)
+
+    def _write(self, img: np.ndarray, new_shape: Tuple[int, int], out: np.ndarray, slot_plans: List, slot: int):
+        plan = self.plan(img.shape[:2], new_shape)
+
+        if not plan.exact:
+            # 填充取整溢出时与 SliderV2.letterbox 一样：先填充再整体缩放到目标尺寸
+            if img.shape[1::-1] != plan.new_unpad:
+                img = cv2.resize(img, plan.new_unpad, interpolation=cv2.INTER_LINEAR)
+            bottom, right = plan.top, plan.left
+            img = cv2.copyMakeBorder(img, plan.top, bottom, plan.left, right, cv2.BORDER_CONSTANT,
+                                     value=(PAD_VALUE, PAD_VALUE, PAD_VALUE))
+            img = cv2.resize(img, (new_shape[1], new_shape[0]), interpolation=cv2.INTER_LINEAR)
+            np.divide(img[..., ::-1].transpose(2, 0, 1), 255, out=out[slot], casting='unsafe')
+            slot_plans[slot] = None
+            return
+
+        if slot_plans[slot] != plan:
+            out[slot].fill(PAD_VALUE_F32)
+            slot_plans[slot] = plan
+
+        w, h = plan.new_unpad
+        if img.shape[1] != w or img.shape[0] != h:
+            img = cv2.resize(img, plan.new_unpad, dst=self._staging(plan.new_unpad), interpolation=cv2.INTER_LINEAR)
+        roi = out[slot, :, plan.top:plan.top + h, plan.left:plan.left + w]
+        # BGR -> RGB、HWC -> CHW 和归一化在一次写入中完成
+        np.divide(img[..., ::-1].transpose(2, 0, 1), 255, out=roi, casting='unsafe')
+
+    def __call__(self, img: np.ndarray, new_shape: Tuple[int, int]) -> np.ndarray:
+        """
+        预处理单张图片，返回 (1, 3, H, W) 的 float32 数组。
+        """
+        out, slot_plans = self._buffer(1, new_shape)
+        self._write(img, new_shape, out, slot_plans, 0)
+        return out
+
+    def batch(self, imgs: List[np.ndarray], new_shape: Tuple[int, int]) -> np.ndarray:
+        """
+        预处理多张图片，返回 (N, 3, H, W) 的 float32 数组。
+        """
+        out, slot_plans = self._buffer(len(imgs), new_shape)
+        for slot, img in enumerate(imgs):
+            self._write(img, new_shape, out, slot_plans, slot)
+        return out
+
+
+# 进程内共享的默认实例，缓冲区按线程隔离
+default_preprocessor = Preprocessor()
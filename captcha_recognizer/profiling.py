@@ -0,0 +1,226 @@
+"""
+识别热路径的分阶段埋点。
+
+SliderV2 和 Recognizer 每次识别向当前的 Profiler 申请一个 Trace，在各阶段外包一层 trace.stage(name)，
+并记录候选框数量和 select_box 走的分支，识别结束后把 Trace 交给 Profiler.record。
+
+默认的 Profiler 不做任何记录：trace() 返回共享的 NULL_TRACE，stage() 返回共享的空上下文，
+每个阶段只多一次方法调用，不计时、不分配对象。需要统计时用 set_profiler 换成 StatsProfiler，
+或者继承 Profiler 实现 record，把数据接到其他监控系统。
+
+select_box 的分支:
+    none        没有候选框
+    single      只有 1 个候选框，直接采用
+    top_conf    2~5 个候选框，取置信度最高的
+    mask_match  多于 5 个候选框，按滑块形状匹配缺口（需要计算掩膜）
+"""
+import logging
+import threading
+import time
+from collections import Counter, deque
+from typing import Dict, List, Optional
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+# 每个模型、每个阶段保留的最近耗时样本数，用于计算分位数
+PROFILE_SAMPLES = 1024
+
+
+class _NullStage:
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+
+_NULL_STAGE = _NullStage()
+
+
+class NullTrace:
+    """
+    不记录任何内容的 Trace，未启用埋点时使用。
+    """
+    __slots__ = ()
+
+    def stage(self, name: str) -> _NullStage:
+        return _NULL_STAGE
+
+    def note(self, boxes: int, branch: Optional[str] = None):
+        pass
+
+    def finish(self):
+        pass
+
+
+NULL_TRACE = NullTrace()
+
+
+class _Stage:
+    __slots__ = ('trace', 'name', 'start')
+
+    def __init__(self, trace: 'Trace', name: str):
+        self.trace = trace
+        self.name = name
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        stages = self.trace.stages
+        stages[self.name] = stages.get(self.name, 0.0) + time.perf_counter() - self.start
+        return False
+
+
+class Trace:
+    """
+    一次识别（identify_batch 为一个 batch）的埋点数据。
+
+    stages: 阶段名 -> 耗时（秒），同名阶段累加；各阶段互不嵌套
+    boxes: 每张图的候选框数量
+    branches: 每张图 select_box 走的分支（Recognizer 没有分支，为空）
+    """
+    __slots__ = ('profiler', 'model', 'stages', 'boxes', 'branches', 'start', 'total')
+
+    def __init__(self, profiler: 'Profiler', model: str):
+        self.profiler = profiler
+        self.model = model
+        self.stages: Dict[str, float] = {}
+        self.boxes: List[int] = []
+        self.branches: List[str] = []
+        self.start = time.perf_counter()
+        self.total = 0.0
+
+    def stage(self, name: str) -> _Stage:
+        return _Stage(self, name)
+
+    def note(self, boxes: int, branch: Optional[str] = None):
+        self.boxes.append(int(boxes))
+        if branch is not None:
+            self.branches.append(branch)
+
+    def finish(self):
+        self.total = time.perf_counter() - self.start
+        try:
+            self.profiler.record(self)
+        except Exception as e:
+            # 埋点出错不能影响识别
+            logger.warning(f"记录识别埋点失败: {e}")
+
+
+class Profiler:
+    """
+    埋点接口。默认实现不记录，子类重写 record 接收每次识别的 Trace（可能在多个线程中同时调用）。
+    """
+    enabled = False
+
+    def trace(self, model: str):
+        return Trace(self, model) if self.enabled else NULL_TRACE
+
+    def record(self, trace: Trace):
+        pass
+
+    def metrics(self) -> Dict:
+        return {}
+
+
+class StatsProfiler(Profiler):
+    """
+    按模型汇总各阶段耗时（均值、p50、p95）、候选框数量分布和分支计数，并写入日志：
+    每次识别的阶段明细记为 DEBUG，总耗时不低于 slow_ms 的识别记为 WARNING。
+    """
+    enabled = True
+
+    def __init__(self, slow_ms: Optional[float] = None, samples: int = PROFILE_SAMPLES):
+        self.slow_ms = slow_ms
+        self.samples = samples
+        self._lock = threading.Lock()
+        self._models: Dict[str, Dict] = {}
+
+    def _model_stats(self, model: str) -> Dict:
+        stats = self._models.get(model)
+        if stats is None:
+            stats = self._models[model] = {
+                'calls': 0,
+                'images': 0,
+                'slow_calls': 0,
+                'stages': {},
+                'total': deque(maxlen=self.samples),
+                'branches': Counter(),
+                'box_counts': Counter(),
+            }
+        return stats
+
+    def record(self, trace: Trace):
+        total_ms = trace.total * 1000
+        slow = self.slow_ms is not None and total_ms >= self.slow_ms
+        with self._lock:
+            stats = self._model_stats(trace.model)
+            stats['calls'] += 1
+            stats['images'] += len(trace.boxes)
+            stats['slow_calls'] += slow
+            stats['total'].append(total_ms)
+            for name, seconds in trace.stages.items():
+                stage = stats['stages'].get(name)
+                if stage is None:
+                    stage = stats['stages'][name] = {'sum': 0.0, 'count': 0, 'samples': deque(maxlen=self.samples)}
+                stage['sum'] += seconds * 1000
+                stage['count'] += 1
+                stage['samples'].append(seconds * 1000)
+            stats['branches'].update(trace.branches)
+            stats['box_counts'].update(trace.boxes)
+
+        if slow or logger.isEnabledFor(logging.DEBUG):
+            detail = ', '.join(f'{name} {seconds * 1000:.1f}ms' for name, seconds in trace.stages.items())
+            message = (f"{trace.model} 识别耗时 {total_ms:.1f}ms ({detail}); "
+                       f"候选框 {trace.boxes}, 分支 {trace.branches}")
+            if slow:
+                logger.warning(f"识别较慢: {message}")
+            else:
+                logger.debug(message)
+
+    @staticmethod
+    def _percentiles(samples) -> Dict:
+        values = np.fromiter(samples, dtype=np.float64)
+        p50, p95 = np.percentile(values, (50, 95))
+        return {'p50_ms': round(float(p50), 3), 'p95_ms': round(float(p95), 3)}
+
+    def metrics(self) -> Dict:
+        with self._lock:
+            result = {}
+            for model, stats in self._models.items():
+                stages = {}
+                for name, stage in stats['stages'].items():
+                    stages[name] = {'mean_ms': round(stage['sum'] / stage['count'], 3), 'count': stage['count'],
+                                    **self._percentiles(stage['samples'])}
+                result[model] = {
+                    'calls': stats['calls'],
+                    'images': stats['images'],
+                    'slow_calls': stats['slow_calls'],
+                    'total': self._percentiles(stats['total']),
+                    'stages': stages,
+                    'branches': dict(stats['branches']),
+                    'box_counts': dict(sorted(stats['box_counts'].items())),
+                }
+            return result
+
+
+_profiler = Profiler()
+
+
+def get_profiler() -> Profiler:
+    return _profiler
+
+
+def set_profiler(profiler: Optional[Profiler]) -> Profiler:
+    """
+    设置进程内 SliderV2 / Recognizer 默认使用的 Profiler，None 表示关闭埋点；返回原来的 Profiler。
+    """
+    global _profiler
+    previous, _profiler = _profiler, profiler or Profiler()
+    return previous
@@ -0,0 +1,143 @@
+"""
+从自带的 fp32 模型生成低精度变体。
+
+运行（在项目根目录）:
+    python -m captcha_recognizer.quantize --variants int8 fp16
+    python -m captcha_recognizer.quantize --variants int8-static --calibration-dir test-image
+
+生成的文件与原模型放在同一目录，命名见 captcha_recognizer.variants.variant_path，
+之后通过 config.ini 的 [MODEL] VARIANT 选择使用哪个变体。
+
+- int8: 动态量化，只量化权重，不需要校准数据
+- int8-static: 静态量化（QDQ 格式），需要一批验证码图片做激活值校准
+- fp16: 权重和计算转为半精度，输入输出保持 float32
+"""
+import argparse
+import logging
+import os
+from typing import Callable, Dict, Iterator, List, Optional, Tuple
+
+import cv2
+import numpy as np
+
+from captcha_recognizer.dataset import list_images
+from captcha_recognizer.preprocess import Preprocessor
+from captcha_recognizer.recognizer import SLIDER_V1_MODEL_PATH, Recognizer
+from captcha_recognizer.session import SLIDER_V2_MODEL_PATH
+from captcha_recognizer.variants import MODEL_VARIANTS, variant_path
+
+logger = logging.getLogger(__name__)
+
+CALIBRATION_SAMPLES = 64
+
+
+def slider_v2_input(img: np.ndarray) -> np.ndarray:
+    # Preprocessor 返回的是复用的缓冲区，校准数据需要各自独立的拷贝
+    return Preprocessor()(img, (640, 640)).copy()
+
+
+def slider_v1_input(img: np.ndarray) -> np.ndarray:
+    return Recognizer.preprocess(img)[0]
+
+
+# 模型名 -> (fp32 模型路径, 生成校准输入的函数)
+MODELS: Dict[str, Tuple[str, Callable[[np.ndarray], np.ndarray]]] = {
+    'slider-v2': (SLIDER_V2_MODEL_PATH, slider_v2_input),
+    'slider-v1': (SLIDER_V1_MODEL_PATH, slider_v1_input),
+}
+
+
+class ImageCalibrationReader:
+    """
+    onnxruntime 静态量化使用的校准数据读取器，逐张读取图片并按模型的预处理方式生成输入。
+    """
+
+    def __init__(self, model_path: str, images: List[str], make_input: Callable[[np.ndarray], np.ndarray]):
+        import onnxruntime as ort
+
+        self.input_name = ort.InferenceSession(model_path, providers=["CPUExecutionProvider"]).get_inputs()[0].name
+        self.images = images
+        self.make_input = make_input
+        self._iter: Optional[Iterator] = None
+
+    def get_next(self) -> Optional[Dict[str, np.ndarray]]:
+        if self._iter is None:
+            self._iter = iter(self.images)
+        for path in self._iter:
+            img = cv2.imread(path)
+            if img is not None:
+                return {self.input_name: self.make_input(img)}
+        return None
+
+    def rewind(self):
+        self._iter = None
+
+
+def quantize_int8(model_path: str, output_path: str):
+    from onnxruntime.quantization import QuantType, quantize_dynamic
+
+    quantize_dynamic(model_path, output_path, weight_type=QuantType.QUInt8)
+
+
+def quantize_int8_static(model_path: str, output_path: str, images: List[str],
+                         make_input: Callable[[np.ndarray], np.ndarray]):
+    from onnxruntime.quantization import QuantFormat, QuantType, quantize_static
+
+    if not images:
+        raise ValueError("静态量化需要校准图片，请通过 --calibration-dir 指定图片目录")
+    reader = ImageCalibrationReader(model_path, images, make_input)
+    quantize_static(model_path, output_path, reader, quant_format=QuantFormat.QDQ,
+                    activation_type=QuantType.QUInt8, weight_type=QuantType.QInt8)
+
+
+def convert_fp16(model_path: str, output_path: str):
+    # onnxruntime 自带的转换器，不需要额外依赖 onnxconverter-common
+    import onnx
+    from onnxruntime.transformers.float16 import convert_float_to_float16
+
+    model = convert_float_to_float16(onnx.load(model_path), keep_io_types=True)
+    onnx.save(model, output_path)
+
+
+def generate_variant(model_name: str, variant: str, calibration_images: List[str] = ()) -> str:
+    """
+    为指定模型生成一个精度变体，返回生成的文件路径。
+    """
+    model_path, make_input = MODELS[model_name]
+    output_path = variant_path(model_path, variant)
+    if variant == 'int8':
+        quantize_int8(model_path, output_path)
+    elif variant == 'int8-static':
+        quantize_int8_static(model_path, output_path, list(calibration_images), make_input)
+    elif variant == 'fp16':
+        convert_fp16(model_path, output_path)
+    else:
+        raise ValueError(f"无需生成的模型变体: {variant}")
+    return output_path
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--models', nargs='+', default=list(MODELS), choices=list(MODELS))
+    parser.add_argument('--variants', nargs='+', default=['int8', 'fp16'],
+                        choices=[variant for variant in MODEL_VARIANTS if variant != 'fp32'])
+    parser.add_argument('--calibration-dir', help='静态量化使用的校准图片目录')
+    parser.add_argument('--calibration-samples', type=int, default=CALIBRATION_SAMPLES)
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+    images = list_images(args.calibration_dir)[:args.calibration_samples] if args.calibration_dir else []
+
+    for model_name in args.models:
+        for variant in args.variants:
+            try:
+                output_path = generate_variant(model_name, variant, images)
+            except Exception as e:
+                logger.error(f"{model_name} 的 {variant} 变体生成失败: {e}")
+                continue
+            size_mb = os.path.getsize(output_path) / 1024 / 1024
+            logger.info(f"已生成 {model_name} 的 {variant} 变体: {output_path} ({size_mb:.1f} MB)")
+
+
+if __name__ == '__main__':
+    main()
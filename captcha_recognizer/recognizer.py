@@ -1,30 +1,221 @@
+import logging
 import os
+import queue
+import threading
+import time
+from contextlib import contextmanager
+from functools import cached_property
 from pathlib import Path
-from typing import Union
+from typing import Callable, Dict, Iterator, Optional, Tuple, Union
 
 import cv2.dnn
 import numpy as np
 
+from captcha_recognizer.preprocess import rect_shape
+from captcha_recognizer.profiling import NULL_TRACE, get_profiler
+from captcha_recognizer.variants import variant_path
+
+logger = logging.getLogger(__name__)
+
 CONF_THRESHOLD = 0.25
 IOU_THRESHOLD = 0.45
 NMS_THRESHOLD = 0.5
 NAMES = {0: 't', 1: 'f', 2: 's'}
+INPUT_SIZE = 416
+
+# 每个 Recognizer 最多持有的 cv2.dnn.Net 实例数，即可以同时执行推理的线程数
+NET_POOL_SIZE = 2
+
+SLIDER_V1_MODEL_PATH = os.path.join(os.path.dirname(__file__), 'models', 'slider-v1.onnx')
 
 
 class SingletonMeta(type):
+    """
+    每个类只创建一个实例。多个线程同时第一次创建时只有一个线程真正构造（加载模型），其余等待并拿到同一个实例。
+
+    实例已存在时再传入构造参数，会交给实例的 check_arguments 检查，参数不一致时抛出 RuntimeError，而不是忽略。
+    """
     _instances = {}
+    _lock = threading.RLock()
 
     def __call__(cls, *args, **kwargs):
-        if cls not in cls._instances:
-            cls._instances[cls] = super().__call__(*args, **kwargs)
-        return cls._instances[cls]
+        instance = cls._instances.get(cls)
+        if instance is None:
+            with SingletonMeta._lock:
+                instance = cls._instances.get(cls)
+                if instance is None:
+                    instance = cls._instances[cls] = super().__call__(*args, **kwargs)
+                    return instance
+        if args or kwargs:
+            check = getattr(instance, 'check_arguments', None)
+            if check is not None:
+                check(*args, **kwargs)
+        return instance
+
+
+class NetPool:
+    """
+    cv2.dnn.Net 实例池。
+
+    同一个 Net 上的 setInput/forward 不能被多个线程同时调用，所以每次推理从池中借出一个独占的 Net，
+    用完归还。Net 按需创建，最多 size 个；全部借出时调用方阻塞等待。
+    """
+
+    def __init__(self, factory: Callable[[], cv2.dnn.Net], size: int = NET_POOL_SIZE):
+        if size < 1:
+            raise ValueError(f"Net pool size must be at least 1, got {size}")
+        self.factory = factory
+        self.size = size
+        self._idle: queue.LifoQueue = queue.LifoQueue()
+        self._lock = threading.Lock()
+        self._created = 0
+        self._in_use = 0
+        self._checkouts = 0
+        self._waits = 0
+        self._wait_time = 0.0
+
+    def _acquire(self, timeout: Optional[float]) -> cv2.dnn.Net:
+        try:
+            return self._idle.get_nowait()
+        except queue.Empty:
+            pass
+        with self._lock:
+            create = self._created < self.size
+            if create:
+                self._created += 1
+        if create:
+            try:
+                return self.factory()
+            except Exception:
+                with self._lock:
+                    self._created -= 1
+                raise
+
+        start = time.perf_counter()
+        try:
+            net = self._idle.get(timeout=timeout)
+        except queue.Empty:
+            raise TimeoutError(f"No idle cv2.dnn.Net within {timeout}s (pool size {self.size})")
+        with self._lock:
+            self._waits += 1
+            self._wait_time += time.perf_counter() - start
+        return net
+
+    @contextmanager
+    def checkout(self, timeout: Optional[float] = None) -> Iterator[cv2.dnn.Net]:
+        """
+        借出一个 Net，with 块结束时归还。
+        """
+        net = self._acquire(timeout)
+        with self._lock:
+            self._in_use += 1
+            self._checkouts += 1
+        try:
+            yield net
+        finally:
+            with self._lock:
+                self._in_use -= 1
+            self._idle.put(net)
+
+    def metrics(self) -> Dict:
+        with self._lock:
+            return {
+                'size': self.size,
+                'created': self._created,
+                'in_use': self._in_use,
+                'checkouts': self._checkouts,
+                'waits': self._waits,
+                'wait_time_ms': round(self._wait_time * 1000, 2),
+            }
 
 
 class Recognizer(metaclass=SingletonMeta):
-    def __init__(self):
-        root_dir = os.path.dirname(os.path.dirname(__file__))
-        slider_v1_model_path = os.path.join(root_dir, 'captcha_recognizer', 'models', 'slider-v1.onnx')
-        self.model_v1: cv2.dnn.Net = cv2.dnn.readNetFromONNX(slider_v1_model_path)
+    _defaults = {'variant': 'fp32', 'rect': False, 'pool_size': NET_POOL_SIZE}
+
+    def __init__(self, variant: Optional[str] = None, rect: Optional[bool] = None, pool_size: Optional[int] = None):
+        self.variant = variant or self._defaults['variant']
+        self.pool = NetPool(lambda: self.load_model(self.variant), pool_size or self._defaults['pool_size'])
+        # 按原图尺寸选择矩形输入，而不是补成正方形再缩放到 INPUT_SIZE（见 preprocess）
+        self.rect = self._defaults['rect'] if rect is None else rect
+        # 创建时的参数，之后再次构造时用来检查是否一致（见 check_arguments）
+        self._requested = {'variant': self.variant, 'rect': self.rect, 'pool_size': self.pool.size}
+        # 以固定输入尺寸导出的模型不能使用矩形输入，与 SliderV2 一样改用正方形输入
+        if self.rect and self.input_hw is not None:
+            logger.warning(f"slider-v1 模型（{self.variant}）的输入尺寸固定为 {self.input_hw}，不支持矩形输入，"
+                           f"改用正方形输入")
+            self.rect = False
+        # 构造时先加载一个实例，模型文件有问题时尽早报错
+        with self.pool.checkout():
+            pass
+        self._model_v1: Optional[cv2.dnn.Net] = None
+        self._model_v1_lock = threading.Lock()
+
+    def check_arguments(self, variant: Optional[str] = None, rect: Optional[bool] = None,
+                        pool_size: Optional[int] = None):
+        """
+        共享实例已创建后再次构造时调用：参数与创建时不一致则抛出 RuntimeError（与 configure 一致）。
+        """
+        requested = {'variant': variant, 'rect': rect, 'pool_size': pool_size}
+        conflicts = [f'{name}={value!r}（已创建的实例为 {self._requested[name]!r}）'
+                     for name, value in requested.items() if value is not None and value != self._requested[name]]
+        if conflicts:
+            raise RuntimeError(f"Recognizer 已创建，参数不一致: {', '.join(conflicts)}")
+
+    @classmethod
+    def configure(cls, variant: str = 'fp32', rect: bool = False, pool_size: int = NET_POOL_SIZE):
+        """
+        设置共享实例的默认参数，需要在第一次创建 Recognizer 之前调用（通常在应用启动时）。
+        """
+        with SingletonMeta._lock:
+            if cls in SingletonMeta._instances:
+                raise RuntimeError("Recognizer 已创建，无法再修改参数")
+            cls._defaults = {'variant': variant, 'rect': rect, 'pool_size': pool_size}
+
+    @classmethod
+    def current_metrics(cls) -> Dict:
+        """
+        返回共享实例的 Net 池指标；尚未创建时返回空字典，不会触发模型加载。
+        """
+        instance = SingletonMeta._instances.get(cls)
+        return {'net_pool': instance.pool.metrics()} if instance is not None else {}
+
+    @property
+    def model_v1(self) -> cv2.dnn.Net:
+        """
+        保留给旧代码使用的独立 Net，第一次访问时加载，不属于 self.pool，不会被池借给其他线程；
+        它本身同样不能被多个线程同时使用，多线程下请通过 self.pool.checkout() 使用。
+        """
+        if self._model_v1 is None:
+            with self._model_v1_lock:
+                if self._model_v1 is None:
+                    self._model_v1 = self.load_model(self.variant)
+        return self._model_v1
+
+    @staticmethod
+    def load_model(variant: str = 'fp32') -> cv2.dnn.Net:
+        """
+        加载 slider-v1 模型的某个精度变体（见 captcha_recognizer.variants.MODEL_VARIANTS）。
+        """
+        return cv2.dnn.readNetFromONNX(variant_path(SLIDER_V1_MODEL_PATH, variant))
+
+    @cached_property
+    def input_hw(self) -> Optional[Tuple[int, int]]:
+        """
+        当前模型输入的固定 (H, W)，动态尺寸的模型为 None；只在需要矩形输入时读取模型文件。
+        """
+        return self.model_input_hw(self.variant)
+
+    @staticmethod
+    def model_input_hw(variant: str = 'fp32') -> Optional[Tuple[int, int]]:
+        """
+        模型输入的固定 (H, W)；以动态输入尺寸导出的模型返回 None。
+        """
+        import onnx
+
+        model = onnx.load(variant_path(SLIDER_V1_MODEL_PATH, variant), load_external_data=False)
+        dims = model.graph.input[0].type.tensor_type.shape.dim[2:]
+        input_hw = tuple(dim.dim_value if dim.HasField('dim_value') else None for dim in dims)
+        return input_hw if all(input_hw) else None
 
     @staticmethod
     def image_to_array(source: Union[str, Path, bytes, np.ndarray] = None):
@@ -41,78 +232,117 @@ class Recognizer(metaclass=SingletonMeta):
         else:
             raise TypeError("Unsupported source type. Only str, Path, bytes, or numpy.ndarray are supported.")
 
-    def predict(self, model, source: Union[str, Path, bytes, np.ndarray] = None, conf=CONF_THRESHOLD):
+    @staticmethod
+    def preprocess(original_image: np.ndarray, rect: bool = False) -> Tuple[np.ndarray, float]:
+        """
+        把图片补成正方形并缩放到模型输入尺寸，返回 (blob, scale)。
 
-        # Read the input image
-        original_image: np.ndarray = self.image_to_array(source)
+        rect=True 时不放大图片，只在右侧和下方补齐到 32 的倍数（长边超过 INPUT_SIZE 时先缩小），
+        输入尺寸随图片变化，要求模型以动态输入尺寸导出。
+        """
         [height, width, _] = original_image.shape
 
+        if rect:
+            input_h, input_w = rect_shape((height, width), INPUT_SIZE)
+            scale = max(height, width) / min(INPUT_SIZE, max(height, width))
+            resized_w, resized_h = int(round(width / scale)), int(round(height / scale))
+            image = np.zeros((input_h, input_w, 3), np.uint8)
+            if (resized_w, resized_h) != (width, height):
+                original_image = cv2.resize(original_image, (resized_w, resized_h), interpolation=cv2.INTER_LINEAR)
+            image[0:resized_h, 0:resized_w] = original_image
+            blob = cv2.dnn.blobFromImage(image, scalefactor=1 / 255, swapRB=True)
+            return blob, scale
+
         # Prepare a square image for inference
         length = max((height, width))
         image = np.zeros((length, length, 3), np.uint8)
         image[0:height, 0:width] = original_image
 
         # Calculate scale factor
-        scale = length / 416
+        scale = length / INPUT_SIZE
 
         # Preprocess the image and prepare blob for model
-        blob = cv2.dnn.blobFromImage(image, scalefactor=1 / 255, size=(416, 416), swapRB=True)
-        model.setInput(blob)
+        blob = cv2.dnn.blobFromImage(image, scalefactor=1 / 255, size=(INPUT_SIZE, INPUT_SIZE), swapRB=True)
+        return blob, scale
+
+    def predict(self, model: Optional[cv2.dnn.Net] = None, source: Union[str, Path, bytes, np.ndarray] = None,
+                conf=CONF_THRESHOLD, rect: Optional[bool] = None, trace=NULL_TRACE):
+        """
+        对图片做检测。model 为 None 时从 self.pool 借出一个 Net；显式传入的 Net 由调用方保证不被并发使用。
+        各阶段耗时记入 trace（见 captcha_recognizer.profiling）。
+        """
+
+        # Read the input image
+        with trace.stage('decode'):
+            original_image: np.ndarray = self.image_to_array(source)
+        if original_image is None:
+            raise ValueError("图片解码失败")
+        with trace.stage('preprocess'):
+            rect = self.rect if rect is None else rect and self.input_hw is None
+            blob, scale = self.preprocess(original_image, rect=rect)
 
         # Perform inference
-        outputs = model.forward()
-
-        # Prepare output array
-        outputs = np.array([cv2.transpose(outputs[0])])
-        rows = outputs.shape[1]
-
-        boxes = []
-        scores = []
-        class_ids = []
-
-        # Iterate through output to collect bounding boxes, confidence scores, and class IDs
-        for i in range(rows):
-            classes_scores = outputs[0][i][4:]
-            (minScore, maxScore, minClassLoc, (x, maxClassIndex)) = cv2.minMaxLoc(classes_scores)
-            if maxScore >= conf:
-                box = [
-                    int((outputs[0][i][0] - (0.5 * outputs[0][i][2])) * scale),
-                    int((outputs[0][i][1] - (0.5 * outputs[0][i][3])) * scale),
-                    int((outputs[0][i][0] + (0.5 * outputs[0][i][2])) * scale),
-                    int((outputs[0][i][1] + (0.5 * outputs[0][i][3])) * scale),
-                ]
-                boxes.append(box)
-                scores.append(maxScore)
-                class_ids.append(maxClassIndex)
+        if model is None:
+            with self.pool.checkout() as net:
+                with trace.stage('forward'):
+                    net.setInput(blob)
+                    outputs = net.forward()
+        else:
+            with trace.stage('forward'):
+                model.setInput(blob)
+                outputs = model.forward()
+        with trace.stage('postprocess'):
+            boxes, scores, class_ids = self.decode(outputs, scale, conf)
 
         # Apply NMS (Non-maximum suppression)
-        result_boxes = cv2.dnn.NMSBoxes(boxes, scores, CONF_THRESHOLD, IOU_THRESHOLD, NMS_THRESHOLD)
+        with trace.stage('non_max_suppression'):
+            result_boxes = cv2.dnn.NMSBoxes(boxes.tolist(), scores.tolist(), CONF_THRESHOLD, IOU_THRESHOLD,
+                                            NMS_THRESHOLD)
 
         detections = []
-
-        # Iterate through NMS results to draw bounding boxes and labels
-
-        for i in range(len(result_boxes)):
-            index = result_boxes[i]
-            box = boxes[index]
+        for index in result_boxes:
             detection = {
-                "class_id": class_ids[index],
-                "class_name": NAMES[class_ids[index]],
-                "confidence": scores[index],
-                "box": box,
+                "class_id": int(class_ids[index]),
+                "class_name": NAMES[int(class_ids[index])],
+                "confidence": float(scores[index]),
+                "box": boxes[index].tolist(),
                 "scale": scale,
             }
             detections.append(detection)
 
         return detections
 
-    def identify_gap(self, source, conf=CONF_THRESHOLD, **kwargs):
+    @staticmethod
+    def decode(outputs: np.ndarray, scale: float, conf=CONF_THRESHOLD) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """
+        把 (1, 4 + 类别数, N) 的模型输出解码成置信度不低于 conf 的候选框。
+
+        返回 (boxes, scores, class_ids)：boxes 为 (M, 4) 的 int 数组 [x1, y1, x2, y2]（已按 scale 还原到原图坐标，
+        与逐行实现一样向零取整），scores 为 (M,) 的 float32 数组，class_ids 为 (M,) 的 int 数组。
+        """
+        # (4 + nc, N) -> (N, 4 + nc)
+        predictions = outputs[0].T
+        class_scores = predictions[:, 4:]
+        class_ids = class_scores.argmax(axis=1)
+        scores = class_scores[np.arange(len(class_ids)), class_ids]
+
+        keep = scores >= conf
+        xywh, scores, class_ids = predictions[keep, :4], scores[keep], class_ids[keep]
+
+        half_wh = 0.5 * xywh[:, 2:4]
+        boxes = np.concatenate((xywh[:, :2] - half_wh, xywh[:, :2] + half_wh), axis=1) * scale
+        return boxes.astype(int), scores, class_ids
+
+    def identify_gap(self, source, conf=CONF_THRESHOLD, model: Optional[cv2.dnn.Net] = None,
+                     rect: Optional[bool] = None, **kwargs):
         """
         识别给定图片的缺口。
 
         参数:
         - source: 图片源。
         - conf: 置信度
+        - model: 使用的网络，默认从 self.pool 借出（传入其他网络用于对比不同精度变体）
+        - rect: 是否使用矩形输入，默认为 self.rect
 
         返回:
         - box: 一个列表，包含具有最高置信度的间隙的边界框坐标。
@@ -120,13 +350,13 @@ class Recognizer(metaclass=SingletonMeta):
         """
 
         classes = [0]
-        results = self.predict(model=self.model_v1, source=source, conf=conf)
+        trace = get_profiler().trace('slider-v1')
+        results = self.predict(model=model, source=source, conf=conf, rect=rect, trace=trace)
         box = []
         box_conf = 0
-        if not len(results):
-            return box, box_conf
-
         results_filtered = [result for result in results if result['class_id'] in classes]
+        trace.note(len(results_filtered))
+        trace.finish()
         if not results_filtered:
             return box, box_conf
         box_with_max_conf = max(results_filtered, key=lambda x: x['confidence'])
@@ -153,20 +383,26 @@ class Recognizer(metaclass=SingletonMeta):
         return abs(box_height_mid - slider_height_mid) * 2 + abs(width_box - width_slider) + abs(
             height_box - height_slider)
 
+    @staticmethod
+    def calculate_differences(slider_box: np.ndarray, boxes: np.ndarray) -> np.ndarray:
+        """
+        calculate_difference 的向量化版本：一次计算滑块框与 (N, 4) 个候选框的差异值。
+        """
+        slider_box = np.asarray(slider_box)
+        boxes = np.asarray(boxes)
+        # int() 向零取整
+        slider_height_mid = np.trunc((slider_box[1] + slider_box[3]) / 2)
+        box_height_mid = np.trunc((boxes[:, 1] + boxes[:, 3]) / 2)
+        slider_wh = slider_box[2:4] - slider_box[0:2]
+        box_wh = boxes[:, 2:4] - boxes[:, 0:2]
+        return np.abs(box_height_mid - slider_height_mid) * 2 + np.abs(box_wh - slider_wh).sum(axis=1)
+
     def identify_boxes_by_screenshot(self, source: Union[str, Path, bytes, np.ndarray]):
         # 通过截图图片识别所有box
-        results = self.predict(model=self.model_v1, source=source)
-
-        box_list = []
-        if not len(results):
-            return box_list
-
-        for result in results:
-            box_list.append(result)
+        results = self.predict(source=source)
 
         # 按x轴坐标排序，从小到大
-        box_list.sort(key=lambda x: x['box'][0])
-        return box_list
+        return sorted(results, key=lambda x: x['box'][0])
 
     def identify_target_boxes_by_screenshot(self, source):
         # 识别滑块框和目标缺口框
@@ -179,21 +415,10 @@ class Recognizer(metaclass=SingletonMeta):
             return slider_box, box_nearest
 
         slider_box = box_list[0]
-
         others = box_list[1:]
 
-        box_nearest = None
-        min_box_diff = None
-
-        for box in others:
-            box_diff = self.calculate_difference(slider_box, box)
-            if not min_box_diff:
-                min_box_diff = box_diff
-                box_nearest = box
-                continue
-            if box_diff < min_box_diff:
-                min_box_diff = box_diff
-                box_nearest = box
+        differences = self.calculate_differences(slider_box['box'], [box['box'] for box in others])
+        box_nearest = others[int(differences.argmin())]
 
         return slider_box, box_nearest
 
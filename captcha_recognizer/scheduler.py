@@ -0,0 +1,166 @@
+import logging
+import queue
+import threading
+import time
+from collections import Counter, deque
+from concurrent.futures import Future
+from pathlib import Path
+from typing import Dict, List, NamedTuple, Optional, Tuple, Union
+
+import numpy as np
+
+from captcha_recognizer.slider import CONF_THRESHOLD, IOU_THRESHOLD, SliderV2
+
+logger = logging.getLogger(__name__)
+
+# 收到第一个请求后最多再等待多久凑 batch（秒）
+BATCH_WINDOW = 0.005
+
+BATCH_MAX_SIZE = 8
+
+# 计算等待时间分位数时保留的最近样本数
+WAIT_SAMPLES = 1024
+
+
+class _Request(NamedTuple):
+    image: np.ndarray
+    conf: float
+    iou: float
+    submitted: float
+    future: Future
+
+
+class BatchScheduler:
+    """
+    动态 micro-batching：把 window 秒内陆续到达的 identify 请求（最多 max_batch 个）合并成一次
+    SliderV2.identify_batch，即一次 session.run，再把结果分发给各自等待的调用方。
+
+    单个请求最多额外等待 window 秒；并发越高，每次 session.run 分摊的请求越多。
+    identify 的参数和返回值与 SliderV2.identify 相同，可以直接替换。
+    """
+
+    image_to_array = staticmethod(SliderV2.image_to_array)
+
+    def __init__(self, model: Optional[SliderV2] = None, window: float = BATCH_WINDOW,
+                 max_batch: int = BATCH_MAX_SIZE):
+        if max_batch < 1:
+            raise ValueError(f"max_batch must be at least 1, got {max_batch}")
+        self.model = model or SliderV2()
+        self.window = window
+        self.max_batch = max_batch
+
+        self._queue: queue.Queue = queue.Queue()
+        self._thread: Optional[threading.Thread] = None
+        self._start_lock = threading.Lock()
+        self._stopped = False
+
+        self._lock = threading.Lock()
+        self._batch_sizes: Counter = Counter()
+        self._waits = deque(maxlen=WAIT_SAMPLES)
+        self._wait_total = 0.0
+        self._run_total = 0.0
+        self._requests = 0
+        self._max_depth = 0
+
+    def _ensure_started(self):
+        if self._thread is None:
+            with self._start_lock:
+                if self._thread is None:
+                    self._thread = threading.Thread(target=self._run, name='captcha-batch-scheduler', daemon=True)
+                    self._thread.start()
+
+    def identify(self, source: Union[str, Path, bytes, np.ndarray], conf=CONF_THRESHOLD, iou=IOU_THRESHOLD,
+                 show=False) -> Tuple[List, float]:
+        if show:
+            # 需要弹窗展示的调用不参与合批
+            return self.model.identify(source, conf=conf, iou=iou, show=True)
+        if self._stopped:
+            raise RuntimeError("BatchScheduler 已关闭")
+        self._ensure_started()
+
+        future = Future()
+        self._queue.put(_Request(self.image_to_array(source), conf, iou, time.perf_counter(), future))
+        depth = self._queue.qsize()
+        with self._lock:
+            self._max_depth = max(self._max_depth, depth)
+        return future.result()
+
+    def _collect(self) -> List[_Request]:
+        """
+        阻塞等待第一个请求，然后在 window 内继续收集，直到凑满 max_batch。
+        """
+        first = self._queue.get()
+        if first is None:
+            return []
+        batch = [first]
+        deadline = time.perf_counter() + self.window
+        while len(batch) < self.max_batch:
+            remaining = deadline - time.perf_counter()
+            try:
+                request = self._queue.get(timeout=remaining) if remaining > 0 else self._queue.get_nowait()
+            except queue.Empty:
+                break
+            if request is None:
+                # 关闭信号放回去，处理完当前 batch 再退出
+                self._queue.put(None)
+                break
+            batch.append(request)
+        return batch
+
+    def _run(self):
+        while True:
+            batch = self._collect()
+            if not batch:
+                return
+            started = time.perf_counter()
+            # conf/iou 不同的请求不能共用一次后处理，按参数分组，通常只有一组
+            groups: Dict[Tuple[float, float], List[_Request]] = {}
+            for request in batch:
+                groups.setdefault((request.conf, request.iou), []).append(request)
+            for (conf, iou), requests in groups.items():
+                try:
+                    results = self.model.identify_batch([request.image for request in requests], conf=conf, iou=iou)
+                except Exception as e:
+                    logger.error(f"批量识别失败: {e}")
+                    for request in requests:
+                        request.future.set_exception(e)
+                    continue
+                for request, result in zip(requests, results):
+                    request.future.set_result(result)
+
+            finished = time.perf_counter()
+            with self._lock:
+                self._batch_sizes[len(batch)] += 1
+                self._requests += len(batch)
+                self._run_total += finished - started
+                for request in batch:
+                    wait = started - request.submitted
+                    self._waits.append(wait)
+                    self._wait_total += wait
+
+    def close(self):
+        """
+        处理完已排队的请求后停止调度线程。
+        """
+        self._stopped = True
+        if self._thread is not None:
+            self._queue.put(None)
+            self._thread.join()
+
+    def metrics(self) -> Dict:
+        with self._lock:
+            batches = sum(self._batch_sizes.values())
+            waits = np.array(self._waits) * 1000 if self._waits else None
+            return {
+                'window_ms': self.window * 1000,
+                'max_batch': self.max_batch,
+                'queue_depth': self._queue.qsize(),
+                'max_queue_depth': self._max_depth,
+                'requests': self._requests,
+                'batches': batches,
+                'batch_size_histogram': dict(sorted(self._batch_sizes.items())),
+                'mean_batch_size': round(self._requests / batches, 2) if batches else None,
+                'mean_wait_ms': round(self._wait_total / self._requests * 1000, 3) if self._requests else None,
+                'p95_wait_ms': round(float(np.percentile(waits, 95)), 3) if waits is not None else None,
+                'mean_batch_run_ms': round(self._run_total / batches * 1000, 2) if batches else None,
+            }
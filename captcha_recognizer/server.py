@@ -0,0 +1,352 @@
+"""
+进程外推理服务。
+
+验证码推理默认在调用方进程内执行，numpy 后处理会长时间持有 GIL，拖慢同进程的 Flask 请求和 Selenium 调用。
+InferenceServer 启动若干个推理子进程，每个子进程持有自己的模型（SliderV2 / slider-v1 / 两级识别）：
+
+- 图片通过 multiprocessing.shared_memory 传给子进程，每个子进程一块固定大小的共享内存，避免序列化整张图；
+- 请求参数和识别结果通过 Pipe 传递；
+- identify 与 SliderV2.identify 的参数和返回值相同，可以直接替换；不启动服务时仍然使用进程内识别。
+
+子进程使用 spawn 方式启动（Windows 上唯一可用的方式，Linux 上也避免在多线程进程里 fork）。
+"""
+import logging
+import multiprocessing
+import queue
+import threading
+import time
+from multiprocessing import shared_memory
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple, Union
+
+import numpy as np
+
+from captcha_recognizer.profiling import StatsProfiler, get_profiler, set_profiler
+from captcha_recognizer.recognizer import Recognizer
+
+logger = logging.getLogger(__name__)
+
+# 每个子进程的共享内存大小，超过的图片改为通过 Pipe 传输
+FRAME_BYTES = 4 * 1024 * 1024
+
+# 等待子进程加载模型的最长时间（秒）
+START_TIMEOUT = 120
+
+# 等待一次识别结果的最长时间（秒），超时的子进程视为卡死并重启
+REQUEST_TIMEOUT = 30
+
+ENGINES = ('slider-v2', 'slider-v1', 'cascade')
+
+# 向子进程查询识别埋点统计的请求
+METRICS_REQUEST = 'metrics'
+
+
+def build_engine(engine: str, options: Dict):
+    """
+    在子进程内创建识别器，options 见 InferenceServer。
+    """
+    # 埋点开关与父进程相同，统计数据由 InferenceServer.profile_metrics 取回
+    if options.get('profiling'):
+        set_profiler(StatsProfiler(slow_ms=options.get('profiling_slow_ms') or None))
+    # 子进程里的 slider-v1（包括两级识别内部创建的）都使用与父进程相同的参数
+    Recognizer.configure(variant=options.get('variant') or 'fp32', rect=bool(options.get('rect')),
+                         pool_size=options.get('pool_size') or 1)
+    if engine == 'slider-v2' or engine == 'cascade':
+        from captcha_recognizer.session import SliderSession
+        from captcha_recognizer.slider import SliderV2
+
+        if options.get('profile') is not None:
+            SliderSession.configure(options['profile'])
+        SliderSession.preload()
+        segmenter = SliderV2(imgsz=options.get('imgsz', 640))
+        if engine == 'slider-v2':
+            return segmenter
+
+        from captcha_recognizer.cascade import CASCADE_THRESHOLD, CascadeRecognizer
+        from captcha_recognizer.gap_detector import GapDetector
+
+        detector = GapDetector() if options.get('cascade_detector') == 'classical' else None
+        return CascadeRecognizer(threshold=options.get('cascade_threshold', CASCADE_THRESHOLD),
+                                 detector=detector, segmenter=segmenter)
+    if engine == 'slider-v1':
+        recognizer = Recognizer()
+
+        class _GapRecognizer:
+            # slider-v1 的缺口识别接口是 identify_gap，这里统一成 identify
+            def identify(self, source, show=False, **kwargs):
+                return recognizer.identify_gap(source, **kwargs)
+
+        return _GapRecognizer()
+    raise ValueError(f"Unsupported engine: {engine}, valid values are {', '.join(ENGINES)}")
+
+
+def _worker_main(conn, shm_name: str, engine: str, options: Dict):
+    """
+    子进程入口：加载模型后循环处理请求，收到 None 时退出。
+
+    请求: (shape, dtype, payload, kwargs)，payload 为 None 表示图片在共享内存中，否则为图片数组本身；
+          或 METRICS_REQUEST，查询子进程的识别埋点统计。
+    响应: ('ok', (box, box_conf))、('ok', 埋点统计) 或 ('error', 错误信息)。
+    """
+    shm = shared_memory.SharedMemory(name=shm_name)
+    try:
+        try:
+            recognizer = build_engine(engine, options)
+        except Exception as e:
+            conn.send(('error', f'{type(e).__name__}: {e}'))
+            return
+        conn.send(('ready', None))
+
+        while True:
+            try:
+                request = conn.recv()
+            except EOFError:
+                break
+            if request is None:
+                break
+            if request == METRICS_REQUEST:
+                conn.send(('ok', get_profiler().metrics()))
+                continue
+            shape, dtype, payload, kwargs = request
+            try:
+                if payload is None:
+                    image = np.ndarray(shape, dtype=dtype, buffer=shm.buf)
+                else:
+                    image = payload
+                box, box_conf = recognizer.identify(image, **kwargs)
+                conn.send(('ok', ([float(v) for v in box], float(box_conf))))
+            except Exception as e:
+                conn.send(('error', f'{type(e).__name__}: {e}'))
+            finally:
+                # 共享内存上的视图必须在关闭前释放
+                image = None
+    finally:
+        shm.close()
+
+
+class _Worker:
+    """
+    父进程中的子进程句柄：进程、Pipe 的一端和该子进程专用的共享内存。
+    """
+
+    def __init__(self, ctx, index: int, engine: str, options: Dict, frame_bytes: int):
+        self.index = index
+        self.shm = shared_memory.SharedMemory(create=True, size=frame_bytes)
+        self.frame = np.ndarray((frame_bytes,), dtype=np.uint8, buffer=self.shm.buf)
+        self.conn, child_conn = ctx.Pipe()
+        self.process = ctx.Process(target=_worker_main, args=(child_conn, self.shm.name, engine, options),
+                                   name=f'captcha-inference-{index}', daemon=True)
+        self.process.start()
+        child_conn.close()
+        self.requests = 0
+
+    def wait_ready(self, timeout: float):
+        if not self.conn.poll(timeout):
+            raise TimeoutError(f"推理子进程 {self.index} 在 {timeout}s 内未完成加载")
+        status, message = self.conn.recv()
+        if status != 'ready':
+            raise RuntimeError(f"推理子进程 {self.index} 加载失败: {message}")
+
+    def close(self):
+        try:
+            self.conn.send(None)
+        except (OSError, BrokenPipeError):
+            pass
+        self.process.join(timeout=5)
+        if self.process.is_alive():
+            self.process.terminate()
+        self.conn.close()
+        self.frame = None
+        self.shm.close()
+        self.shm.unlink()
+
+
+class InferenceServer:
+    """
+    推理子进程池。
+
+    每次 identify 借出一个空闲子进程，把图片写入它的共享内存后发送请求并等待结果；
+    所有子进程都在忙时调用方阻塞。子进程异常退出或 request_timeout 秒内没有返回结果时会被重启，
+    当次调用抛出 RuntimeError；重启失败的子进程从池中移除，全部移除后 running 为 False。
+
+    options:
+        profile: SessionProfile，SliderV2 会话参数
+        imgsz: SliderV2 输入尺寸（整数或 'rect'）
+        variant / rect / pool_size: slider-v1 的精度变体、矩形输入和 Net 池大小（slider-v1 和两级识别都使用）
+        cascade_threshold / cascade_detector: 两级识别参数（cascade_detector 为 'v1' 或 'classical'）
+        profiling / profiling_slow_ms: 是否在子进程中启用 StatsProfiler 及慢识别阈值（毫秒）
+    """
+
+    def __init__(self, workers: int = 1, engine: str = 'slider-v2', options: Optional[Dict] = None,
+                 frame_bytes: int = FRAME_BYTES, request_timeout: float = REQUEST_TIMEOUT):
+        if engine not in ENGINES:
+            raise ValueError(f"Unsupported engine: {engine}, valid values are {', '.join(ENGINES)}")
+        if workers < 1:
+            raise ValueError(f"workers must be at least 1, got {workers}")
+        self.workers = workers
+        self.engine = engine
+        self.options = dict(options or {})
+        self.frame_bytes = frame_bytes
+        self.request_timeout = request_timeout
+
+        self._ctx = multiprocessing.get_context('spawn')
+        self._pool: List[_Worker] = []
+        self._idle: queue.Queue = queue.Queue()
+        self._lock = threading.Lock()
+        self._stats = {'requests': 0, 'errors': 0, 'timeouts': 0, 'restarts': 0, 'removed': 0, 'pipe_frames': 0}
+        self._busy_time = 0.0
+        self._wait_time = 0.0
+
+    def start(self, timeout: float = START_TIMEOUT) -> 'InferenceServer':
+        """
+        启动全部子进程并等待模型加载完成。
+        """
+        if self._pool:
+            return self
+        try:
+            for index in range(self.workers):
+                self._pool.append(_Worker(self._ctx, index, self.engine, self.options, self.frame_bytes))
+            for worker in self._pool:
+                worker.wait_ready(timeout)
+        except Exception:
+            self.close()
+            raise
+        for worker in self._pool:
+            self._idle.put(worker)
+        return self
+
+    @property
+    def running(self) -> bool:
+        return bool(self._pool)
+
+    def close(self):
+        pool, self._pool = self._pool, []
+        for worker in pool:
+            worker.close()
+        self._idle = queue.Queue()
+
+    def __enter__(self) -> 'InferenceServer':
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def _restart(self, worker: _Worker) -> Optional[_Worker]:
+        """
+        关闭出错的子进程并启动一个新的替换它；启动失败时把它从池中移除并返回 None。
+        """
+        logger.error(f"推理子进程 {worker.index} 异常，正在重启")
+        try:
+            worker.close()
+        except Exception as e:
+            logger.warning(f"清理推理子进程 {worker.index} 失败: {e}")
+        replacement = None
+        try:
+            replacement = _Worker(self._ctx, worker.index, self.engine, self.options, self.frame_bytes)
+            replacement.wait_ready(START_TIMEOUT)
+        except Exception as e:
+            logger.error(f"推理子进程 {worker.index} 重启失败，已从池中移除: {e}")
+            if replacement is not None:
+                replacement.close()
+            with self._lock:
+                if worker in self._pool:
+                    self._pool.remove(worker)
+                self._stats['removed'] += 1
+            return None
+        with self._lock:
+            self._pool[self._pool.index(worker)] = replacement
+            self._stats['restarts'] += 1
+        return replacement
+
+    def _acquire(self) -> _Worker:
+        while True:
+            try:
+                return self._idle.get(timeout=1.0)
+            except queue.Empty:
+                if not self._pool:
+                    raise RuntimeError("没有可用的推理子进程")
+
+    def identify(self, source: Union[str, Path, bytes, np.ndarray], show=False, **kwargs) -> Tuple[List, float]:
+        """
+        在子进程中识别缺口，返回 (box, box_conf)；参数与 SliderV2.identify 相同（不支持 show）。
+        """
+        if not self._pool:
+            raise RuntimeError("InferenceServer 尚未启动")
+        image = Recognizer.image_to_array(source)
+        if image is None:
+            # 与进程内识别相同，解码失败的图片不发给子进程
+            raise ValueError("图片解码失败")
+        image = np.ascontiguousarray(image)
+
+        start = time.perf_counter()
+        worker: Optional[_Worker] = self._acquire()
+        acquired = time.perf_counter()
+        try:
+            if image.nbytes <= self.frame_bytes:
+                worker.frame[:image.nbytes] = image.reshape(-1).view(np.uint8)
+                payload = None
+            else:
+                payload = image
+            try:
+                worker.conn.send((image.shape, image.dtype.str, payload, kwargs))
+                if not worker.conn.poll(self.request_timeout):
+                    with self._lock:
+                        self._stats['timeouts'] += 1
+                    raise TimeoutError(f"{self.request_timeout}s 内没有返回结果")
+                status, result = worker.conn.recv()
+            except (EOFError, OSError, BrokenPipeError) as e:
+                with self._lock:
+                    self._stats['errors'] += 1
+                # 只把重启成功的子进程放回空闲队列
+                worker = self._restart(worker)
+                raise RuntimeError(f"推理子进程异常: {e}")
+        finally:
+            if worker is not None:
+                worker.requests += 1
+                self._idle.put(worker)
+            finished = time.perf_counter()
+            with self._lock:
+                self._stats['requests'] += 1
+                self._stats['pipe_frames'] += image.nbytes > self.frame_bytes
+                self._wait_time += acquired - start
+                self._busy_time += finished - acquired
+
+        if status != 'ok':
+            with self._lock:
+                self._stats['errors'] += 1
+            raise RuntimeError(f"推理子进程识别失败: {result}")
+        return result
+
+    def profile_metrics(self) -> List[Dict]:
+        """
+        逐个借出子进程，取回各自的识别埋点统计（未启用 profiling 时为空字典）；
+        子进程正在识别时等它空闲，没有在 request_timeout 秒内响应的子进程记为 None。
+        """
+        results = []
+        for _ in range(len(self._pool)):
+            worker: Optional[_Worker] = self._acquire()
+            try:
+                worker.conn.send(METRICS_REQUEST)
+                if not worker.conn.poll(self.request_timeout):
+                    raise TimeoutError(f"{self.request_timeout}s 内没有返回埋点统计")
+                status, result = worker.conn.recv()
+                results.append((worker.index, result if status == 'ok' else None))
+            except (TimeoutError, EOFError, OSError, BrokenPipeError) as e:
+                logger.warning(f"读取推理子进程 {worker.index} 埋点统计失败: {e}")
+                results.append((worker.index, None))
+                worker = self._restart(worker)
+            finally:
+                if worker is not None:
+                    self._idle.put(worker)
+        return [result for _, result in sorted(results, key=lambda item: item[0])]
+
+    def metrics(self) -> Dict:
+        with self._lock:
+            stats = dict(self._stats)
+            requests = stats['requests']
+            stats['workers'] = len(self._pool)
+            stats['engine'] = self.engine
+            stats['mean_wait_ms'] = round(self._wait_time / requests * 1000, 2) if requests else None
+            stats['mean_roundtrip_ms'] = round(self._busy_time / requests * 1000, 2) if requests else None
+            stats['worker_requests'] = [worker.requests for worker in self._pool]
+        return stats
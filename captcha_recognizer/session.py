@@ -0,0 +1,205 @@
+import os
+import threading
+import time
+from typing import Dict, NamedTuple, Optional, Sequence, Tuple, Union
+
+import numpy as np
+import onnxruntime as ort
+
+from captcha_recognizer.variants import variant_path
+
+SLIDER_V2_MODEL_PATH = os.path.join(os.path.dirname(__file__), 'models', 'slider-v2.onnx')
+
+WARMUP_IMGSZ = 640
+
+GRAPH_OPTIMIZATION_LEVELS = {
+    'disable': ort.GraphOptimizationLevel.ORT_DISABLE_ALL,
+    'basic': ort.GraphOptimizationLevel.ORT_ENABLE_BASIC,
+    'extended': ort.GraphOptimizationLevel.ORT_ENABLE_EXTENDED,
+    'all': ort.GraphOptimizationLevel.ORT_ENABLE_ALL,
+}
+
+EXECUTION_MODES = {
+    'sequential': ort.ExecutionMode.ORT_SEQUENTIAL,
+    'parallel': ort.ExecutionMode.ORT_PARALLEL,
+}
+
+
+class SessionProfile(NamedTuple):
+    """
+    onnxruntime 会话参数，对应 config.ini 的 [MODEL] 段。
+    """
+    intra_op_threads: int = 0  # 0 表示由 onnxruntime 自动决定
+    inter_op_threads: int = 0
+    execution_mode: str = 'sequential'
+    optimization_level: str = 'all'
+    # 优化后模型的缓存目录，None 表示不缓存
+    optimized_model_dir: Optional[str] = None
+    # 模型精度变体，见 captcha_recognizer.variants.MODEL_VARIANTS
+    variant: str = 'fp32'
+
+    def session_options(self) -> ort.SessionOptions:
+        if self.execution_mode not in EXECUTION_MODES:
+            raise ValueError(f"Unsupported execution mode: {self.execution_mode}, "
+                             f"valid values are {', '.join(EXECUTION_MODES)}")
+        if self.optimization_level not in GRAPH_OPTIMIZATION_LEVELS:
+            raise ValueError(f"Unsupported optimization level: {self.optimization_level}, "
+                             f"valid values are {', '.join(GRAPH_OPTIMIZATION_LEVELS)}")
+        options = ort.SessionOptions()
+        options.intra_op_num_threads = self.intra_op_threads
+        options.inter_op_num_threads = self.inter_op_threads
+        options.execution_mode = EXECUTION_MODES[self.execution_mode]
+        options.graph_optimization_level = GRAPH_OPTIMIZATION_LEVELS[self.optimization_level]
+        return options
+
+    def optimized_model_path(self, model_path: str, providers: Sequence[str] = ('CPUExecutionProvider',)) \
+            -> Optional[str]:
+        """
+        优化后模型的缓存文件路径；文件名包含优化级别、执行提供者（优化后的图与提供者相关）和 onnxruntime 版本，
+        任何一项变化后自动失效。
+        """
+        if not self.optimized_model_dir or self.optimization_level == 'disable':
+            return None
+        name = os.path.splitext(os.path.basename(model_path))[0]
+        provider_tag = '+'.join(provider.replace('ExecutionProvider', '').lower() for provider in providers)
+        return os.path.join(self.optimized_model_dir,
+                            f'{name}.{self.optimization_level}.{provider_tag}.ort-{ort.__version__}.onnx')
+
+
+def create_session(model_path: str, profile: SessionProfile) -> Tuple[ort.InferenceSession, Optional[str]]:
+    """
+    按 profile 创建 InferenceSession。
+
+    配置了缓存目录时，第一次启动把优化后的图写入缓存，之后直接加载缓存并关闭图优化，跳过优化耗时。
+    多个推理子进程可能同时启动并同时写缓存，所以先写到本进程的临时文件，完成后再原子替换到缓存路径，
+    读取方不会看到写了一半的文件。
+    返回会话和缓存状态：'hit' 使用了缓存，'written' 写入了缓存，None 未启用缓存。
+    """
+    options = profile.session_options()
+    providers = ["CUDAExecutionProvider", "CPUExecutionProvider"] if ort.get_device() == 'GPU' else [
+        "CPUExecutionProvider"]
+
+    cache_status = tmp_path = None
+    cache_path = profile.optimized_model_path(model_path, providers)
+    if cache_path:
+        if os.path.isfile(cache_path) and os.path.getmtime(cache_path) >= os.path.getmtime(model_path):
+            model_path = cache_path
+            options.graph_optimization_level = GRAPH_OPTIMIZATION_LEVELS['disable']
+            cache_status = 'hit'
+        else:
+            os.makedirs(profile.optimized_model_dir, exist_ok=True)
+            tmp_path = f'{cache_path}.{os.getpid()}.{threading.get_ident()}.tmp'
+            options.optimized_model_filepath = tmp_path
+            cache_status = 'written'
+
+    try:
+        session = ort.InferenceSession(model_path, sess_options=options, providers=providers)
+        if tmp_path:
+            os.replace(tmp_path, cache_path)
+    finally:
+        if tmp_path and os.path.exists(tmp_path):
+            os.remove(tmp_path)
+    return session, cache_status
+
+
+class SliderSession:
+    """
+    进程内共享的 SliderV2 推理会话。
+
+    InferenceSession 只在第一次使用时创建，之后所有 SliderV2 实例复用同一个会话。
+    onnxruntime 的 run() 本身是线程安全的，这里的锁只用来保护加载和预热过程。
+    """
+
+    _lock = threading.Lock()
+    _instance: Optional['SliderSession'] = None
+    _profile = SessionProfile()
+
+    def __init__(self, model_path: str = SLIDER_V2_MODEL_PATH, profile: Optional[SessionProfile] = None):
+        self.profile = profile or SliderSession._profile
+        self.model_path = variant_path(model_path, self.profile.variant)
+        self._warmup_lock = threading.Lock()
+
+        start = time.perf_counter()
+        self.session, self.optimized_cache = create_session(self.model_path, self.profile)
+        self.load_time = time.perf_counter() - start
+
+        # 输入名在会话生命周期内不变，缓存下来避免每次推理都调用 get_inputs()
+        self.input_name = self.session.get_inputs()[0].name
+        # 导出时若固定了 batch 维为 1，则批量推理只能逐张执行
+        self.static_batch = self.session.get_inputs()[0].shape[0] == 1
+        # 输入的 (H, W) 固定时记录下来，动态尺寸的模型为 None
+        input_hw = self.session.get_inputs()[0].shape[2:]
+        self.input_hw = tuple(input_hw) if all(isinstance(dim, int) for dim in input_hw) else None
+        self.warmup_time: Optional[float] = None
+
+    @classmethod
+    def instance(cls) -> 'SliderSession':
+        """
+        获取进程内唯一的会话实例，首次调用时加载模型。
+        """
+        if cls._instance is None:
+            with cls._lock:
+                if cls._instance is None:
+                    cls._instance = cls()
+        return cls._instance
+
+    @classmethod
+    def configure(cls, profile: SessionProfile):
+        """
+        设置共享会话使用的参数，需要在模型加载前调用（通常在应用启动时）。
+        """
+        with cls._lock:
+            if cls._instance is not None:
+                raise RuntimeError("SliderSession 已加载，无法再修改会话参数")
+            cls._profile = profile
+
+    @classmethod
+    def preload(cls, imgsz: Union[int, Tuple[int, int]] = WARMUP_IMGSZ) -> 'SliderSession':
+        """
+        加载模型并执行一次预热推理，供应用启动时调用。
+        """
+        model = cls.instance()
+        model.warmup(imgsz)
+        return model
+
+    @classmethod
+    def current_metrics(cls) -> Dict:
+        """
+        返回当前会话的指标；模型尚未加载时返回空字典，不会触发加载。
+        """
+        return cls._instance.metrics() if cls._instance is not None else {}
+
+    def run(self, inputs: np.ndarray):
+        return self.session.run(None, {self.input_name: inputs})
+
+    def run_batch(self, inputs: np.ndarray):
+        """
+        对 (N, 3, H, W) 的输入做批量推理；模型不支持动态 batch 时退化为逐张推理再拼接输出。
+        """
+        if not self.static_batch or inputs.shape[0] == 1:
+            return self.run(inputs)
+        outs = [self.run(inputs[i:i + 1]) for i in range(inputs.shape[0])]
+        return [np.concatenate(out, axis=0) for out in zip(*outs)]
+
+    def warmup(self, imgsz: Union[int, Tuple[int, int]] = WARMUP_IMGSZ):
+        """
+        用灰色填充的假图做一次推理，把首次推理的内存分配和算子初始化提前到启动阶段。
+        """
+        with self._warmup_lock:
+            if self.warmup_time is not None:
+                return
+            h, w = self.input_hw or ((imgsz, imgsz) if isinstance(imgsz, int) else imgsz)
+            dummy = np.full((1, 3, h, w), 114 / 255, dtype=np.float32)
+            start = time.perf_counter()
+            self.run(dummy)
+            self.warmup_time = time.perf_counter() - start
+
+    def metrics(self) -> Dict:
+        return {
+            'model_path': self.model_path,
+            'providers': self.session.get_providers(),
+            'profile': self.profile._asdict(),
+            'optimized_model_cache': self.optimized_cache,
+            'load_time_ms': round(self.load_time * 1000, 2),
+            'warmup_time_ms': round(self.warmup_time * 1000, 2) if self.warmup_time is not None else None,
+        }
@@ -1,13 +1,15 @@
-import os
 import random
 import time
 from pathlib import Path
-from typing import List, Tuple, Union
+from typing import List, Optional, Sequence, Tuple, Union
 
 import cv2
 import numpy as np
 import onnxruntime as ort
-from shapely.geometry import Polygon
+
+from captcha_recognizer.preprocess import Preprocessor, default_preprocessor, rect_shape
+from captcha_recognizer.profiling import NULL_TRACE, Profiler, get_profiler
+from captcha_recognizer.session import SliderSession
 
 CONF_THRESHOLD = 0.25
 
@@ -15,33 +17,99 @@ IOU_THRESHOLD = 0.8
 
 Y_IOU_THRESHOLD = 0.85
 
+# 模型输入尺寸：整数表示 imgsz x imgsz 的正方形输入，'rect' 表示按原图尺寸选择矩形输入（见 SliderV2.input_shape）
+IMGSZ = 640
+
+# 'rect' 模式下输入长边的上限
+RECT_MAX_SIZE = 640
+
+# 水平框 NMS 的实现：'cv2' | 'fast' | 'greedy'，见 SliderV2.nms
+NMS_METHOD = 'cv2'
+
+# Fast-NMS 需要 N x N 的 IoU 矩阵，候选框超过该数量时改用 OpenCV 实现
+FAST_NMS_MAX_BOXES = 512
+
+# 多缺口时滑块与候选缺口的形状匹配方式：'raster' 质心对齐后的掩膜 IoU，'polygon' shapely 多边形 IoU
+SHAPE_MATCH_METHOD = 'raster'
+
 
 class SliderV2:
 
-    def __init__(self):
+    def __init__(self, model: Optional[SliderSession] = None, nms_method: str = NMS_METHOD,
+                 shape_match_method: str = SHAPE_MATCH_METHOD, preprocessor: Optional[Preprocessor] = None,
+                 imgsz: Union[int, Tuple[int, int], str] = IMGSZ,
+                 rect_shapes: Optional[Sequence[Tuple[int, int]]] = None, profiler: Optional[Profiler] = None):
         """
         Initialize the instance segmentation model using an ONNX model.
+
+        The ONNX session is shared process-wide (see SliderSession), so creating a SliderV2 is cheap;
+        the model is loaded on first use unless it has already been preloaded at startup.
+        Stage timings go to `profiler`, or to the process-wide one (see captcha_recognizer.profiling) when None.
         """
-        root_dir = os.path.dirname(os.path.dirname(__file__))
-        slider_model_path = os.path.join(root_dir, 'captcha_recognizer', 'models', 'slider-v2.onnx')
+        self._model = model
+        self.nms_method = nms_method
+        self.shape_match_method = shape_match_method
+        self.preprocessor = preprocessor or default_preprocessor
+        self.imgsz = imgsz
+        # 'rect' 模式下可选的固定输入尺寸集合，避免动态尺寸下每种图片尺寸都触发一次新的内存分配
+        self.rect_shapes = rect_shapes
+        self.classes = {0: 's'}
+        self._profiler = profiler
 
-        self.session = ort.InferenceSession(
-            slider_model_path,
-            providers=["CUDAExecutionProvider", "CPUExecutionProvider"] if ort.get_device() == 'GPU' else [
-                "CPUExecutionProvider"],
-        )
+    @property
+    def model(self) -> SliderSession:
+        if self._model is None:
+            self._model = SliderSession.instance()
+        return self._model
 
-        self.classes = {0: 's'}
+    @property
+    def profiler(self) -> Profiler:
+        return self._profiler or get_profiler()
+
+    @property
+    def session(self) -> ort.InferenceSession:
+        return self.model.session
 
     def predict(self, img: np.ndarray, conf: float = 0.25, iou: float = 0.7,
-                imgsz: Union[int, Tuple[int, int]] = 640) -> List:
+                imgsz: Union[int, Tuple[int, int]] = 640, trace=NULL_TRACE) -> List:
         """
         Run inference on the input image using the ONNX model.
         """
         imgsz = (imgsz, imgsz) if isinstance(imgsz, int) else imgsz
-        prep_img = self.preprocess(img, imgsz)
-        outs = self.session.run(None, {self.session.get_inputs()[0].name: prep_img})
-        return self.postprocess(img, prep_img, outs, conf=conf, iou=iou)
+        with trace.stage('preprocess'):
+            prep_img = self.preprocessor(img, imgsz)
+        with trace.stage('session_run'):
+            outs = self.model.run(prep_img)
+        return self.postprocess(img, prep_img, outs, conf=conf, iou=iou, trace=trace)
+
+    def predict_batch(self, imgs: List[np.ndarray], conf: float = 0.25, iou: float = 0.7,
+                      imgsz: Union[int, Tuple[int, int]] = 640, trace=NULL_TRACE) -> List:
+        """
+        Run batched inference on several images: letterbox them into one stacked tensor and call the session once.
+        """
+        if not imgs:
+            return []
+        imgsz = (imgsz, imgsz) if isinstance(imgsz, int) else imgsz
+        with trace.stage('preprocess'):
+            prep_img = self.preprocessor.batch(imgs, imgsz)
+        with trace.stage('session_run'):
+            outs = self.model.run_batch(prep_img)
+        return self.postprocess(imgs, prep_img, outs, conf=conf, iou=iou, trace=trace)
+
+    def input_shape(self, shapes: List[Tuple[int, int]]) -> Tuple[int, int]:
+        """
+        Model input (height, width) for a batch of images with the given shapes.
+
+        With `imgsz='rect'` the input is the smallest stride-aligned rectangle covering every image in the batch,
+        snapped to `rect_shapes` when given. Models exported with a fixed input size always use that size.
+        """
+        if self.model.input_hw is not None:
+            return self.model.input_hw
+        if self.imgsz == 'rect':
+            rects = [rect_shape(shape, RECT_MAX_SIZE) for shape in shapes]
+            h, w = max(rect[0] for rect in rects), max(rect[1] for rect in rects)
+            return rect_shape((h, w), max(h, w), buckets=self.rect_shapes) if self.rect_shapes else (h, w)
+        return (self.imgsz, self.imgsz) if isinstance(self.imgsz, int) else tuple(self.imgsz)
 
     @staticmethod
     def letterbox(img: np.ndarray, new_shape: Tuple[int, int] = (640, 640)) -> np.ndarray:
@@ -76,13 +144,16 @@ class SliderV2:
 
         # Final check to ensure exact size (might need crop if rounding caused overflow)
         if img.shape[0] != new_shape[0] or img.shape[1] != new_shape[1]:
-            img = cv2.resize(img, new_shape, interpolation=cv2.INTER_LINEAR)
+            img = cv2.resize(img, (new_shape[1], new_shape[0]), interpolation=cv2.INTER_LINEAR)
 
         return img
 
     def preprocess(self, img: np.ndarray, new_shape: Tuple[int, int]) -> np.ndarray:
         """
         Preprocess the input image before feeding it into the model.
+
+        Reference implementation; inference goes through `self.preprocessor`, which produces the same tensor
+        without the intermediate copies.
         """
         img = self.letterbox(img, new_shape)
         img = img[..., ::-1].transpose([2, 0, 1])[None]
@@ -90,19 +161,26 @@ class SliderV2:
         img = img.astype(np.float32) / 255
         return img
 
-    def postprocess(self, img: np.ndarray, prep_img: np.ndarray, outs: List, conf: float = 0.25,
-                    iou: float = 0.7) -> List:
+    def postprocess(self, img: Union[np.ndarray, List[np.ndarray]], prep_img: np.ndarray, outs: List,
+                    conf: float = 0.25, iou: float = 0.7, trace=NULL_TRACE) -> List:
         """
         Post-process model predictions to extract meaningful results.
+
+        `img` is the original image, or a list of original images matching the batch dimension of `prep_img`.
+        Masks are returned as lazy `SegmentMasks`, computed per instance only when accessed.
         """
+        imgs = img if isinstance(img, (list, tuple)) else [img]
         preds, protos = outs
-        preds = self.non_max_suppression(preds, conf, iou, nc=len(self.classes))
+        with trace.stage('non_max_suppression'):
+            preds = self.non_max_suppression(preds, conf, iou, nc=len(self.classes), nms_method=self.nms_method)
 
         results = []
-        for i, pred in enumerate(preds):
-            pred[:, :4] = self.scale_boxes(prep_img.shape[2:], pred[:, :4], img.shape)
-            masks = self.process_mask(protos[i], pred[:, 6:], pred[:, :4], img.shape[:2])
-            results.append([pred[:, :6], masks])
+        with trace.stage('postprocess'):
+            for i, pred in enumerate(preds):
+                shape = imgs[i].shape
+                pred[:, :4] = self.scale_boxes(prep_img.shape[2:], pred[:, :4], shape)
+                masks = SegmentMasks(protos[i], pred[:, 6:], pred[:, :4], shape[:2])
+                results.append([pred[:, :6], masks])
 
         return results
 
@@ -115,7 +193,8 @@ class SliderV2:
         return masks > 0.0
 
     @staticmethod
-    def masks_to_segments(masks: Union[np.ndarray,], strategy: str = "largest") -> List[np.ndarray]:
+    def masks_to_segments(masks: Union[np.ndarray,], strategy: str = "largest",
+                          offset: Tuple[int, int] = (0, 0)) -> List[np.ndarray]:
         """
         将二值Mask转换为多边形边界点(segments)，不使用多边形简化
 
@@ -126,6 +205,7 @@ class SliderV2:
                      'all' - 合并所有轮廓
                      'largest' - 只保留最大轮廓
                      'none' - 返回所有轮廓不合并
+            offset: 加到轮廓点上的 (x, y) 偏移，传入 ROI 掩膜时用于还原到整图坐标
 
         返回:
             包含多边形点集的列表，每个元素是(N,2)的numpy数组
@@ -142,7 +222,7 @@ class SliderV2:
 
         for mask in masks_np:
             # 查找轮廓 (OpenCV 4.x返回格式)
-            contours, _ = cv2.findContours(mask, cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE)
+            contours, _ = cv2.findContours(mask, cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE, offset=offset)
 
             if not contours:  # 没有找到轮廓
                 segments.append(np.zeros((0, 2), dtype=np.float32))
@@ -256,7 +336,6 @@ class SliderV2:
         """
         # 计算质心
         centroid = np.mean(points, axis=0)
-        print('centroid', centroid)
         # 将质心移到原点
         # normalized_points = points - np.array([x, 0])
         normalized_points = points - centroid
@@ -285,6 +364,9 @@ class SliderV2:
         :param poly2: 多边形2的顶点坐标，格式同上
         :return: IoU 值（范围 [0, 1]）
         """
+        # shapely 只有这条路径用到，按需导入
+        from shapely.geometry import Polygon
+
         # 创建 Shapely Polygon 对象
         # poly1 = Polygon(normalize_points(poly1))  # buffer(0) 修复无效多边形（如自相交）
         p1 = self.normalize_points(poly1)
@@ -305,40 +387,120 @@ class SliderV2:
         iou = intersect / union if union > 0 else 0.0
         return iou
 
-    def pick_out_mask(self, boxes, segments):
+    @staticmethod
+    def centroid_aligned_iou(template: np.ndarray, candidates: List[np.ndarray],
+                             centroids: Optional[List[Optional[Tuple[float, float]]]] = None) -> np.ndarray:
+        """
+        把每个候选掩膜按质心与模板掩膜对齐，一次计算所有候选与模板的 IoU
+
+        参数:
+            template: 模板（滑块）的二值掩膜 (h, w)
+            candidates: 候选的二值掩膜列表，尺寸可以各不相同
+            centroids: 模板和各候选（模板在前）在各自掩膜坐标下的对齐点 (x, y)，None 表示该掩膜为空；
+                       默认使用前景像素的均值
+
+        返回:
+            (K,) 的 IoU 数组，空掩膜的 IoU 为 0
+        """
+        masks = [template] + list(candidates)
+        height = max(mask.shape[0] for mask in masks)
+        width = max(mask.shape[1] for mask in masks)
+        # 画布足够大，保证任何质心位置的掩膜平移到中心后都不会越界
+        canvas = np.zeros((len(masks), 2 * height + 2, 2 * width + 2), dtype=bool)
+        cy, cx = height + 1, width + 1
+
+        for index, mask in enumerate(masks):
+            if centroids is None:
+                ys, xs = np.nonzero(mask)
+                centroid = (xs.mean(), ys.mean()) if ys.size else None
+            else:
+                centroid = centroids[index]
+            if centroid is None:
+                continue
+            top = cy - int(round(centroid[1]))
+            left = cx - int(round(centroid[0]))
+            canvas[index, top:top + mask.shape[0], left:left + mask.shape[1]] = mask
+
+        inter = np.logical_and(canvas[1:], canvas[0]).sum(axis=(1, 2))
+        union = np.logical_or(canvas[1:], canvas[0]).sum(axis=(1, 2))
+        return np.divide(inter, union, out=np.zeros(len(candidates), dtype=np.float64), where=union > 0)
+
+    def pick_out_mask(self, boxes, masks, method: str = SHAPE_MATCH_METHOD):
+        """
+        多个候选框时，找出与滑块（x 最小的框）形状最接近的缺口框。
+
+        masks 可以是 SegmentMasks，此时只为参与比较的实例计算掩膜；也可以是已经算好的轮廓列表（只能用 'polygon'）。
+        method 为 'raster' 时用 centroid_aligned_iou 一次比较所有候选，为 'polygon' 时逐个计算多边形 IoU。
+        """
         boxes = boxes.tolist()
-        # boxes, masks 为两个列表，找出box值最小的一个
-        box_slider = min(boxes, key=lambda x: x[0])
-        box_slider_index = boxes.index(box_slider)
-        segment_slider = segments[box_slider_index]
+        segment_of = masks.segment if isinstance(masks, SegmentMasks) else masks.__getitem__
 
-        box_sample = boxes[:box_slider_index] + boxes[box_slider_index + 1:]
-        segment_sample = segments[:box_slider_index] + segments[box_slider_index + 1:]
+        # boxes, masks 为两个列表，找出box值最小的一个
+        box_slider_index = min(range(len(boxes)), key=lambda index: boxes[index][0])
+        box_slider = boxes[box_slider_index]
 
         # 先按照y值iou过滤
-        box_filtered = []
-        segment_filtered = []
-
-        for index, box in enumerate(box_sample):
-            if self.y_iou([box_slider[1], box_slider[3]], [box[1], box[3]]) > Y_IOU_THRESHOLD:
-                box_filtered.append(box)
-                segment_filtered.append(segment_sample[index])
+        filtered = [index for index, box in enumerate(boxes)
+                    if index != box_slider_index
+                    and self.y_iou([box_slider[1], box_slider[3]], [box[1], box[3]]) > Y_IOU_THRESHOLD]
 
-        if len(box_filtered) == 1:
-            return box_filtered[0], segment_filtered[0]
+        if len(filtered) == 1:
+            return boxes[filtered[0]], segment_of(filtered[0])
 
-        elif len(box_filtered) == 0:
+        elif len(filtered) == 0:
             return [], []
 
+        if method == 'raster' and isinstance(masks, SegmentMasks):
+            # 与 polygon_iou（normalize_points）相同，以轮廓顶点的均值作为质心对齐，两种方式的对齐位置一致
+            indices = [box_slider_index] + filtered
+            centroids = []
+            for index in indices:
+                segment, (x, y) = masks.segment(index), masks.roi(index)[1]
+                centroids.append((segment[:, 0].mean() - x, segment[:, 1].mean() - y) if len(segment) else None)
+            ious = self.centroid_aligned_iou(masks.roi(box_slider_index)[0],
+                                             [masks.roi(index)[0] for index in filtered], centroids)
+            # 与逐个比较时一致：IoU 全为 0 时取第一个候选
+            iou_index = filtered[int(np.argmax(ious))]
+            return boxes[iou_index], segment_of(iou_index)
+
+        segment_slider = segment_of(box_slider_index)
         iou_flag = 0
-        iou_index = 0
-        for index, segment in enumerate(segment_filtered):
-            segment_iou = self.polygon_iou(segment_slider, segment)
+        iou_index = filtered[0]
+        for index in filtered:
+            segment_iou = self.polygon_iou(segment_slider, segment_of(index))
             if segment_iou > iou_flag:
                 iou_flag = segment_iou
                 iou_index = index
 
-        return box_filtered[iou_index], segment_filtered[iou_index]
+        return boxes[iou_index], segment_of(iou_index)
+
+    def select_box(self, boxes: np.ndarray, masks: np.ndarray, trace=NULL_TRACE) -> Tuple[List, float]:
+        """
+        从一张图的检测结果中选出缺口框，返回 (box, conf)。所走的分支记入 trace（见 captcha_recognizer.profiling）。
+        """
+        box = []
+        box_conf = 0
+        if len(boxes) == 0:
+            trace.note(0, 'none')
+            return box, box_conf
+
+        trace.note(len(boxes), 'single' if len(boxes) == 1 else 'top_conf' if len(boxes) <= 5 else 'mask_match')
+        if len(boxes) == 1:
+            box_array = boxes[0]
+            box = box_array[:4].tolist()
+            box_conf = float(box_array[4])
+        elif len(boxes) in range(2,6):
+            # 使用max函数找到置信度最大的box
+            selected_box = max(boxes, key=lambda x: x[4])
+            box_array = selected_box
+            box = box_array[:4].tolist()
+            box_conf = float(box_array[4])
+        else:
+            box_array, segment = self.pick_out_mask(boxes, masks, method=self.shape_match_method)
+            if box_array:
+                box = box_array[:4]
+                box_conf = float(box_array[4])
+        return box, box_conf
 
     def identify(self, source: Union[str, Path, bytes, np.ndarray], conf=CONF_THRESHOLD, iou=IOU_THRESHOLD, show=False):
         box = []
@@ -346,28 +508,20 @@ class SliderV2:
         boxes = []
         masks = []
 
-        original_image: np.ndarray = self.image_to_array(source)
-        results = self.predict(original_image, conf=conf, iou=iou, imgsz=640)
+        trace = self.profiler.trace('slider-v2')
+        with trace.stage('decode'):
+            original_image: np.ndarray = self.image_to_array(source)
+        if original_image is None:
+            raise ValueError("图片解码失败")
+        results = self.predict(original_image, conf=conf, iou=iou, imgsz=self.input_shape([original_image.shape]),
+                               trace=trace)
 
         if results:
             boxes, masks = results[0]
-            if len(boxes) == 1:
-                box_array = boxes[0]
-                box = box_array[:4].tolist()
-                box_conf = float(box_array[4])
-            elif len(boxes) in range(2,6):
-                # 使用max函数找到置信度最大的box
-                selected_box = max(boxes, key=lambda x: x[4])
-                box_array = selected_box
-                box = box_array[:4].tolist()
-                box_conf = float(box_array[4])     
-            else:
-                segments = self.masks_to_segments(masks)
-                box_array, segment = self.pick_out_mask(boxes, segments)
-                if box_array:
-                    box = box_array[:4]
-                    box_conf = float(box_array[4])
-        if show and boxes.size > 0 and masks.size > 0:
+            with trace.stage('select_box'):
+                box, box_conf = self.select_box(boxes, masks, trace=trace)
+        trace.finish()
+        if show and len(boxes) > 0 and len(masks) > 0:
             sample = self.draw_segments(original_image, boxes, masks)
             cv2.imshow('sample', sample)
             cv2.waitKey(0)
@@ -375,6 +529,37 @@ class SliderV2:
 
         return box, box_conf
 
+    def identify_batch(self, sources: List[Union[str, Path, bytes, np.ndarray]], conf=CONF_THRESHOLD,
+                       iou=IOU_THRESHOLD, batch_size: Optional[int] = None) -> List[Tuple[List, float]]:
+        """
+        批量识别多张图片的缺口，多张图片拼成一个 batch 只调用一次 session.run。
+
+        参数:
+            sources: 图片源列表，每个元素的类型同 identify 的 source
+            conf: 置信度阈值
+            iou: NMS 的 IoU 阈值
+            batch_size: 单次推理的最大图片数，None 表示全部图片一次推理
+
+        返回:
+            与 sources 一一对应的 (box, box_conf) 列表
+        """
+        trace = self.profiler.trace('slider-v2-batch')
+        with trace.stage('decode'):
+            images = [self.image_to_array(source) for source in sources]
+        if any(image is None for image in images):
+            raise ValueError("图片解码失败")
+        batch_size = batch_size or max(len(images), 1)
+
+        results = []
+        for start in range(0, len(images), batch_size):
+            chunk = images[start:start + batch_size]
+            imgsz = self.input_shape([img.shape for img in chunk])
+            for boxes, masks in self.predict_batch(chunk, conf=conf, iou=iou, imgsz=imgsz, trace=trace):
+                with trace.stage('select_box'):
+                    results.append(self.select_box(boxes, masks, trace=trace))
+        trace.finish()
+        return results
+
     def scale_boxes(self, img1_shape: Tuple[int, int], boxes: np.ndarray, img0_shape: Tuple[int, int],
                     ratio_pad: Union[Tuple, None] = None, padding: bool = True, xywh: bool = False):
         """
@@ -491,6 +676,103 @@ class SliderV2:
         pick = np.where((ious >= threshold).sum(axis=0) <= 0)[0]
         return sorted_idx[pick]
 
+    @staticmethod
+    def box_iou(boxes1: np.ndarray, boxes2: np.ndarray) -> np.ndarray:
+        """
+        Calculate the pairwise IoU between two sets of boxes.
+
+        Args:
+            boxes1 (np.ndarray): Boxes with shape (N, 4) in xyxy format.
+            boxes2 (np.ndarray): Boxes with shape (M, 4) in xyxy format.
+
+        Returns:
+            (np.ndarray): IoU matrix with shape (N, M).
+        """
+        x11, y11, x12, y12 = (boxes1[:, k, None] for k in range(4))
+        x21, y21, x22, y22 = (boxes2[None, :, k] for k in range(4))
+        iw = np.minimum(x12, x22) - np.maximum(x11, x21)
+        ih = np.minimum(y12, y22) - np.maximum(y11, y21)
+        inter = np.clip(iw, 0, None, out=iw) * np.clip(ih, 0, None, out=ih)
+        union = (x12 - x11) * (y12 - y11) + (x22 - x21) * (y22 - y21) - inter
+        return inter / union
+
+    @staticmethod
+    def nms_greedy(boxes: np.ndarray, scores: np.ndarray, threshold: float = 0.45) -> np.ndarray:
+        """
+        Greedy NMS in a numpy loop, one pick at a time. Kept as the reference implementation.
+        """
+        i = []
+        if boxes.shape[0] > 0:
+            y1, x1, y2, x2 = boxes[:, 1], boxes[:, 0], boxes[:, 3], boxes[:, 2]
+            area = (x2 - x1) * (y2 - y1)
+            order = scores.argsort()[::-1]
+            while order.size > 0:
+                idx = order[0]
+                i.append(idx)
+                xx1 = np.maximum(x1[idx], x1[order[1:]])
+                yy1 = np.maximum(y1[idx], y1[order[1:]])
+                xx2 = np.minimum(x2[idx], x2[order[1:]])
+                yy2 = np.minimum(y2[idx], y2[order[1:]])
+                w = np.maximum(0.0, xx2 - xx1)
+                h = np.maximum(0.0, yy2 - yy1)
+                inter = w * h
+                iou = inter / (area[idx] + area[order[1:]] - inter)
+                order = order[np.where(iou <= threshold)[0] + 1]
+        return np.array(i, dtype=np.int64)
+
+    def nms_fast(self, boxes: np.ndarray, scores: np.ndarray, threshold: float = 0.45) -> np.ndarray:
+        """
+        Fast-NMS on the pairwise IoU matrix, fully vectorized (same scheme as `nms_rotated`).
+
+        A box is dropped when any higher-scoring box overlaps it above the threshold, even if that box was itself
+        suppressed, so it can keep slightly fewer boxes than greedy NMS. The IoU matrix is N x N, so large candidate
+        sets are handed to the OpenCV backend instead.
+        """
+        if boxes.shape[0] > FAST_NMS_MAX_BOXES:
+            return self.nms_cv2(boxes, scores, threshold)
+        sorted_idx = np.argsort(scores)[::-1]
+        sorted_boxes = boxes[sorted_idx]
+        ious = np.triu(self.box_iou(sorted_boxes, sorted_boxes), k=1)
+        pick = np.where(ious.max(axis=0, initial=0) <= threshold)[0]
+        return sorted_idx[pick]
+
+    @staticmethod
+    def nms_cv2(boxes: np.ndarray, scores: np.ndarray, threshold: float = 0.45) -> np.ndarray:
+        """
+        Greedy NMS through OpenCV `cv2.dnn.NMSBoxes`, same picks as `nms_greedy` but the loop runs in C++.
+        """
+        if boxes.shape[0] == 0:
+            return np.zeros((0,), dtype=np.int64)
+        xywh = np.concatenate((boxes[:, :2], boxes[:, 2:4] - boxes[:, :2]), axis=1).astype(np.float64)
+        # 候选框在此之前已按置信度过滤（分数均大于 0），这里不再做分数过滤
+        keep = cv2.dnn.NMSBoxes(xywh.tolist(), scores.astype(np.float32).tolist(), 0.0, threshold)
+        return np.asarray(keep, dtype=np.int64).reshape(-1)
+
+    def nms(self, boxes: np.ndarray, scores: np.ndarray, threshold: float = 0.45,
+            method: str = NMS_METHOD) -> np.ndarray:
+        """
+        Perform NMS on axis-aligned bounding boxes.
+
+        Args:
+            boxes (np.ndarray): Bounding boxes with shape (N, 4) in xyxy format.
+            scores (np.ndarray): Confidence scores with shape (N,).
+            threshold (float): IoU threshold for NMS.
+            method (str): NMS engine:
+                'cv2' - OpenCV NMSBoxes, greedy NMS in C++;
+                'fast' - vectorized Fast-NMS on the IoU matrix;
+                'greedy' - the numpy reference loop.
+
+        Returns:
+            (np.ndarray): Indices of boxes to keep, in descending score order.
+        """
+        if method == 'cv2':
+            return self.nms_cv2(boxes, scores, threshold)
+        elif method == 'fast':
+            return self.nms_fast(boxes, scores, threshold)
+        elif method == 'greedy':
+            return self.nms_greedy(boxes, scores, threshold)
+        raise ValueError(f"Unsupported NMS method: {method}, valid values are 'cv2', 'fast' and 'greedy'")
+
     def clip_boxes(self, boxes: np.ndarray, shape: Tuple[int, int]):
         """
         Clip bounding boxes to image boundaries.
@@ -636,9 +918,12 @@ class SliderV2:
             rotated: bool = False,
             end2end: bool = False,
             return_idxs: bool = False,
+            nms_method: str = NMS_METHOD,
     ):
         """
         Perform non-maximum suppression (NMS) on prediction results.
+
+        `nms_method` selects the engine used for axis-aligned boxes, see `nms`.
         """
         assert 0 <= conf_thres <= 1, f"Invalid Confidence threshold {conf_thres}, valid values are between 0.0 and 1.0"
         assert 0 <= iou_thres <= 1, f"Invalid IoU {iou_thres}, valid values are between 0.0 and 1.0"
@@ -722,25 +1007,7 @@ class SliderV2:
                 i = self.nms_rotated(boxes, scores, iou_thres)
             else:
                 boxes = x[:, :4] + c
-                # Custom NMS for numpy
-                i = []
-                if boxes.shape[0] > 0:
-                    y1, x1, y2, x2 = boxes[:, 1], boxes[:, 0], boxes[:, 3], boxes[:, 2]
-                    area = (x2 - x1) * (y2 - y1)
-                    order = scores.argsort()[::-1]
-                    while order.size > 0:
-                        idx = order[0]
-                        i.append(idx)
-                        xx1 = np.maximum(x1[idx], x1[order[1:]])
-                        yy1 = np.maximum(y1[idx], y1[order[1:]])
-                        xx2 = np.minimum(x2[idx], x2[order[1:]])
-                        yy2 = np.minimum(y2[idx], y2[order[1:]])
-                        w = np.maximum(0.0, xx2 - xx1)
-                        h = np.maximum(0.0, yy2 - yy1)
-                        inter = w * h
-                        iou = inter / (area[idx] + area[order[1:]] - inter)
-                        order = order[np.where(iou <= iou_thres)[0] + 1]
-                i = np.array(i)
+                i = self.nms(boxes, scores, iou_thres, method=nms_method)
 
             i = i[:max_det]
 
@@ -751,6 +1018,125 @@ class SliderV2:
         return (output, keepi) if return_idxs else output
 
 
+class SegmentMasks:
+    """
+    按需计算的实例分割掩膜。
+
+    只保存 proto 和每个实例的掩膜系数，访问某个实例时才在其检测框 ROI 内计算掩膜，不会生成整图大小的数组。
+    结果与 SliderV2.process_mask（整图上采样后再按框裁剪）在插值取整误差内一致：cv2.resize 的插值权重精度
+    与这里的 float32 计算略有差别，掩膜值非常接近 0 的像素可能相差一个（见 tests/test_segment_masks.py）。
+    """
+
+    def __init__(self, protos: np.ndarray, coefficients: np.ndarray, boxes: np.ndarray, shape: Tuple[int, int]):
+        """
+        Args:
+            protos (np.ndarray): Mask prototypes with shape (mask_dim, mask_h, mask_w).
+            coefficients (np.ndarray): Mask coefficients with shape (N, mask_dim).
+            boxes (np.ndarray): Bounding boxes with shape (N, 4) in xyxy format, in original image coordinates.
+            shape (tuple): Original image size as (height, width).
+        """
+        self.protos = protos
+        self.coefficients = coefficients
+        self.boxes = boxes[:, :4]
+        self.shape = tuple(shape[:2])
+
+        # proto 上去掉 letterbox 填充后的有效区域，与 scale_masks 的裁剪方式相同
+        _, mh, mw = protos.shape
+        gain = min(mh / self.shape[0], mw / self.shape[1])
+        pad_w, pad_h = (mw - self.shape[1] * gain) / 2, (mh - self.shape[0] * gain) / 2
+        self.top, self.left = int(round(pad_h)), int(round(pad_w))
+        self.crop_h = mh - int(round(pad_h)) - self.top
+        self.crop_w = mw - int(round(pad_w)) - self.left
+
+        self._rois = {}
+        self._segments = {}
+
+    def __len__(self):
+        return len(self.coefficients)
+
+    @staticmethod
+    def _linear_taps(start: int, stop: int, src_len: int, dst_len: int):
+        """
+        计算 cv2.resize(INTER_LINEAR) 中目标像素 [start, stop) 对应的源像素下标和插值权重。
+        """
+        f = (np.arange(start, stop, dtype=np.float64) + 0.5) * (src_len / dst_len) - 0.5
+        i0 = np.floor(f).astype(np.int64)
+        w = (f - i0).astype(np.float32)
+        # 与 OpenCV 一致：越界时取边缘像素
+        low, high = i0 < 0, i0 >= src_len - 1
+        w[low | high] = 0
+        i0[low] = 0
+        i0[high] = src_len - 1
+        i1 = np.minimum(i0 + 1, src_len - 1)
+        return i0, i1, w
+
+    def roi(self, index: int) -> Tuple[np.ndarray, Tuple[int, int]]:
+        """
+        返回第 index 个实例在检测框内的二值掩膜，以及 ROI 左上角在原图中的坐标 (x, y)。
+        """
+        if index in self._rois:
+            return self._rois[index]
+
+        h, w = self.shape
+        x1, y1, x2, y2 = self.boxes[index]
+        # crop_mask 保留 x1 <= col < x2、y1 <= row < y2 的像素
+        cx0, cx1 = (min(max(int(np.ceil(v)), 0), w) for v in (x1, x2))
+        cy0, cy1 = (min(max(int(np.ceil(v)), 0), h) for v in (y1, y2))
+        if cx1 <= cx0 or cy1 <= cy0:
+            result = np.zeros((0, 0), dtype=bool), (cx0, cy0)
+            self._rois[index] = result
+            return result
+
+        xi0, xi1, wx = self._linear_taps(cx0, cx1, self.crop_w, w)
+        yi0, yi1, wy = self._linear_taps(cy0, cy1, self.crop_h, h)
+        xs, xe = int(xi0[0]), int(xi1[-1]) + 1
+        ys, ye = int(yi0[0]), int(yi1[-1]) + 1
+
+        # 只对 ROI 覆盖到的 proto 窗口做矩阵乘法
+        c = self.protos.shape[0]
+        window = self.protos[:, self.top + ys:self.top + ye, self.left + xs:self.left + xe]
+        proto_roi = (self.coefficients[index] @ window.reshape(c, -1)).reshape(ye - ys, xe - xs)
+
+        rows = proto_roi[yi0 - ys] * (1 - wy)[:, None] + proto_roi[yi1 - ys] * wy[:, None]
+        mask = rows[:, xi0 - xs] * (1 - wx) + rows[:, xi1 - xs] * wx
+        result = mask > 0.0, (cx0, cy0)
+        self._rois[index] = result
+        return result
+
+    def segment(self, index: int, strategy: str = "largest") -> np.ndarray:
+        """
+        返回第 index 个实例的轮廓点 (N, 2)，坐标为原图坐标，只在 ROI 上查找轮廓。
+        """
+        key = (index, strategy)
+        if key not in self._segments:
+            mask, offset = self.roi(index)
+            if mask.size == 0:
+                self._segments[key] = np.zeros((0, 2), dtype=np.float32)
+            else:
+                self._segments[key] = SliderV2.masks_to_segments(mask, strategy=strategy, offset=offset)
+        return self._segments[key]
+
+    def segments(self, strategy: str = "largest") -> List[np.ndarray]:
+        return [self.segment(index, strategy) for index in range(len(self))]
+
+    def mask(self, index: int) -> np.ndarray:
+        """
+        返回第 index 个实例的整图大小二值掩膜（仅用于可视化等需要整图的场景）。
+        """
+        full = np.zeros(self.shape, dtype=bool)
+        roi, (x, y) = self.roi(index)
+        full[y:y + roi.shape[0], x:x + roi.shape[1]] = roi
+        return full
+
+    def __iter__(self):
+        for index in range(len(self)):
+            yield self.mask(index)
+
+    def __array__(self, dtype=None, copy=None):
+        masks = np.stack(list(self)) if len(self) else np.zeros((0, *self.shape), dtype=bool)
+        return masks.astype(dtype) if dtype is not None else masks
+
+
 if __name__ == "__main__":
     """
     单缺口
@@ -0,0 +1,16 @@
+import os
+
+# 模型精度变体，非 fp32 变体由 captcha_recognizer.quantize 从原模型生成
+MODEL_VARIANTS = ('fp32', 'fp16', 'int8', 'int8-static')
+
+
+def variant_path(model_path: str, variant: str = 'fp32') -> str:
+    """
+    返回模型某个精度变体的文件路径，例如 slider-v2.onnx 的 int8 变体为 slider-v2.int8.onnx。
+    """
+    if variant not in MODEL_VARIANTS:
+        raise ValueError(f"Unsupported model variant: {variant}, valid values are {', '.join(MODEL_VARIANTS)}")
+    if variant == 'fp32':
+        return model_path
+    root, ext = os.path.splitext(model_path)
+    return f'{root}.{variant}{ext}'
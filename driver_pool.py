@@ -0,0 +1,359 @@
+"""
+预启动的 Edge WebDriver 池。
+
+每个登录任务都从零启动 msedgedriver 和浏览器要好几秒。DriverPool 预先启动 size 个无头浏览器，
+任务借出一个使用，归还时清理 cookie、本地存储和多余的标签页后放回池中，下一个任务直接使用。
+
+浏览器在以下情况下被回收（关闭后在后台重新启动一个补位）：
+- 已经执行了 max_jobs 个任务；
+- 浏览器进程（msedgedriver 及其子进程）的内存比刚启动时增长超过 max_memory_growth_mb（需要 psutil）；
+- 清理失败、借出时已经失去响应，或调用方归还时要求丢弃。
+
+selenium 只在创建浏览器时导入，导入本模块不会拖慢启动。
+"""
+import logging
+import queue
+import threading
+import time
+from collections import Counter, deque
+from contextlib import contextmanager
+from typing import Callable, Dict, Iterator, Optional, Sequence
+from urllib.parse import urlsplit
+
+try:
+    import psutil
+except ImportError:  # psutil 为可选依赖，没有时不按内存回收
+    psutil = None
+
+logger = logging.getLogger(__name__)
+
+DRIVER_POOL_SIZE = 1
+
+# 每个浏览器最多执行的任务数，之后关闭并重新启动
+DRIVER_MAX_JOBS = 20
+
+# 浏览器进程内存比启动时增长超过该值（MB）时回收，0 表示不按内存回收
+DRIVER_MAX_MEMORY_GROWTH_MB = 500
+
+# 等待空闲浏览器时检查启动失败的间隔（秒）
+POLL_INTERVAL = 0.5
+
+# 计算借出等待时间分位数时保留的最近样本数
+WAIT_SAMPLES = 1024
+
+
+def create_edge_driver(driver_path: str, headless: bool = True, download_dir: Optional[str] = None,
+                       window_size: str = '1280,1024'):
+    """
+    按登录流程需要的参数启动一个 Edge 浏览器。
+    """
+    from selenium import webdriver
+    from selenium.webdriver.edge.service import Service
+
+    options = webdriver.EdgeOptions()
+    options.add_argument('--disable-blink-features=AutomationControlled')
+    options.add_experimental_option("excludeSwitches", ["enable-automation"])
+    options.add_experimental_option('useAutomationExtension', False)
+    options.add_argument(f"--window-size={window_size}")
+    if headless:
+        options.add_argument("--headless")  # 无头模式，适合服务器运行
+
+    if download_dir:
+        options.add_experimental_option("prefs", {
+            "download.default_directory": download_dir,
+            "download.prompt_for_download": False,
+            "download.directory_upgrade": True,
+            "safebrowsing.enabled": True
+        })
+
+    driver = webdriver.Edge(service=Service(driver_path), options=options)
+    driver.execute_script("Object.defineProperty(navigator, 'webdriver', {get: () => undefined})")
+    return driver
+
+
+def browser_memory_mb(driver) -> Optional[float]:
+    """
+    msedgedriver 进程及其全部子进程（浏览器、渲染进程等）的常驻内存之和，无法获取时返回 None。
+    """
+    if psutil is None:
+        return None
+    try:
+        process = psutil.Process(driver.service.process.pid)
+        processes = [process, *process.children(recursive=True)]
+    except Exception:
+        return None
+    total = 0
+    for proc in processes:
+        try:
+            total += proc.memory_info().rss
+        except psutil.Error:
+            pass
+    return total / 1024 / 1024
+
+
+def origin_of(url: str) -> Optional[str]:
+    parts = urlsplit(url)
+    return f'{parts.scheme}://{parts.netloc}' if parts.scheme in ('http', 'https') and parts.netloc else None
+
+
+def reset_driver(driver, origins: Sequence[str] = ()):
+    """
+    清理一个浏览器，使下一个任务看不到上一个任务的状态：关闭多余的标签页，清空全部 cookie、
+    当前页面和 origins 中各站点的 localStorage / sessionStorage / IndexedDB 等，最后停在空白页。
+    """
+    handles = driver.window_handles
+    for handle in handles[1:]:
+        driver.switch_to.window(handle)
+        driver.close()
+    driver.switch_to.window(handles[0])
+
+    origins = set(origins)
+    current = origin_of(driver.current_url)
+    if current:
+        origins.add(current)
+    try:
+        # Chromium 内核（Edge）通过 CDP 一次清空所有站点的 cookie 和指定站点的存储
+        driver.execute_cdp_cmd('Network.clearBrowserCookies', {})
+        for origin in origins:
+            driver.execute_cdp_cmd('Storage.clearDataForOrigin', {'origin': origin, 'storageTypes': 'all'})
+    except Exception:
+        # 不支持 CDP 的驱动只能清理当前站点
+        driver.delete_all_cookies()
+        if current:
+            driver.execute_script('window.localStorage.clear(); window.sessionStorage.clear();')
+    driver.get('about:blank')
+
+
+class _Entry:
+    __slots__ = ('driver', 'jobs', 'launched_at', 'baseline_mb')
+
+    def __init__(self, driver):
+        self.driver = driver
+        self.jobs = 0
+        self.launched_at = time.time()
+        self.baseline_mb = browser_memory_mb(driver)
+
+
+class DriverPool:
+    """
+    WebDriver 池。通过 checkout() 借出（with 块结束时归还），或者成对调用 acquire / release。
+
+    池按需启动：第一次借出时（或调用 start 后）启动 size 个浏览器，全部借出时调用方阻塞等待。
+    reset_origins 为任务会访问的站点，归还时清理这些站点的存储（cookie 总是全部清空）。
+    """
+
+    def __init__(self, factory: Callable, size: int = DRIVER_POOL_SIZE, max_jobs: int = DRIVER_MAX_JOBS,
+                 max_memory_growth_mb: float = DRIVER_MAX_MEMORY_GROWTH_MB, reset_origins: Sequence[str] = ()):
+        if size < 1:
+            raise ValueError(f"Driver pool size must be at least 1, got {size}")
+        self.factory = factory
+        self.size = size
+        self.max_jobs = max_jobs
+        self.max_memory_growth_mb = max_memory_growth_mb
+        self.reset_origins = tuple(filter(None, (origin_of(url) or url for url in reset_origins)))
+
+        self._idle: queue.Queue = queue.Queue()
+        self._leased: Dict[int, _Entry] = {}
+        self._lock = threading.Lock()
+        self._closed = False
+        # 已启动和正在启动的浏览器数，不超过 size
+        self._slots = 0
+
+        self._launched = 0
+        self._launch_failures = 0
+        self._last_failure = 0.0
+        self._last_error = ''
+        self._launch_time = 0.0
+        self._recycled: Counter = Counter()
+        self._checkouts = 0
+        self._waits = deque(maxlen=WAIT_SAMPLES)
+        self._wait_total = 0.0
+
+    def start(self, wait: bool = False, timeout: Optional[float] = None) -> 'DriverPool':
+        """
+        在后台启动浏览器直到池满（也用于补齐启动失败的位置）；wait=True 时等待至少一个浏览器可用（或 timeout 秒）。
+        """
+        with self._lock:
+            missing = max(self.size - self._slots, 0)
+            self._slots += missing
+        for _ in range(missing):
+            self._launch_async()
+        if wait:
+            deadline = None if timeout is None else time.perf_counter() + timeout
+            while self._idle.empty() and not self._closed:
+                if deadline is not None and time.perf_counter() > deadline:
+                    break
+                time.sleep(0.05)
+        return self
+
+    def _launch_async(self):
+        threading.Thread(target=self._launch, name='driver-pool-launch', daemon=True).start()
+
+    def _launch(self):
+        start = time.perf_counter()
+        try:
+            driver = self.factory()
+        except Exception as e:
+            logger.error(f"浏览器启动失败: {e}")
+            with self._lock:
+                self._slots -= 1
+                self._launch_failures += 1
+                self._last_failure = time.perf_counter()
+                self._last_error = f'{type(e).__name__}: {e}'
+            return
+        entry = _Entry(driver)
+        with self._lock:
+            self._launched += 1
+            self._launch_time += time.perf_counter() - start
+            closed = self._closed
+        if closed:
+            with self._lock:
+                self._slots -= 1
+            self._quit(entry)
+            return
+        self._idle.put(entry)
+
+    @staticmethod
+    def _quit(entry: _Entry):
+        try:
+            entry.driver.quit()
+        except Exception as e:
+            logger.warning(f"关闭浏览器失败: {e}")
+
+    def _retire(self, entry: _Entry, reason: str):
+        """
+        关闭一个浏览器，并在后台启动一个新的补位。
+        """
+        logger.info(f"回收浏览器（{reason}，已执行 {entry.jobs} 个任务）")
+        with self._lock:
+            self._recycled[reason] += 1
+            closed = self._closed
+            if closed:
+                self._slots -= 1
+        threading.Thread(target=self._quit, args=(entry,), name='driver-pool-quit', daemon=True).start()
+        if not closed:
+            self._launch_async()
+
+    @staticmethod
+    def _alive(entry: _Entry) -> bool:
+        try:
+            entry.driver.current_url
+            return True
+        except Exception:
+            return False
+
+    def acquire(self, timeout: Optional[float] = None):
+        """
+        借出一个已清理的浏览器；timeout 秒内没有可用浏览器时抛出 TimeoutError。
+        """
+        if self._closed:
+            raise RuntimeError("DriverPool 已关闭")
+        start = time.perf_counter()
+        # 首次借出时启动整个池；之前启动失败的位置在这里重新尝试
+        self.start()
+        deadline = None if timeout is None else start + timeout
+        while True:
+            remaining = POLL_INTERVAL
+            if deadline is not None:
+                remaining = min(max(deadline - time.perf_counter(), 0), POLL_INTERVAL)
+            try:
+                entry = self._idle.get(timeout=remaining)
+            except queue.Empty:
+                with self._lock:
+                    # 没有可用、也没有正在启动的浏览器，且本次借出开始后启动失败过：不会再有浏览器了
+                    failed = self._slots == 0 and self._last_failure > start
+                if failed:
+                    raise RuntimeError(f"浏览器启动失败: {self._last_error}")
+                if deadline is not None and time.perf_counter() >= deadline:
+                    raise TimeoutError(f"No idle browser within {timeout}s (pool size {self.size})")
+                continue
+            if self._alive(entry):
+                break
+            self._retire(entry, 'unresponsive')
+
+        waited = time.perf_counter() - start
+        with self._lock:
+            self._leased[id(entry.driver)] = entry
+            self._checkouts += 1
+            self._waits.append(waited)
+            self._wait_total += waited
+        return entry.driver
+
+    def release(self, driver, discard: bool = False):
+        """
+        归还浏览器。discard=True 时直接回收（例如任务中浏览器崩溃）。
+        """
+        with self._lock:
+            entry = self._leased.pop(id(driver), None)
+        if entry is None:
+            raise ValueError("该浏览器不是从本池借出的")
+        entry.jobs += 1
+
+        reason = None
+        if discard:
+            reason = 'discarded'
+        elif self._closed:
+            reason = 'closed'
+        elif self.max_jobs and entry.jobs >= self.max_jobs:
+            reason = 'max_jobs'
+        elif self.max_memory_growth_mb and entry.baseline_mb is not None:
+            memory = browser_memory_mb(driver)
+            if memory is not None and memory - entry.baseline_mb > self.max_memory_growth_mb:
+                reason = 'memory'
+        if reason is None:
+            try:
+                reset_driver(driver, self.reset_origins)
+            except Exception as e:
+                logger.warning(f"清理浏览器失败: {e}")
+                reason = 'reset_failed'
+
+        if reason is None:
+            self._idle.put(entry)
+        else:
+            self._retire(entry, reason)
+
+    @contextmanager
+    def checkout(self, timeout: Optional[float] = None) -> Iterator:
+        """
+        借出一个浏览器，with 块结束时归还；块内抛出异常时仍然清理后放回池中。
+        """
+        driver = self.acquire(timeout)
+        try:
+            yield driver
+        finally:
+            self.release(driver)
+
+    def close(self):
+        """
+        关闭全部空闲浏览器；借出中的浏览器在归还时关闭。
+        """
+        with self._lock:
+            self._closed = True
+        while True:
+            try:
+                entry = self._idle.get_nowait()
+            except queue.Empty:
+                break
+            with self._lock:
+                self._slots -= 1
+            self._quit(entry)
+
+    def metrics(self) -> Dict:
+        with self._lock:
+            waits = sorted(self._waits)
+            in_use = len(self._leased)
+            return {
+                'size': self.size,
+                'idle': self._idle.qsize(),
+                'in_use': in_use,
+                'occupancy': round(in_use / self.size, 3),
+                'starting': max(self._slots - in_use - self._idle.qsize(), 0),
+                'launched': self._launched,
+                'launch_failures': self._launch_failures,
+                'mean_launch_ms': round(self._launch_time / self._launched * 1000, 1) if self._launched else None,
+                'recycled': dict(self._recycled),
+                'checkouts': self._checkouts,
+                'mean_checkout_ms': round(self._wait_total / self._checkouts * 1000, 2) if self._checkouts else None,
+                'p95_checkout_ms': round(waits[int(0.95 * (len(waits) - 1))] * 1000, 2) if waits else None,
+                'max_checkout_ms': round(waits[-1] * 1000, 2) if waits else None,
+            }
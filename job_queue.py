@@ -0,0 +1,300 @@
+"""
+基于 SQLite 的持久任务队列。
+
+任务写入 SQLite 文件后才算提交成功，进程崩溃或重启后未完成的任务仍在队列中：
+- 优先级：priority 越小越先执行，同一优先级按提交顺序；
+- 有界：排在新任务前面或同级的等待任务（priority 不大于它的）达到 max_depth 时 put 抛出 QueueFull，
+  调用方应拒绝请求。这样每个任务要等的任务数有上限，低优先级任务堆积时也不会挡住高优先级任务；
+- 可见性超时：lease 取出的任务在 visibility_timeout 秒内对其他消费者不可见，执行者应在此之前用 renew 续租；
+  超时既没有 ack 也没有续租的任务重新可见（视为执行者崩溃），再次取出时 attempts 加一；
+- 恢复：requeue_leased 把上一个进程取出但没有完成的任务立即放回队列，不必等可见性超时。
+
+每个任务有两部分数据：meta（任务描述和结果，完成后保留供查询）和 payload（可选的执行参数，ack 后清空）。
+传入 cipher 时 payload 加密后写入文件（见 DpapiCipher，密钥不在队列文件中），否则以明文写入，不要放密码等敏感信息；
+文件队列开启 secure_delete，清空的 payload 不会残留在数据库文件的空闲页中。
+一个队列文件只应由一个进程使用；path 为 ':memory:' 时只保存在内存中。
+"""
+import base64
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+from collections import Counter, defaultdict, deque
+from typing import Any, Dict, List, NamedTuple, Optional
+
+logger = logging.getLogger(__name__)
+
+# 每个任务前面（含同优先级）最多等待的任务数
+QUEUE_MAX_DEPTH = 8
+
+# 取出后多久（秒）没有 ack 就重新可见，应大于单个任务的最长执行时间
+VISIBILITY_TIMEOUT = 600
+
+# 计算排队时间分位数时每个优先级保留的最近样本数
+WAIT_SAMPLES = 1024
+
+QUEUED = 'queued'
+LEASED = 'leased'
+DONE = 'done'
+
+# DPAPI 不弹出任何交互界面（服务进程里没有桌面）
+CRYPTPROTECT_UI_FORBIDDEN = 0x1
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS jobs (
+    id          TEXT PRIMARY KEY,
+    priority    INTEGER NOT NULL,
+    state       TEXT NOT NULL,
+    meta        TEXT NOT NULL,
+    payload     TEXT,
+    enqueued_at REAL NOT NULL,
+    lease_until REAL,
+    attempts    INTEGER NOT NULL DEFAULT 0,
+    finished_at REAL
+);
+CREATE INDEX IF NOT EXISTS jobs_ready ON jobs (state, priority, enqueued_at);
+"""
+
+
+class QueueFull(Exception):
+    """等待执行的任务已达上限"""
+
+
+class DpapiCipher:
+    """
+    用 Windows DPAPI 加密 payload：密钥由系统按当前 Windows 账户管理，不保存在队列文件中，
+    换一台机器或换一个账户都无法解密。
+    """
+
+    def __init__(self):
+        import win32crypt
+
+        self._crypt = win32crypt
+
+    def encrypt(self, data: bytes) -> bytes:
+        return self._crypt.CryptProtectData(data, None, None, None, None, CRYPTPROTECT_UI_FORBIDDEN)
+
+    def decrypt(self, data: bytes) -> bytes:
+        return self._crypt.CryptUnprotectData(data, None, None, None, CRYPTPROTECT_UI_FORBIDDEN)[1]
+
+
+def default_cipher() -> Optional[DpapiCipher]:
+    """
+    当前系统可用的 payload 加密方式；没有安装 pywin32（非 Windows）时返回 None。
+    """
+    try:
+        return DpapiCipher()
+    except ImportError:
+        return None
+
+
+class Lease(NamedTuple):
+    id: str
+    priority: int
+    meta: Dict
+    payload: Any
+    enqueued_at: float
+    attempts: int  # 包括本次在内被取出的次数，ack 时用来确认租约仍属于自己
+
+
+class QueueItem(NamedTuple):
+    id: str
+    priority: int
+    state: str
+    meta: Dict
+    enqueued_at: float
+    attempts: int
+    finished_at: Optional[float]
+
+
+class JobQueue:
+    """
+    持久任务队列。所有方法都是线程安全的；lease 在没有可执行任务时阻塞等待 put。
+    """
+
+    def __init__(self, path: str = ':memory:', max_depth: int = QUEUE_MAX_DEPTH,
+                 visibility_timeout: float = VISIBILITY_TIMEOUT, cipher=None):
+        self.path = path
+        self.max_depth = max_depth
+        self.visibility_timeout = visibility_timeout
+        self.cipher = cipher
+        if path != ':memory:':
+            os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self._db = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        if path != ':memory:':
+            self._db.execute('PRAGMA journal_mode=WAL')
+            self._db.execute('PRAGMA synchronous=NORMAL')
+            self._db.execute('PRAGMA secure_delete=ON')
+        self._db.executescript(SCHEMA)
+        self._lock = threading.Lock()
+        self._ready = threading.Condition(self._lock)
+
+        self._rejected: Counter = Counter()
+        self._redelivered = 0
+        self._recovered = 0
+        self._waits = defaultdict(lambda: deque(maxlen=WAIT_SAMPLES))
+
+    @property
+    def encrypted(self) -> bool:
+        return self.cipher is not None
+
+    def _dump_payload(self, payload: Any) -> Optional[str]:
+        if payload is None:
+            return None
+        data = json.dumps(payload)
+        if self.cipher is None:
+            return data
+        return base64.b64encode(self.cipher.encrypt(data.encode('utf-8'))).decode('ascii')
+
+    def _load_payload(self, item_id: str, data: Optional[str]) -> Any:
+        if data is None:
+            return None
+        if self.cipher is None:
+            return json.loads(data)
+        try:
+            return json.loads(self.cipher.decrypt(base64.b64decode(data)).decode('utf-8'))
+        except Exception as e:
+            # 例如换了 Windows 账户：参数无法恢复，由调用方按没有 payload 处理
+            logger.warning(f"任务 {item_id} 的参数无法解密，已忽略: {e}")
+            return None
+
+    def _depth(self, priority: int) -> int:
+        return self._db.execute("SELECT COUNT(*) FROM jobs WHERE state = ? AND priority <= ?",
+                                (QUEUED, priority)).fetchone()[0]
+
+    def put(self, item_id: str, meta: Dict, payload: Any = None, priority: int = 0):
+        """
+        提交任务；优先级不低于它的等待任务已达 max_depth 时抛出 QueueFull。
+        """
+        with self._ready:
+            if self.max_depth and self._depth(priority) >= self.max_depth:
+                self._rejected[priority] += 1
+                raise QueueFull(f"{self.max_depth} jobs already waiting")
+            self._db.execute(
+                "INSERT INTO jobs (id, priority, state, meta, payload, enqueued_at) VALUES (?, ?, ?, ?, ?, ?)",
+                (item_id, priority, QUEUED, json.dumps(meta, ensure_ascii=False), self._dump_payload(payload),
+                 time.time()))
+            self._ready.notify()
+
+    def lease(self, timeout: Optional[float] = None) -> Optional[Lease]:
+        """
+        取出优先级最高、最早提交的可执行任务（包括可见性超时的任务）；timeout 秒内没有时返回 None。
+        """
+        deadline = None if timeout is None else time.monotonic() + timeout
+        with self._ready:
+            while True:
+                now = time.time()
+                row = self._db.execute(
+                    "SELECT id, priority, state, meta, payload, enqueued_at, attempts FROM jobs "
+                    "WHERE state = ? OR (state = ? AND lease_until < ?) ORDER BY priority, enqueued_at LIMIT 1",
+                    (QUEUED, LEASED, now)).fetchone()
+                if row is not None:
+                    break
+                remaining = None if deadline is None else deadline - time.monotonic()
+                if remaining is not None and remaining <= 0:
+                    return None
+                # 可见性超时不会触发通知，最多等 1 秒重新检查
+                self._ready.wait(1.0 if remaining is None else min(remaining, 1.0))
+
+            item_id, priority, state, meta, payload, enqueued_at, attempts = row
+            self._db.execute("UPDATE jobs SET state = ?, lease_until = ?, attempts = ? WHERE id = ?",
+                             (LEASED, now + self.visibility_timeout, attempts + 1, item_id))
+            if state == LEASED:
+                self._redelivered += 1
+            self._waits[priority].append(now - enqueued_at)
+        return Lease(item_id, priority, json.loads(meta), self._load_payload(item_id, payload), enqueued_at,
+                     attempts + 1)
+
+    def ack(self, lease: Lease, meta: Optional[Dict] = None) -> bool:
+        """
+        标记任务完成，保存最终的 meta 并清空 payload。租约已经超时并被重新取出时返回 False（结果不写入）。
+        """
+        with self._lock:
+            cursor = self._db.execute(
+                "UPDATE jobs SET state = ?, meta = ?, payload = NULL, lease_until = NULL, finished_at = ? "
+                "WHERE id = ? AND state = ? AND attempts = ?",
+                (DONE, json.dumps(meta if meta is not None else lease.meta, ensure_ascii=False), time.time(),
+                 lease.id, LEASED, lease.attempts))
+            return cursor.rowcount == 1
+
+    def renew(self, leases: List[Lease]) -> int:
+        """
+        给仍在执行的任务续租，lease_until 重新从现在算起；已经 ack 或被重新取出的租约不受影响。返回续租的数量。
+        """
+        if not leases:
+            return 0
+        with self._lock:
+            lease_until = time.time() + self.visibility_timeout
+            return sum(self._db.execute("UPDATE jobs SET lease_until = ? WHERE id = ? AND state = ? AND attempts = ?",
+                                        (lease_until, lease.id, LEASED, lease.attempts)).rowcount
+                       for lease in leases)
+
+    def requeue_leased(self) -> int:
+        """
+        进程启动时调用：把取出后没有完成的任务放回队列（保持原来的排队顺序），返回数量。
+        """
+        with self._ready:
+            cursor = self._db.execute("UPDATE jobs SET state = ?, lease_until = NULL WHERE state = ?",
+                                      (QUEUED, LEASED))
+            self._recovered += cursor.rowcount
+            self._ready.notify_all()
+            return cursor.rowcount
+
+    def items(self) -> List[QueueItem]:
+        """
+        队列中的全部任务（包括已完成、尚未清除的），按提交顺序。
+        """
+        with self._lock:
+            rows = self._db.execute("SELECT id, priority, state, meta, enqueued_at, attempts, finished_at FROM jobs "
+                                    "ORDER BY enqueued_at").fetchall()
+        return [QueueItem(item_id, priority, state, json.loads(meta), enqueued_at, attempts, finished_at)
+                for item_id, priority, state, meta, enqueued_at, attempts, finished_at in rows]
+
+    def purge(self, finished_before: float) -> int:
+        """
+        删除 finished_before 之前完成的任务，返回数量。
+        """
+        with self._lock:
+            return self._db.execute("DELETE FROM jobs WHERE state = ? AND finished_at < ?",
+                                    (DONE, finished_before)).rowcount
+
+    def close(self):
+        with self._lock:
+            self._db.close()
+
+    def metrics(self) -> Dict:
+        with self._lock:
+            now = time.time()
+            rows = self._db.execute("SELECT priority, state, COUNT(*), MIN(enqueued_at) FROM jobs "
+                                    "GROUP BY priority, state").fetchall()
+            depth, leased, oldest = Counter(), 0, None
+            for priority, state, count, first in rows:
+                if state == QUEUED:
+                    depth[priority] += count
+                    oldest = first if oldest is None else min(oldest, first)
+                elif state == LEASED:
+                    leased += count
+            waits = {}
+            for priority, samples in sorted(self._waits.items()):
+                ordered = sorted(samples)
+                waits[priority] = {
+                    'count': len(ordered),
+                    'p50_wait_ms': round(ordered[int(0.5 * (len(ordered) - 1))] * 1000, 1),
+                    'p95_wait_ms': round(ordered[int(0.95 * (len(ordered) - 1))] * 1000, 1),
+                    'max_wait_ms': round(ordered[-1] * 1000, 1),
+                }
+            return {
+                'durable': self.path != ':memory:',
+                'encrypted': self.encrypted,
+                'depth': sum(depth.values()),
+                'max_depth': self.max_depth,
+                'depth_by_priority': dict(sorted(depth.items())),
+                'oldest_wait_ms': round((now - oldest) * 1000, 1) if oldest is not None else None,
+                'leased': leased,
+                'rejected': dict(self._rejected),
+                'redelivered': self._redelivered,
+                'recovered': self._recovered,
+                'wait_by_priority': waits,
+            }
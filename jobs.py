@@ -0,0 +1,351 @@
+"""
+登录打证任务表和工作线程池。
+
+每个登录请求创建一个 Job（带唯一 id），提交到持久任务队列（job_queue.JobQueue，SQLite 文件），
+由 workers 个工作线程按优先级并行执行；任务的 user_type / document_type / error_type 和结果都记在各自的 Job 上，
+多个终端同时办理互不影响。排在前面的任务达到上限时 submit 抛出 JobQueueFull，调用方应拒绝请求（例如返回 429）。
+
+执行参数（用户名、密码）只有在队列可以加密时（cipher，见 job_queue.DpapiCipher）才加密写入队列文件，
+否则只保存在内存中。进程重启后，上次排队或执行到一半的任务从队列文件恢复：有加密参数的任务重新执行，
+每个任务最多被取出 max_attempts 次；没有参数的任务（未加密的队列）以失败结束并提示重新提交。
+已结束的任务结果仍可查询，保留 ttl 秒，之后从任务表和队列文件中删除。
+"""
+import logging
+import threading
+import time
+import uuid
+from collections import defaultdict, deque
+from typing import Callable, Dict, Optional, Tuple
+
+from job_queue import DONE, QUEUED, VISIBILITY_TIMEOUT, JobQueue, Lease, QueueFull as JobQueueFull
+
+logger = logging.getLogger(__name__)
+
+# 同时执行的任务数（每个任务占用一个浏览器）
+JOB_WORKERS = 2
+
+# 新任务前面（含同优先级）最多排队的任务数，超过时拒绝新任务
+JOB_QUEUE_SIZE = 8
+
+# 已结束的任务保留多久（秒）供查询结果
+JOB_TTL = 1800
+
+# 一个任务最多被取出执行的次数（进程崩溃或执行超时后会重新执行），超过后直接以失败结束
+JOB_MAX_ATTEMPTS = 3
+
+# 优先级：数值越小越先执行，例如柜台人员代办的任务先于自助终端
+PRIORITIES = {'counter': 0, 'kiosk': 1}
+DEFAULT_PRIORITY = 'kiosk'
+
+# 计算执行时间分位数时保留的最近样本数
+JOB_SAMPLES = 1024
+
+# 读取任务队列出错（例如数据库文件被锁）时，工作线程等待多久（秒）再重试
+QUEUE_RETRY_INTERVAL = 1.0
+
+RUNNING = 'running'
+
+
+class Job:
+    """
+    一个登录打证任务。用户名和密码只作为执行参数交给 JobEngine（内存中，队列可以加密时另存一份密文），
+    不保存在 Job 上，也不写入明文。
+    """
+
+    def __init__(self, user_type: str, document_type: str, client: str = '', priority: str = DEFAULT_PRIORITY):
+        if priority not in PRIORITIES:
+            raise ValueError(f"Unsupported priority: {priority}, valid values are {', '.join(PRIORITIES)}")
+        self.id = uuid.uuid4().hex
+        self.user_type = user_type
+        self.document_type = document_type
+        self.client = client  # 提交任务的终端，用于不带 job_id 的查询
+        self.priority = priority
+        self.state = QUEUED
+        self.success = False
+        self.message = '正在排队...'
+        self.error_type = ''
+        self.attempts = 0
+        self.timings: Dict = {}  # 各步骤的等待耗时，见 waits.Waiter.summary
+        self.created_at = time.time()
+        self.started_at: Optional[float] = None
+        self.finished_at: Optional[float] = None
+
+    @property
+    def processing(self) -> bool:
+        return self.state != DONE
+
+    def to_dict(self) -> Dict:
+        return {
+            'job_id': self.id,
+            'state': self.state,
+            'user_type': self.user_type,
+            'document_type': self.document_type,
+            'client': self.client,
+            'priority': self.priority,
+            'success': self.success,
+            'message': self.message,
+            'error_type': self.error_type,
+            'attempts': self.attempts,
+            'timings': self.timings,
+            'created_at': self.created_at,
+            'started_at': self.started_at,
+            'finished_at': self.finished_at,
+        }
+
+    @classmethod
+    def from_dict(cls, data: Dict) -> 'Job':
+        job = cls(data['user_type'], data['document_type'], data.get('client', ''),
+                  data.get('priority', DEFAULT_PRIORITY))
+        for key in ('state', 'success', 'message', 'error_type', 'attempts', 'timings', 'created_at', 'started_at',
+                    'finished_at'):
+            if key in data:
+                setattr(job, key, data[key])
+        job.id = data['job_id']
+        return job
+
+
+def _percentile_ms(samples, q: float) -> Optional[float]:
+    if not samples:
+        return None
+    ordered = sorted(samples)
+    return round(ordered[int(q * (len(ordered) - 1))] * 1000, 1)
+
+
+class JobEngine:
+    """
+    任务表 + 持久队列 + 工作线程池。runner(job, *args) 在工作线程中执行，返回 (success, message)；
+    抛出异常时任务以失败结束。第一次使用（或调用 start）时恢复队列文件中的任务并启动工作线程。
+
+    path 为队列文件，None 表示只保存在内存中（重启后丢失）。cipher 为 None 时执行参数不写入队列文件。
+    """
+
+    def __init__(self, runner: Callable[..., Tuple[bool, str]], workers: int = JOB_WORKERS,
+                 max_pending: int = JOB_QUEUE_SIZE, ttl: float = JOB_TTL, path: Optional[str] = None,
+                 visibility_timeout: float = VISIBILITY_TIMEOUT, max_attempts: int = JOB_MAX_ATTEMPTS,
+                 cipher=None):
+        if workers < 1:
+            raise ValueError(f"Job workers must be at least 1, got {workers}")
+        self.runner = runner
+        self.workers = workers
+        self.max_pending = max_pending
+        self.ttl = ttl
+        self.path = path
+        self.visibility_timeout = visibility_timeout
+        self.max_attempts = max_attempts
+        self.cipher = cipher
+
+        self.queue: Optional[JobQueue] = None
+        self._jobs: Dict[str, Job] = {}
+        self._latest: Dict[str, str] = {}  # client -> 最近一次提交的 job id
+        self._lock = threading.Lock()
+        self._threads = []
+        self._leases: Dict[str, Lease] = {}  # 本进程正在执行的任务，由心跳线程续租
+        self._args: Dict[str, tuple] = {}  # job id -> 执行参数（本进程提交的任务）
+
+        self._submitted = 0
+        self._succeeded = 0
+        self._failed = 0
+        self._abandoned = 0
+        self._interrupted = 0
+        self._duplicates = 0
+        self._durations = deque(maxlen=JOB_SAMPLES)
+        self._steps: Dict[str, deque] = defaultdict(lambda: deque(maxlen=JOB_SAMPLES))
+
+    def start(self) -> 'JobEngine':
+        if self._threads:
+            return self
+        with self._lock:
+            if self._threads:
+                return self
+            self.queue = JobQueue(self.path or ':memory:', max_depth=self.max_pending,
+                                  visibility_timeout=self.visibility_timeout, cipher=self.cipher)
+            recovered = self.queue.requeue_leased()
+            for item in self.queue.items():
+                try:
+                    job = Job.from_dict(item.meta)
+                except (KeyError, ValueError) as e:
+                    logger.warning(f"任务队列中的任务 {item.id} 无法解析，已忽略: {e}")
+                    continue
+                job.state = DONE if item.state == DONE else QUEUED
+                job.attempts = item.attempts
+                self._jobs[job.id] = job
+                self._latest[job.client] = job.id
+            pending = sum(job.processing for job in self._jobs.values())
+            if pending:
+                logger.info(f"从任务队列恢复 {pending} 个未完成的任务（其中 {recovered} 个在上次退出时正在执行）"
+                            + ("" if self.queue.encrypted else "，登录信息没有保存，这些任务将提示重新提交"))
+            for index in range(self.workers):
+                thread = threading.Thread(target=self._work, name=f'login-job-{index + 1}', daemon=True)
+                thread.start()
+                self._threads.append(thread)
+            heartbeat = threading.Thread(target=self._heartbeat, name='login-job-heartbeat', daemon=True)
+            heartbeat.start()
+            self._threads.append(heartbeat)
+        return self
+
+    def submit(self, job: Job, *args) -> Job:
+        """
+        把任务写入队列（队列不加密时 args 只保存在内存中）；排在它前面的等待任务已达 max_pending 时抛出 JobQueueFull。
+        """
+        self.start()
+        self._purge()
+        with self._lock:
+            self._jobs[job.id] = job
+            self._args[job.id] = args
+            try:
+                self.queue.put(job.id, job.to_dict(), list(args) if self.queue.encrypted else None,
+                               priority=PRIORITIES[job.priority])
+            except JobQueueFull:
+                del self._jobs[job.id]
+                del self._args[job.id]
+                raise
+            self._latest[job.client] = job.id
+            self._submitted += 1
+        logger.info(f"任务 {job.id} 已排队（终端 {job.client}，优先级 {job.priority}）")
+        return job
+
+    def get(self, job_id: str) -> Optional[Job]:
+        self.start()
+        self._purge()
+        return self._jobs.get(job_id)
+
+    def latest(self, client: str = '') -> Optional[Job]:
+        """
+        该终端最近提交的任务（兼容不带 job_id 的查询），已过期时返回 None。
+        """
+        self.start()
+        job_id = self._latest.get(client)
+        return self.get(job_id) if job_id else None
+
+    def _purge(self):
+        deadline = time.time() - self.ttl
+        self.queue.purge(deadline)
+        with self._lock:
+            expired = [job_id for job_id, job in self._jobs.items()
+                       if job.finished_at is not None and job.finished_at < deadline]
+            for job_id in expired:
+                del self._jobs[job_id]
+            for client in [client for client, job_id in self._latest.items() if job_id not in self._jobs]:
+                del self._latest[client]
+
+    def _heartbeat(self):
+        """
+        每隔三分之一个可见性超时给执行中的任务续租：执行时间再长，也不会在本进程还在执行时被其他工作线程重新取出，
+        只有进程崩溃或重启后才会重新执行。
+        """
+        while True:
+            time.sleep(self.visibility_timeout / 3)
+            with self._lock:
+                leases = list(self._leases.values())
+            try:
+                self.queue.renew(leases)
+            except Exception as e:
+                logger.error(f"任务续租失败: {str(e)}")
+
+    def _work(self):
+        while True:
+            try:
+                lease = self.queue.lease()
+            except Exception as e:
+                # 例如数据库文件被锁或磁盘错误，工作线程不能因此退出
+                logger.error(f"读取任务队列失败，{QUEUE_RETRY_INTERVAL}s 后重试: {str(e)}")
+                time.sleep(QUEUE_RETRY_INTERVAL)
+                continue
+            try:
+                self._execute(lease)
+            except Exception as e:
+                # 不再续租，可见性超时后重新取出（最多 max_attempts 次）
+                logger.error(f"任务 {lease.id} 处理出错: {str(e)}")
+                with self._lock:
+                    if self._leases.get(lease.id) is lease:
+                        del self._leases[lease.id]
+
+    def _execute(self, lease: Lease):
+        with self._lock:
+            if lease.id in self._leases:
+                # 续租失败、租约超时后被本进程的另一个工作线程取出：任务仍在执行，只把它的租约换成新的，
+                # 由原来的工作线程续租和 ack
+                self._leases[lease.id] = lease
+                self._duplicates += 1
+                logger.warning(f"任务 {lease.id} 仍在本进程中执行，忽略重复取出")
+                return
+            self._leases[lease.id] = lease
+            job = self._jobs.get(lease.id)
+            if job is None:
+                job = self._jobs[lease.id] = Job.from_dict(lease.meta)
+            args = self._args.pop(lease.id, None)
+        if args is None and lease.payload is not None:
+            args = tuple(lease.payload)
+        job.attempts = lease.attempts
+        job.state = RUNNING
+        job.started_at = time.time()
+        if lease.attempts > self.max_attempts:
+            # 多次执行都没有完成（进程在执行中崩溃或重启），不再重试
+            logger.error(f"任务 {job.id} 已被取出 {lease.attempts} 次仍未完成，放弃执行")
+            success, message = False, f"任务执行 {self.max_attempts} 次均未完成，请重新提交"
+            with self._lock:
+                self._abandoned += 1
+        elif args is None:
+            # 队列不加密时执行参数只在内存中，进程重启前提交的任务无法继续
+            logger.warning(f"任务 {job.id} 在服务重启前提交，没有登录信息，需要重新提交")
+            success, message = False, "服务已重启，任务未完成，请重新提交"
+            with self._lock:
+                self._interrupted += 1
+        else:
+            if lease.attempts > 1:
+                logger.info(f"任务 {job.id} 第 {lease.attempts} 次执行（上次执行时进程退出）")
+            job.message = '正在处理中...'
+            try:
+                success, message = self.runner(job, *args)
+            except Exception as e:
+                logger.error(f"任务 {job.id} 执行出错: {str(e)}")
+                success, message = False, f"处理过程中发生错误: {str(e)}"
+        job.success = success
+        job.message = message
+        job.finished_at = time.time()
+        job.state = DONE
+        with self._lock:
+            # 执行期间可能换成了新的租约（见上面的重复取出）
+            current = self._leases.pop(lease.id, lease)
+        if not self.queue.ack(current, job.to_dict()):
+            logger.warning(f"任务 {job.id} 超过 {self.visibility_timeout}s 没有续租，已被重新取出，本次结果未写入队列")
+        with self._lock:
+            if success:
+                self._succeeded += 1
+            else:
+                self._failed += 1
+            self._durations.append(job.finished_at - job.started_at)
+            for step, ms in job.timings.get('steps', {}).items():
+                self._steps[step].append(ms / 1000)
+            for step, ms in job.timings.get('pacing', {}).items():
+                self._steps[f'pacing:{step}'].append(ms / 1000)
+        logger.info(f"任务 {job.id} 结束: {message}（排队 {job.started_at - job.created_at:.1f}s，"
+                    f"执行 {job.finished_at - job.started_at:.1f}s）")
+
+    def metrics(self) -> Dict:
+        with self._lock:
+            queue_metrics = self.queue.metrics() if self.queue is not None else {}
+            names = {value: name for name, value in PRIORITIES.items()}
+            for key in ('depth_by_priority', 'rejected', 'wait_by_priority'):
+                if key in queue_metrics:
+                    queue_metrics[key] = {names.get(priority, priority): value
+                                          for priority, value in queue_metrics[key].items()}
+            return {
+                'workers': self.workers,
+                'running': sum(job.state == RUNNING for job in self._jobs.values()),
+                'tracked': len(self._jobs),
+                'submitted': self._submitted,
+                'succeeded': self._succeeded,
+                'failed': self._failed,
+                'abandoned': self._abandoned,
+                'interrupted': self._interrupted,
+                'duplicate_leases': self._duplicates,
+                'p50_run_ms': _percentile_ms(self._durations, 0.5),
+                'p95_run_ms': _percentile_ms(self._durations, 0.95),
+                # 每个任务在各步骤上的等待耗时（pacing: 开头的是模拟人工的停顿）
+                'steps': {step: {'count': len(samples),
+                                 'mean_ms': round(sum(samples) / len(samples) * 1000, 1),
+                                 'p95_ms': _percentile_ms(samples, 0.95)}
+                          for step, samples in self._steps.items()},
+                'queue': queue_metrics,
+            }
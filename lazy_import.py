@@ -0,0 +1,77 @@
+"""
+延迟导入。
+
+selenium、onnxruntime、cv2、win32print 等模块导入一次要几百毫秒到数秒，app.py 如果在模块级导入它们，
+Flask 要等全部导入完才能监听端口。LazyImport 在第一次访问属性或调用时才真正导入，
+用法与普通的 import 结果相同：
+
+    webdriver = LazyImport('selenium.webdriver')            # import selenium.webdriver as webdriver
+    By = LazyImport('selenium.webdriver.common.by', 'By')   # from selenium.webdriver.common.by import By
+
+    webdriver.EdgeOptions()
+    By.XPATH
+
+except 子句需要真正的异常类，不能使用 LazyImport。后台预热时可以调用 load_all 提前完成导入。
+"""
+import importlib
+import threading
+import time
+from typing import Any, Dict, Optional
+
+
+class LazyImport:
+    """
+    在第一次访问属性或调用时导入 module（并取出 attr），之后直接使用缓存的对象。多线程同时首次访问时只导入一次。
+    """
+
+    def __init__(self, module: str, attr: Optional[str] = None):
+        self._module = module
+        self._attr = attr
+        self._target = None
+        self._lock = threading.Lock()
+        self.import_time: Optional[float] = None
+
+    @property
+    def name(self) -> str:
+        return f'{self._module}.{self._attr}' if self._attr else self._module
+
+    @property
+    def loaded(self) -> bool:
+        return self._target is not None
+
+    def load(self) -> Any:
+        if self._target is None:
+            with self._lock:
+                if self._target is None:
+                    start = time.perf_counter()
+                    target = importlib.import_module(self._module)
+                    if self._attr:
+                        target = getattr(target, self._attr)
+                    self.import_time = time.perf_counter() - start
+                    self._target = target
+        return self._target
+
+    def __getattr__(self, name: str) -> Any:
+        # 只有实例上不存在的属性才会走到这里
+        return getattr(self.load(), name)
+
+    def __call__(self, *args, **kwargs) -> Any:
+        return self.load()(*args, **kwargs)
+
+    def __repr__(self) -> str:
+        return f"<LazyImport {self.name} ({'loaded' if self.loaded else 'not loaded'})>"
+
+
+def load_all(*imports: LazyImport) -> Dict[str, Optional[float]]:
+    """
+    依次导入全部 LazyImport，返回每一项的导入耗时（毫秒；导入失败为 None，不抛出异常）。
+    同一模块的第二个 LazyImport 通常接近 0，耗时已计入第一个。
+    """
+    timings = {}
+    for lazy in imports:
+        try:
+            lazy.load()
+            timings[lazy.name] = round(lazy.import_time * 1000, 1)
+        except Exception:
+            timings[lazy.name] = None
+    return timings
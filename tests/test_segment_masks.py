@@ -0,0 +1,56 @@
+import numpy as np
+import pytest
+
+from captcha_recognizer.slider import SegmentMasks, SliderV2
+
+# (原图尺寸, proto 尺寸)：固定 640 输入的 letterbox（含上下/左右填充）和矩形输入
+CASES = [
+    ((160, 300), (160, 160)),
+    ((200, 400), (160, 160)),
+    ((1280, 640), (160, 160)),
+    ((640, 1280), (160, 160)),
+    ((1080, 1920), (160, 160)),
+    ((97, 203), (160, 160)),
+    ((160, 300), (40, 76)),
+    ((344, 688), (86, 172)),
+    ((512, 512), (128, 128)),
+    ((150, 310), (38, 78)),
+]
+TRIALS = 5
+BOXES = 4
+MASK_DIM = 32
+
+# 允许不一致的像素：参考实现的掩膜值与 0 的距离在该相对误差以内（插值取整造成的阈值翻转）
+ROUNDING = 1e-4
+
+
+def random_instances(rng, shape):
+    h, w = shape
+    x1, y1 = rng.uniform(-5, w * 0.8, BOXES), rng.uniform(-5, h * 0.8, BOXES)
+    boxes = np.stack([x1, y1, x1 + rng.uniform(5, w * 0.4, BOXES), y1 + rng.uniform(5, h * 0.4, BOXES)], axis=1)
+    return rng.normal(size=(BOXES, MASK_DIM)).astype(np.float32), boxes.astype(np.float32)
+
+
+@pytest.mark.parametrize('shape, proto_hw', CASES)
+def test_roi_matches_process_mask(shape, proto_hw):
+    rng = np.random.default_rng(shape[0] * 10007 + shape[1])
+    # process_mask 不使用模型，不需要加载会话
+    slider = object.__new__(SliderV2)
+    for _ in range(TRIALS):
+        protos = rng.normal(size=(MASK_DIM, *proto_hw)).astype(np.float32)
+        coefficients, boxes = random_instances(rng, shape)
+
+        expected = slider.process_mask(protos, coefficients, boxes, shape)
+        values = SliderV2.crop_mask(SliderV2.scale_masks(
+            (coefficients @ protos.reshape(MASK_DIM, -1)).reshape(-1, *proto_hw), shape), boxes)
+        masks = SegmentMasks(protos, coefficients, boxes, shape)
+
+        for i in range(BOXES):
+            roi, (x, y) = masks.roi(i)
+            window = (slice(y, y + roi.shape[0]), slice(x, x + roi.shape[1]))
+            # ROI 之外不应有前景
+            assert expected[i].sum() == expected[i][window].sum()
+            diff = expected[i][window] != roi
+            tolerance = ROUNDING * np.abs(values[i]).max()
+            assert np.all(np.abs(values[i][window][diff]) <= tolerance), \
+                f'{int(diff.sum())} pixels differ beyond interpolation rounding in box {boxes[i]}'
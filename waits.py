@@ -0,0 +1,204 @@
+"""
+登录流程的条件等待和操作节奏。
+
+固定的 time.sleep 不管页面是否已经就绪都要等满，页面慢时又可能不够。Waiter 按页面的实际状态等待：
+- until：任意条件（selenium expected_conditions 或 callable(driver)）；
+- page_ready：document.readyState 为 complete；
+- network_idle：页面没有进行中的 XHR / fetch，且已加载的资源数持续 idle_ms 毫秒不变；
+- image_loaded：图片元素加载完成（可要求 src 与之前不同，用于刷新验证码）；
+- download_finished：下载目录中出现文件且没有未完成的临时文件。
+
+模拟人工操作的停顿（输入、点击之后，拖动滑块的每一步之间）由 PacingProfile 控制，与条件等待分开计时。
+每一步的耗时按步骤名累计，summary() 的结果记在任务上，见 /api/metrics 的 jobs.steps。
+
+本模块不导入 selenium.webdriver，条件由调用方传入。
+"""
+import logging
+import os
+import random
+import time
+from typing import Callable, Dict, NamedTuple, Optional, Sequence, Tuple
+
+from selenium.common.exceptions import JavascriptException, NoSuchElementException, \
+    StaleElementReferenceException, TimeoutException
+
+logger = logging.getLogger(__name__)
+
+# 条件等待的默认超时（秒）
+WAIT_TIMEOUT = 20
+
+# 检查条件的间隔（秒）
+POLL_INTERVAL = 0.1
+
+# 没有进行中的请求、且资源数持续该毫秒数不变时视为网络空闲
+NETWORK_IDLE_MS = 500
+
+# 浏览器下载中的临时文件后缀
+PARTIAL_DOWNLOAD_SUFFIXES = ('.crdownload', '.partial', '.tmp', '.download')
+
+IGNORED_EXCEPTIONS = (NoSuchElementException, StaleElementReferenceException, JavascriptException)
+
+# 第一次调用时给页面的 XMLHttpRequest / fetch 计数，返回 [进行中的请求数, 已加载的资源数, readyState]
+NETWORK_PROBE = """
+if (window.__pendingRequests === undefined) {
+    window.__pendingRequests = 0;
+    var send = XMLHttpRequest.prototype.send;
+    XMLHttpRequest.prototype.send = function () {
+        window.__pendingRequests++;
+        this.addEventListener('loadend', function () { window.__pendingRequests--; });
+        return send.apply(this, arguments);
+    };
+    if (window.fetch) {
+        var fetch = window.fetch;
+        window.fetch = function () {
+            window.__pendingRequests++;
+            return fetch.apply(this, arguments).finally(function () { window.__pendingRequests--; });
+        };
+    }
+}
+return [window.__pendingRequests, performance.getEntriesByType('resource').length, document.readyState];
+"""
+
+IMAGE_PROBE = "var img = arguments[0]; return img.complete && img.naturalWidth > 0 ? img.src : null;"
+
+
+class PacingProfile(NamedTuple):
+    pause: Tuple[float, float]  # 输入、点击之后的停顿范围（秒）
+    drag_step: Tuple[float, float]  # 拖动滑块每一步之间的间隔范围（秒）
+
+
+PACING_PROFILES = {
+    'none': PacingProfile((0.0, 0.0), (0.0, 0.0)),
+    'fast': PacingProfile((0.1, 0.3), (0.005, 0.015)),
+    'human': PacingProfile((0.3, 0.8), (0.01, 0.03)),
+}
+
+
+def pacing_profile(name: str = 'human', pause: Optional[Sequence[float]] = None,
+                   drag_step: Optional[Sequence[float]] = None) -> PacingProfile:
+    """
+    按名称取出节奏配置，pause / drag_step 为 (最小值, 最大值) 时覆盖对应的范围。
+    """
+    if name not in PACING_PROFILES:
+        raise ValueError(f"Unsupported pacing profile: {name}, valid values are {', '.join(PACING_PROFILES)}")
+    profile = PACING_PROFILES[name]
+    if pause:
+        profile = profile._replace(pause=(float(pause[0]), float(pause[-1])))
+    if drag_step:
+        profile = profile._replace(drag_step=(float(drag_step[0]), float(drag_step[-1])))
+    return profile
+
+
+class Waiter:
+    """
+    一个浏览器（一个任务）的等待器，记录每一步等待和停顿的耗时。
+
+    until 和 image_loaded 超时抛出 TimeoutException；page_ready、network_idle、download_finished
+    用来替代固定休眠，超时只记录日志并返回 False，由调用方决定是否继续。
+    """
+
+    def __init__(self, driver, timeout: float = WAIT_TIMEOUT, pacing: PacingProfile = PACING_PROFILES['human'],
+                 poll: float = POLL_INTERVAL, network_idle_ms: float = NETWORK_IDLE_MS):
+        self.driver = driver
+        self.timeout = timeout
+        self.pacing = pacing
+        self.poll = poll
+        self.network_idle_ms = network_idle_ms
+        self.steps: Dict[str, float] = {}  # 步骤名 -> 累计秒数（条件等待）
+        self.paced: Dict[str, float] = {}  # 步骤名 -> 累计秒数（模拟人工的停顿）
+
+    def _wait(self, step: str, condition: Callable, timeout: Optional[float]):
+        start = time.perf_counter()
+        deadline = start + (self.timeout if timeout is None else timeout)
+        try:
+            while True:
+                try:
+                    value = condition(self.driver)
+                    if value:
+                        return value
+                except IGNORED_EXCEPTIONS:
+                    pass
+                if time.perf_counter() >= deadline:
+                    raise TimeoutException(f"{step}: condition not met within "
+                                           f"{self.timeout if timeout is None else timeout}s")
+                time.sleep(self.poll)
+        finally:
+            self.steps[step] = self.steps.get(step, 0.0) + time.perf_counter() - start
+
+    def until(self, step: str, condition: Callable, timeout: Optional[float] = None):
+        """
+        等待 condition(driver) 返回真值并返回该值，超时抛出 TimeoutException。
+        """
+        return self._wait(step, condition, timeout)
+
+    def _soft(self, step: str, condition: Callable, timeout: Optional[float]) -> bool:
+        try:
+            self._wait(step, condition, timeout)
+            return True
+        except TimeoutException:
+            logger.info(f"等待超时，继续执行: {step}")
+            return False
+
+    def page_ready(self, step: str, timeout: Optional[float] = None) -> bool:
+        return self._soft(step, lambda d: d.execute_script('return document.readyState') == 'complete', timeout)
+
+    def network_idle(self, step: str, idle_ms: Optional[float] = None, timeout: Optional[float] = None) -> bool:
+        """
+        等待页面加载完成且网络空闲：没有进行中的 XHR / fetch，已加载的资源数持续 idle_ms 毫秒不变。
+        """
+        idle = (self.network_idle_ms if idle_ms is None else idle_ms) / 1000
+        state = {'resources': None, 'since': 0.0}
+
+        def quiet(driver):
+            pending, resources, ready = driver.execute_script(NETWORK_PROBE)
+            now = time.perf_counter()
+            if pending or ready != 'complete' or resources != state['resources']:
+                state['resources'], state['since'] = resources, now
+                return False
+            return now - state['since'] >= idle
+
+        return self._soft(step, quiet, timeout)
+
+    def image_loaded(self, step: str, locator: Tuple[str, str], previous_src: Optional[str] = None,
+                     timeout: Optional[float] = None):
+        """
+        等待 locator 对应的图片加载完成（previous_src 不为空时还要求 src 已经变化），返回该元素。
+        """
+        def loaded(driver):
+            element = driver.find_element(*locator)
+            src = driver.execute_script(IMAGE_PROBE, element)
+            return element if src and src != previous_src and element.is_displayed() else None
+
+        return self._wait(step, loaded, timeout)
+
+    def download_finished(self, step: str, directory: str, timeout: Optional[float] = None) -> bool:
+        """
+        等待 directory 中出现下载完成的文件（没有浏览器的临时文件）。
+        """
+        def finished(_):
+            names = os.listdir(directory) if os.path.isdir(directory) else []
+            return bool(names) and not any(name.endswith(PARTIAL_DOWNLOAD_SUFFIXES) for name in names)
+
+        return self._soft(step, finished, timeout)
+
+    def _sleep(self, step: str, bounds: Tuple[float, float]):
+        seconds = random.uniform(*bounds)
+        if seconds > 0:
+            time.sleep(seconds)
+        self.paced[step] = self.paced.get(step, 0.0) + seconds
+
+    def pause(self, step: str):
+        """输入、点击之后模拟人工的停顿"""
+        self._sleep(step, self.pacing.pause)
+
+    def drag_step(self, step: str = 'slider_drag'):
+        """拖动滑块两步之间的间隔"""
+        self._sleep(step, self.pacing.drag_step)
+
+    def summary(self) -> Dict:
+        return {
+            'wait_ms': round(sum(self.steps.values()) * 1000, 1),
+            'pacing_ms': round(sum(self.paced.values()) * 1000, 1),
+            'steps': {step: round(seconds * 1000, 1) for step, seconds in self.steps.items()},
+            'pacing': {step: round(seconds * 1000, 1) for step, seconds in self.paced.items()},
+        }